@@ -50,7 +50,10 @@ setup(
     install_requires=[
         'requests>=2.9,<2.99',
     ],
-    extras_require={},
+    extras_require={
+        'http2': ['httpx[http2]'],
+        'numpy': ['numpy'],
+    },
     package_data={},
 
     # http://docs.python.org/3.4/distutils/setupscript.html#installing-additional-files # noqa
@@ -62,8 +65,19 @@ setup(
     entry_points={
         'console_scripts': [
             'activate-sonarqube-rules=sonarqube_api.cmd.activate_rules:main',
+            'bulk-change-sonarqube-issues=sonarqube_api.cmd.bulk_change_issues:main',
+            'bulk-sonarqube-projects=sonarqube_api.cmd.bulk_projects:main',
+            'check-sonarqube-quality-gates=sonarqube_api.cmd.check_quality_gates:main',
+            'diff-sonarqube-rules=sonarqube_api.cmd.diff_rules:main',
+            'export-sonarqube-issues=sonarqube_api.cmd.export_issues:main',
             'export-sonarqube-rules=sonarqube_api.cmd.export_rules:main',
+            'fetch-sonarqube-sources=sonarqube_api.cmd.fetch_sources:main',
+            'import-sonarqube-rules=sonarqube_api.cmd.import_rules:main',
             'migrate-sonarqube-rules=sonarqube_api.cmd.migrate_rules:main',
+            'sonarqube=sonarqube_api.cmd.cli:main',
+            'sync-sonarqube-groups=sonarqube_api.cmd.sync_groups:main',
+            'sync-sonarqube-measures=sonarqube_api.cmd.sync_measures:main',
+            'sync-sonarqube-profiles=sonarqube_api.cmd.sync_profiles:main',
         ],
     },
 
@@ -0,0 +1,217 @@
+"""
+This module contains the MetricsTable, a columnar NumPy-backed table of
+resources and their metrics, used to aggregate the data returned by the
+SonarAPIHandler resources methods (requires NumPy).
+"""
+import numpy
+
+
+class MetricsTable(object):
+    """
+    Table of resources (rows) by metrics (columns), with missing values as
+    NaN, plus resource attributes (such as qualifier, language or tags) to
+    group them.
+    """
+
+    # Resource fields loaded as attributes
+    ATTRIBUTES = ('name', 'scope', 'qualifier', 'lang')
+
+    def __init__(self, keys, metrics, values, attributes=None):
+        """
+        Set resource keys, metric names, values and attributes.
+
+        :param keys: list of resource keys (one per row)
+        :param metrics: list of metric names (one per column)
+        :param values: 2-d float array of values (rows by columns)
+        :param attributes: dict of attribute name to array of values (one
+        per row), tags being a list of tags per row
+        """
+        self.keys = list(keys)
+        self.metrics = list(metrics)
+        self.values = values
+        self.attributes = attributes or {}
+        self._columns = dict((m, i) for i, m in enumerate(self.metrics))
+
+    @classmethod
+    def from_resources(cls, resources, tags=None):
+        """
+        Build a table from resources data dicts, as yielded by the handler's
+        get_resources_* methods. Debt measures by characteristic are loaded
+        as separate metrics (such as sqale_index:TESTABILITY).
+
+        :param resources: iterable of resource data dicts
+        :param tags: dict of resource key to iterable of tags
+        :return: MetricsTable instance
+        """
+        keys, attributes = [], dict((a, []) for a in cls.ATTRIBUTES)
+        rows, cols, vals = [], [], []
+        columns = {}
+
+        for row, resource in enumerate(resources):
+            keys.append(resource['key'])
+            for attribute in cls.ATTRIBUTES:
+                attributes[attribute].append(resource.get(attribute))
+
+            for measure in resource.get('msr', []):
+                metric = measure['key']
+                if measure.get('ctic_key'):
+                    metric = '{}:{}'.format(metric, measure['ctic_key'])
+                try:
+                    value = float(measure['val'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                rows.append(row)
+                cols.append(columns.setdefault(metric, len(columns)))
+                vals.append(value)
+
+        # Fill the matrix at once
+        values = numpy.full((len(keys), len(columns)), numpy.nan)
+        values[numpy.array(rows, dtype=int), numpy.array(cols, dtype=int)] = vals
+
+        attributes = dict((a, numpy.array(v, dtype=object))
+                          for a, v in attributes.items())
+        tags = tags or {}
+        attributes['tags'] = numpy.empty(len(keys), dtype=object)
+        for i, key in enumerate(keys):
+            attributes['tags'][i] = list(tags.get(key, ()))
+
+        metrics = sorted(columns, key=columns.get)
+        return cls(keys, metrics, values, attributes)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def column(self, metric):
+        """
+        Return the values of a metric (NaN for resources without it).
+
+        :param metric: metric name
+        :return: float array
+        """
+        if metric not in self._columns:
+            return numpy.full(len(self.keys), numpy.nan)
+        return self.values[:, self._columns[metric]]
+
+    def select(self, rows):
+        """
+        Return a table with a subset of rows.
+
+        :param rows: boolean mask or array of row indexes
+        :return: MetricsTable instance
+        """
+        rows = numpy.asarray(rows)
+        if rows.dtype == bool:
+            rows = numpy.nonzero(rows)[0]
+        attributes = dict((a, v[rows]) for a, v in self.attributes.items())
+        return MetricsTable([self.keys[i] for i in rows], self.metrics,
+                            self.values[rows], attributes)
+
+    def total(self, metric):
+        """
+        Return the sum of a metric (ignoring missing values).
+        """
+        return float(numpy.nansum(self.column(metric)))
+
+    def mean(self, metric):
+        """
+        Return the mean of a metric (ignoring missing values).
+        """
+        values = self.column(metric)
+        if numpy.isnan(values).all():
+            return float('nan')
+        return float(numpy.nanmean(values))
+
+    def weighted_average(self, metric, weight):
+        """
+        Return the average of a metric weighted by another one, such as
+        coverage by lines_to_cover (ignoring resources missing either).
+
+        :param metric: metric name
+        :param weight: name of the metric to use as weight
+        :return: weighted average (NaN if total weight is 0)
+        """
+        values, weights = self.column(metric), self.column(weight)
+        valid = ~(numpy.isnan(values) | numpy.isnan(weights))
+        total_weight = weights[valid].sum()
+        if not total_weight:
+            return float('nan')
+        return float((values[valid] * weights[valid]).sum() / total_weight)
+
+    def percentile(self, metric, q):
+        """
+        Return the percentile(s) of a metric (ignoring missing values).
+
+        :param metric: metric name
+        :param q: percentile or sequence of percentiles (0-100)
+        :return: float or float array
+        """
+        values = self.column(metric)
+        values = values[~numpy.isnan(values)]
+        if not len(values):
+            return numpy.full(numpy.shape(q), numpy.nan)[()]
+        return numpy.percentile(values, q)
+
+    def _group_index(self, attribute):
+        """
+        Return group values, and row index and group index for each
+        (row, group) pair. Rows with several tags belong to several groups.
+
+        :param attribute: attribute name
+        :return: tuple of groups list, rows array and groups array
+        """
+        values = self.attributes[attribute]
+        if attribute == 'tags':
+            rows = [i for i, tags in enumerate(values) for _ in tags]
+            values = [t for tags in values for t in tags]
+        else:
+            rows = range(len(values))
+            values = ['' if v is None else v for v in values]
+        groups, group_ids = numpy.unique(numpy.array(values, dtype=str),
+                                         return_inverse=True)
+        return groups.tolist(), numpy.array(rows, dtype=int), group_ids
+
+    def group_by(self, attribute):
+        """
+        Split the table by the values of an attribute.
+
+        :param attribute: attribute name (qualifier, lang, tags...)
+        :return: dict of attribute value to MetricsTable
+        """
+        groups, rows, group_ids = self._group_index(attribute)
+        return dict((g, self.select(rows[group_ids == i]))
+                    for i, g in enumerate(groups))
+
+    def group_total(self, attribute, metric):
+        """
+        Return the sum of a metric by the values of an attribute.
+
+        :param attribute: attribute name
+        :param metric: metric name
+        :return: dict of attribute value to sum
+        """
+        groups, rows, group_ids = self._group_index(attribute)
+        values = numpy.nan_to_num(self.column(metric)[rows])
+        totals = numpy.bincount(group_ids, weights=values, minlength=len(groups))
+        return dict(zip(groups, totals.tolist()))
+
+    def group_weighted_average(self, attribute, metric, weight):
+        """
+        Return the weighted average of a metric by the values of an
+        attribute (NaN for groups without weight).
+
+        :param attribute: attribute name
+        :param metric: metric name
+        :param weight: name of the metric to use as weight
+        :return: dict of attribute value to weighted average
+        """
+        groups, rows, group_ids = self._group_index(attribute)
+        values, weights = self.column(metric)[rows], self.column(weight)[rows]
+        valid = ~(numpy.isnan(values) | numpy.isnan(weights))
+        products = numpy.bincount(group_ids[valid],
+                                  weights=values[valid] * weights[valid],
+                                  minlength=len(groups))
+        totals = numpy.bincount(group_ids[valid], weights=weights[valid],
+                                minlength=len(groups))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            averages = numpy.where(totals > 0, products / totals, numpy.nan)
+        return dict(zip(groups, averages.tolist()))
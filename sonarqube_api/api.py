@@ -2,11 +2,21 @@
 This module contains the SonarAPIHandler, used for communicating with the
 SonarQube server web service API.
 """
+import datetime
 import operator
+import threading
+import time
 
-import requests
-
-from .exceptions import ClientError, AuthError, ValidationError, ServerError
+from .cursor import PageCursor
+from .exceptions import (
+    ClientError, AuthError, ValidationError, SearchWindowError, ServerError,
+    TaskTimeoutError
+)
+from .series import MetricSeries
+from .transports import TRANSPORTS, Transport
+from .utils import (
+    _clock, chunks, format_datetime, format_params, parallel_imap, parse_datetime
+)
 
 
 class SonarAPIHandler(object):
@@ -20,11 +30,77 @@ class SonarAPIHandler(object):
 
     # Endpoint for resources and rules
     AUTH_VALIDATION_ENDPOINT = '/api/authentication/validate'
+    CE_ACTIVITY_ENDPOINT = '/api/ce/activity'
+    CE_TASK_ENDPOINT = '/api/ce/task'
+    COMPONENTS_SEARCH_ENDPOINT = '/api/components/search'
+    COMPONENTS_SHOW_ENDPOINT = '/api/components/show'
+    COMPONENTS_TREE_ENDPOINT = '/api/components/tree'
+    ISSUES_BULK_CHANGE_ENDPOINT = '/api/issues/bulk_change'
+    ISSUES_SEARCH_ENDPOINT = '/api/issues/search'
+    MEASURES_COMPONENT_ENDPOINT = '/api/measures/component'
+    MEASURES_COMPONENT_TREE_ENDPOINT = '/api/measures/component_tree'
+    MEASURES_HISTORY_ENDPOINT = '/api/measures/search_history'
     METRICS_LIST_ENDPOINT = '/api/metrics/search'
+    PERMISSIONS_ADD_GROUP_ENDPOINT = '/api/permissions/add_group'
+    PERMISSIONS_ADD_USER_ENDPOINT = '/api/permissions/add_user'
+    PERMISSIONS_GROUPS_ENDPOINT = '/api/permissions/groups'
+    PERMISSIONS_REMOVE_GROUP_ENDPOINT = '/api/permissions/remove_group'
+    PERMISSIONS_REMOVE_USER_ENDPOINT = '/api/permissions/remove_user'
+    PROJECTS_BULK_DELETE_ENDPOINT = '/api/projects/bulk_delete'
+    PROJECTS_CREATE_ENDPOINT = '/api/projects/create'
+    QUALITY_GATE_STATUS_ENDPOINT = '/api/qualitygates/project_status'
     RESOURCES_ENDPOINT = '/api/resources'
     RULES_ACTIVATION_ENDPOINT = '/api/qualityprofiles/activate_rule'
+    RULES_DEACTIVATION_ENDPOINT = '/api/qualityprofiles/deactivate_rule'
     RULES_LIST_ENDPOINT = '/api/rules/search'
     RULES_CREATE_ENDPOINT = '/api/rules/create'
+    SOURCES_RAW_ENDPOINT = '/api/sources/raw'
+    USER_GROUPS_ADD_USER_ENDPOINT = '/api/user_groups/add_user'
+    USER_GROUPS_CREATE_ENDPOINT = '/api/user_groups/create'
+    USER_GROUPS_REMOVE_USER_ENDPOINT = '/api/user_groups/remove_user'
+    USER_GROUPS_SEARCH_ENDPOINT = '/api/user_groups/search'
+    USER_GROUPS_USERS_ENDPOINT = '/api/user_groups/users'
+    USERS_CREATE_ENDPOINT = '/api/users/create'
+    USERS_SEARCH_ENDPOINT = '/api/users/search'
+
+    # Maximum number of results that search endpoints backed by Elasticsearch
+    # (rules, issues and projects) can page through, and maximum page size
+    MAX_SEARCH_RESULTS = 10000
+    MAX_PAGE_SIZE = 500
+
+    # Maximum page size of measures history
+    MAX_HISTORY_PAGE_SIZE = 1000
+
+    # Maximum page size of permissions searches
+    MAX_PERMISSIONS_PAGE_SIZE = 100
+
+    # Maximum number of issues that can be changed in a single bulk change
+    MAX_BULK_CHANGE_ISSUES = 500
+
+    # Maximum number of projects deleted in a single bulk delete
+    MAX_BULK_DELETE_PROJECTS = 1000
+
+    # Facets used to split rules queries that exceed the search results
+    # window, in order of preference (facet names match filter params)
+    RULES_PARTITION_FACETS = ('languages', 'repositories', 'severities')
+
+    # Qualifiers of components that have no children (files and tests)
+    LEAF_QUALIFIERS = ('FIL', 'UTS')
+
+    # Compute engine task statuses still in queue, and polling parameters:
+    # queue page size, task duration assumed until some are observed, number
+    # of recent tasks used to estimate it, and weight of new observations
+    CE_QUEUED_STATUSES = ('PENDING', 'IN_PROGRESS')
+    CE_QUEUE_PAGE_SIZE = 1000
+    CE_DEFAULT_TASK_DURATION = 10.0
+    CE_RECENT_TASKS = 20
+    CE_DURATION_SMOOTHING = 0.3
+
+    # Default number of threads for concurrent requests
+    DEFAULT_WORKERS = 4
+
+    # Default transport (by name)
+    DEFAULT_TRANSPORT = 'requests'
 
     # Debt data params (characteristics and metric)
     DEBT_CHARACTERISTICS = (
@@ -50,22 +126,53 @@ class SonarAPIHandler(object):
     )
 
     def __init__(self, host=None, port=None, user=None, password=None,
-                 base_path=None, token=None):
+                 base_path=None, token=None, pool_size=None, coalesce=False,
+                 transport=None):
         """
-        Set connection info and session, including auth (if user+password
+        Set connection info and transport, including auth (if user+password
         and/or auth token were provided).
+
+        The built-in transports support concurrent requests, so a single
+        handler can be used by many threads, as its concurrent methods do
+        (with requests, each thread gets its own session, sharing auth,
+        configuration and the connection pool). With coalescing, identical
+        GET calls made while one is in flight wait for it and share its
+        response instead of repeating the request.
+
+        :param pool_size: maximum number of connections kept by the transport
+        :param coalesce: share responses of identical concurrent GET calls
+        :param transport: name of the transport to use (requests, urllib3 or
+        http2, defaults to requests) or Transport instance
         """
         self._host = host or self.DEFAULT_HOST
         self._port = port or self.DEFAULT_PORT
         self._base_path = base_path or self.DEFAULT_BASE_PATH
-        self._session = requests.Session()
 
         # Prefer revocable authentication token over username/password if
         # both are provided
+        auth = None
         if token:
-            self._session.auth = token, ''
+            auth = token, ''
         elif user and password:
-            self._session.auth = user, password
+            auth = user, password
+
+        # Build transport by name, unless given
+        # Note: lock protects any mutable state shared between threads
+        if not isinstance(transport, Transport):
+            transport_class = TRANSPORTS[transport or self.DEFAULT_TRANSPORT]
+            transport = transport_class(auth=auth, pool_size=pool_size)
+        self._transport = transport
+        self._lock = threading.Lock()
+
+        # In-flight GET calls by endpoint and queryset, if coalescing
+        self._coalesce = coalesce
+        self._in_flight = {}
+
+    def close(self):
+        """
+        Close the transport (and its connections) of the handler.
+        """
+        self._transport.close()
 
     def _get_url(self, endpoint):
         """
@@ -89,10 +196,58 @@ class SonarAPIHandler(object):
         :param data: queryset or body
         :return: response
         """
-        # Get method and make the call
-        call = getattr(self._session, method.lower())
+        if self._coalesce and method.lower() == 'get':
+            return self._make_coalesced_call(endpoint, **data)
+        return self._send(method, endpoint, **data)
+
+    def _make_coalesced_call(self, endpoint, **data):
+        """
+        Make a GET call, unless an identical one (same endpoint and queryset)
+        is already in flight, in which case wait for it and share its
+        response (or exception).
+
+        :param endpoint: relative url to make the call
+        :param data: queryset
+        :return: response
+        """
+        key = endpoint, tuple(sorted((k, str(v)) for k, v in data.items()))
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = {'done': threading.Event()}
+
+        if leader:
+            # First caller, make the call and notify the others
+            try:
+                flight['response'] = self._send('get', endpoint, **data)
+            except Exception as e:
+                flight['error'] = e
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                flight['done'].set()
+        else:
+            # Identical call in flight, wait for it
+            flight['done'].wait()
+
+        if 'error' in flight:
+            raise flight['error']
+        return flight['response']
+
+    def _send(self, method, endpoint, **data):
+        """
+        Make the call to the service using the transport, and return the
+        response or raise the appropriate exception.
+
+        :param method: http method (get, post, put, patch)
+        :param endpoint: relative url to make the call
+        :param data: queryset or body
+        :return: response
+        """
+        # Make the call with the transport
         url = self._get_url(endpoint)
-        res = call(url, data=data or {})
+        res = self._transport.request(method, url, data or {})
 
         # Analyse response status and return or raise exception
         # Note: redirects are followed automatically by requests
@@ -143,7 +298,7 @@ class SonarAPIHandler(object):
 
             # Add params if we have any
             # Note: sort by key to allow checking easily
-            params = ';'.join('{}={}'.format(k, v) for k, v in sorted(params.items()) if v)
+            params = format_params(params)
             if params:
                 data['params'] = params
 
@@ -151,6 +306,124 @@ class SonarAPIHandler(object):
         res = self._make_call('post', self.RULES_ACTIVATION_ENDPOINT, **data)
         return res
 
+    def add_group_member(self, group, login):
+        """
+        Add a user to a group.
+
+        :param group: name of the group
+        :param login: login of the user
+        :return: request response
+        """
+        # Make call (might raise exception) and return
+        return self._make_call('post', self.USER_GROUPS_ADD_USER_ENDPOINT,
+                               name=group, login=login)
+
+    def add_group_permission(self, group, permission, project=None):
+        """
+        Grant a permission to a group, globally or on a project.
+
+        :param group: name of the group
+        :param permission: key of the permission (such as admin or scan)
+        :param project: key of the project (global permission if not given)
+        :return: request response
+        """
+        data = {'groupName': group, 'permission': permission}
+        if project:
+            data['projectKey'] = project
+
+        # Make call (might raise exception) and return
+        return self._make_call('post', self.PERMISSIONS_ADD_GROUP_ENDPOINT, **data)
+
+    def add_user_permission(self, login, permission, project=None):
+        """
+        Grant a permission to a user, globally or on a project.
+
+        :param login: login of the user
+        :param permission: key of the permission (such as admin or scan)
+        :param project: key of the project (global permission if not given)
+        :return: request response
+        """
+        data = {'login': login, 'permission': permission}
+        if project:
+            data['projectKey'] = project
+
+        # Make call (might raise exception) and return
+        return self._make_call('post', self.PERMISSIONS_ADD_USER_ENDPOINT, **data)
+
+    def bulk_change_issues(self, issue_keys, assign=None, add_tags=None,
+                           remove_tags=None, transition=None, severity=None,
+                           issue_type=None, comment=None,
+                           send_notifications=False, batch_size=None,
+                           workers=None):
+        """
+        Apply the same changes to any number of issues. Keys are split into
+        batches (of the maximum size accepted by the server), which are sent
+        concurrently.
+
+        :param issue_keys: iterable of issue keys
+        :param assign: login of the user to assign issues to
+        :param add_tags: iterable or comma-separated string of tags to add
+        :param remove_tags: iterable or comma-separated string of tags to remove
+        :param transition: transition to apply (confirm, resolve, wontfix...)
+        :param severity: severity to set
+        :param issue_type: type to set
+        :param comment: comment to add
+        :param send_notifications: notify users of the changes
+        :param batch_size: number of issues per request
+        :param workers: number of requests to send concurrently
+        :return: dict with total, success, ignored and failures counters
+        """
+        # Build data to post with each batch
+        data = {'sendNotifications': send_notifications and 'true' or 'false'}
+        if assign is not None:
+            data['assign'] = assign
+        for param, tags in (('add_tags', add_tags), ('remove_tags', remove_tags)):
+            if tags:
+                if not isinstance(tags, str):
+                    tags = ','.join(tags)
+                data[param] = tags
+        if transition:
+            data['do_transition'] = transition
+        if severity:
+            data['set_severity'] = severity.upper()
+        if issue_type:
+            data['set_type'] = issue_type.upper()
+        if comment:
+            data['comment'] = comment
+
+        def send(keys):
+            # Post a batch (runs in a thread), invalid batches fail entirely
+            try:
+                return self._make_call('post', self.ISSUES_BULK_CHANGE_ENDPOINT,
+                                       issues=','.join(keys), **data).json()
+            except (ValidationError, ServerError):
+                return {'total': len(keys), 'failures': len(keys)}
+
+        # Send batches and aggregate results
+        result = {'total': 0, 'success': 0, 'ignored': 0, 'failures': 0}
+        batches = chunks(issue_keys, batch_size or self.MAX_BULK_CHANGE_ISSUES)
+        for res in parallel_imap(send, batches, workers or self.DEFAULT_WORKERS):
+            for counter in result:
+                result[counter] += res.get(counter, 0)
+        return result
+
+    def count_rules(self, active_only=False, profile=None, languages=None,
+                    custom_only=False):
+        """
+        Return the number of rules in status ready, that are not template
+        rules (as get_rules, but with a single request).
+
+        :param active_only: filter only active rules
+        :param profile: key of profile to filter rules
+        :param languages: key of languages to filter rules
+        :param custom_only: filter only custom rules
+        :return: number of rules
+        """
+        qs = self._get_rules_queryset(active_only, profile, languages,
+                                      custom_only)
+        res = self._make_call('get', self.RULES_LIST_ENDPOINT, ps=1, **qs).json()
+        return PageCursor._get_paging(res)[2]
+
     def create_rule(self, key, name, description, message, xpath, severity,
                     status, template_key):
         """
@@ -181,12 +454,387 @@ class SonarAPIHandler(object):
         res = self._make_call('post', self.RULES_CREATE_ENDPOINT, **data)
         return res
 
+    def create_rules(self, rules, workers=None):
+        """
+        Create many custom rules concurrently, yielding each result as soon
+        as it's ready.
+
+        :param rules: iterable of rule definition dicts, with the arguments
+        of create_rule (key, name, description, message, xpath, severity,
+        status and template_key)
+        :param workers: number of rules to create concurrently
+        :return: generator that yields (rule definition dict, error) tuples,
+        where error is None if the rule was created
+        """
+        def create(rule):
+            # Create a rule (runs in a thread)
+            try:
+                self.create_rule(rule['key'], rule['name'], rule['description'],
+                                 rule['message'], rule['xpath'], rule['severity'],
+                                 rule['status'], rule['template_key'])
+                return rule, None
+            except (ClientError, ServerError) as e:
+                return rule, e
+
+        for result in parallel_imap(create, rules, workers or self.DEFAULT_WORKERS):
+            yield result
+
+    def create_group(self, name, description=None):
+        """
+        Create a group of users.
+
+        :param name: name of the group
+        :param description: description of the group
+        :return: group data dict
+        """
+        data = {'name': name}
+        if description:
+            data['description'] = description
+
+        # Make call (might raise exception) and return
+        res = self._make_call('post', self.USER_GROUPS_CREATE_ENDPOINT, **data).json()
+        return res['group']
+
+    def create_project(self, key, name=None, visibility=None):
+        """
+        Create (provision) a project.
+
+        :param key: key of the project to create
+        :param name: name of the project (defaults to key)
+        :param visibility: visibility of the project (public or private)
+        :return: project data dict
+        """
+        data = {'project': key, 'name': name or key}
+        if visibility:
+            data['visibility'] = visibility
+
+        # Make call (might raise exception) and return
+        res = self._make_call('post', self.PROJECTS_CREATE_ENDPOINT, **data).json()
+        return res['project']
+
+    def create_projects(self, project_keys, visibility=None, workers=None):
+        """
+        Create (provision) many projects concurrently, yielding each result
+        as soon as it's ready.
+
+        :param project_keys: iterable of keys of projects to create
+        :param visibility: visibility of the projects (public or private)
+        :param workers: number of projects to create concurrently
+        :return: generator that yields (project key, project data dict,
+        error) tuples, where project is None if there was an error
+        """
+        def create(key):
+            # Create a project (runs in a thread)
+            try:
+                return key, self.create_project(key, visibility=visibility), None
+            except (ClientError, ServerError) as e:
+                return key, None, e
+
+        for result in parallel_imap(create, project_keys,
+                                    workers or self.DEFAULT_WORKERS):
+            yield result
+
+    def create_user(self, login, name, email=None, password=None, local=True):
+        """
+        Create a user.
+
+        :param login: login of the user
+        :param name: display name of the user
+        :param email: email of the user
+        :param password: password of the user (required for local users)
+        :param local: whether the user is authenticated by SonarQube (False
+        for users authenticated by an external provider)
+        :return: user data dict
+        """
+        data = {'login': login, 'name': name, 'local': str(local).lower()}
+        if email:
+            data['email'] = email
+        if password:
+            data['password'] = password
+
+        # Make call (might raise exception) and return
+        res = self._make_call('post', self.USERS_CREATE_ENDPOINT, **data).json()
+        return res['user']
+
+    def delete_projects(self, project_keys, batch_size=None, workers=None):
+        """
+        Delete any number of projects with server-side bulk deletes. Keys
+        are split into batches (of the maximum size accepted by the server),
+        which are sent concurrently, yielding each result as soon as it's
+        ready.
+
+        :param project_keys: iterable of keys of projects to delete
+        :param batch_size: number of projects per request
+        :param workers: number of requests to send concurrently
+        :return: generator that yields (project keys list, error) tuples,
+        where error is None if the batch was deleted
+        """
+        def delete(keys):
+            # Post a batch (runs in a thread)
+            try:
+                self._make_call('post', self.PROJECTS_BULK_DELETE_ENDPOINT,
+                                projects=','.join(keys))
+                return keys, None
+            except (ClientError, ServerError) as e:
+                return keys, e
+
+        batches = chunks(project_keys, batch_size or self.MAX_BULK_DELETE_PROJECTS)
+        for result in parallel_imap(delete, batches, workers or self.DEFAULT_WORKERS):
+            yield result
+
+    def deactivate_rule(self, key, profile_key):
+        """
+        Deactivate a rule for a given quality profile.
+
+        :param key: key of the rule
+        :param profile_key: key of the profile
+        :return: request response
+        """
+        # Make call (might raise exception) and return
+        res = self._make_call('post', self.RULES_DEACTIVATION_ENDPOINT,
+                              rule_key=key, profile_key=profile_key)
+        return res
+
+    def get_analysis_date(self, component):
+        """
+        Return the date of the last analysis of a component (for files and
+        directories, of the project they belong to).
+
+        :param component: key of the component
+        :return: analysis date as str, None if never analysed
+        """
+        res = self._make_call('get', self.COMPONENTS_SHOW_ENDPOINT,
+                              component=component).json()
+
+        # Note: only projects have the date in some versions, and ancestors
+        # go from the parent up to the project
+        for c in [res['component']] + res.get('ancestors', []):
+            if c.get('analysisDate'):
+                return c['analysisDate']
+        return None
+
+    def get_groups(self):
+        """
+        Yield all the groups of users.
+
+        :return: cursor that yields group data dicts
+        """
+        return PageCursor(self, self.USER_GROUPS_SEARCH_ENDPOINT, 'groups',
+                          {'ps': self.MAX_PAGE_SIZE})
+
+    def get_group_members(self, group):
+        """
+        Yield the users that are members of a group.
+
+        :param group: name of the group
+        :return: cursor that yields user data dicts (login and name)
+        """
+        return PageCursor(self, self.USER_GROUPS_USERS_ENDPOINT, 'users',
+                          {'name': group, 'selected': 'selected',
+                           'ps': self.MAX_PAGE_SIZE})
+
+    def get_group_memberships(self, groups, workers=None):
+        """
+        Yield the logins of the members of many groups, fetched concurrently,
+        as soon as each group is ready.
+
+        :param groups: iterable of names of groups
+        :param workers: number of groups to fetch concurrently
+        :return: generator that yields (group name, set of logins, error)
+        tuples, where logins is None if there was an error
+        """
+        def fetch(group):
+            # Get members of a group (runs in a thread)
+            try:
+                return group, set(u['login'] for u in self.get_group_members(group)), None
+            except (ClientError, ServerError) as e:
+                return group, None, e
+
+        for result in parallel_imap(fetch, groups, workers or self.DEFAULT_WORKERS):
+            yield result
+
+    def get_group_permissions(self, project=None):
+        """
+        Yield the groups with their permissions, globally or on a project.
+
+        :param project: key of the project (global permissions if not given)
+        :return: cursor that yields group data dicts (name and permissions
+        list)
+        """
+        qs = {'ps': self.MAX_PERMISSIONS_PAGE_SIZE}
+        if project:
+            qs['projectKey'] = project
+        return PageCursor(self, self.PERMISSIONS_GROUPS_ENDPOINT, 'groups', qs)
+
+    def _get_issues_queryset(self, projects=None, severities=None,
+                             statuses=None, types=None):
+        """
+        Build the queryset to search issues.
+
+        :param projects: keys of projects to filter issues
+        :param severities: severities to filter issues
+        :param statuses: statuses to filter issues
+        :param types: types to filter issues
+        :return: queryset dict
+        """
+        qs = {}
+        filters = (('componentKeys', projects), ('severities', severities),
+                   ('statuses', statuses), ('types', types))
+        for param, values in filters:
+            if values:
+                if not isinstance(values, str):
+                    values = ','.join(values)
+                qs[param] = values
+        return qs
+
+    def _count_issues(self, qs, start, end):
+        """
+        Return the number of issues created in the given window.
+
+        :param qs: issues search queryset
+        :param start: start of the window (inclusive) as datetime
+        :param end: end of the window (exclusive) as datetime
+        :return: number of issues
+        """
+        res = self._make_call('get', self.ISSUES_SEARCH_ENDPOINT, ps=1,
+                              createdAfter=format_datetime(start),
+                              createdBefore=format_datetime(end), **qs).json()
+        return PageCursor._get_paging(res)[2]
+
+    def _split_issues_windows(self, qs, start, end):
+        """
+        Yield creation date windows that split the given one so that the
+        issues created in each of them fit in the search results window.
+        Windows are split in as many parts as needed according to their
+        number of issues (windows of one second are never split).
+
+        :param qs: issues search queryset
+        :param start: start of the window (inclusive) as datetime
+        :param end: end of the window (exclusive) as datetime
+        :return: generator that yields (start, end) tuples in order
+        """
+        windows = [(start, end)]
+        while windows:
+            start, end = windows.pop()
+            total = self._count_issues(qs, start, end)
+            seconds = int((end - start).total_seconds())
+            if total <= self.MAX_SEARCH_RESULTS or seconds <= 1:
+                if total:
+                    yield start, end
+                continue
+
+            # Split in parts that should fit, pushed in reverse order
+            parts = min(total // self.MAX_SEARCH_RESULTS + 1, seconds)
+            step = datetime.timedelta(seconds=seconds // parts)
+            bounds = [start + step * i for i in range(parts)] + [end]
+            for i in reversed(range(parts)):
+                windows.append((bounds[i], bounds[i + 1]))
+
+    def get_issues(self, projects=None, severities=None, statuses=None,
+                   types=None, created_after=None, created_before=None,
+                   workers=None):
+        """
+        Yield issues, bypassing the search results window: the search is
+        split into creation date windows small enough to be paged through,
+        which are fetched concurrently (so issues are not sorted).
+
+        :param projects: keys of projects to filter issues
+        :param severities: severities to filter issues
+        :param statuses: statuses to filter issues
+        :param types: types to filter issues
+        :param created_after: datetime or str, defaults to the first issue
+        :param created_before: datetime or str, defaults to now
+        :param workers: number of windows to fetch concurrently
+        :return: generator that yields issue data dicts
+        """
+        qs = self._get_issues_queryset(projects, severities, statuses, types)
+
+        # Determine creation dates window, starting with the oldest issue
+        if created_after is None:
+            res = self._make_call('get', self.ISSUES_SEARCH_ENDPOINT, ps=1,
+                                  s='CREATION_DATE', asc='true', **qs).json()
+            if not res['issues']:
+                return
+            created_after = res['issues'][0]['creationDate']
+        if created_before is None:
+            created_before = datetime.datetime.utcnow().replace(microsecond=0)
+            created_before += datetime.timedelta(seconds=1)
+        if not isinstance(created_after, datetime.datetime):
+            created_after = parse_datetime(created_after)
+        if not isinstance(created_before, datetime.datetime):
+            created_before = parse_datetime(created_before)
+
+        def fetch(window):
+            # Fetch all issues in a window (runs in a thread)
+            window_qs = dict(qs, ps=self.MAX_PAGE_SIZE,
+                             createdAfter=format_datetime(window[0]),
+                             createdBefore=format_datetime(window[1]))
+            return list(PageCursor(self, self.ISSUES_SEARCH_ENDPOINT,
+                                   'issues', window_qs,
+                                   window=self.MAX_SEARCH_RESULTS))
+
+        # Fetch windows as they're found, yield issues as windows are ready
+        windows = self._split_issues_windows(qs, created_after, created_before)
+        for issues in parallel_imap(fetch, windows,
+                                    workers or self.DEFAULT_WORKERS):
+            for issue in issues:
+                yield issue
+
+    def get_measures_history(self, projects=None, metrics=None,
+                             from_date=None, to_date=None, workers=None):
+        """
+        Yield the history of metrics of the given projects (or all of them)
+        as compact columnar time series, fetching projects concurrently.
+
+        :param projects: iterable of keys of projects (default all)
+        :param metrics: iterable of metrics by name (default general ones)
+        :param from_date: datetime or str, to filter history from
+        :param to_date: datetime or str, to filter history to
+        :param workers: number of projects to fetch concurrently
+        :return: generator that yields (project key, {metric: MetricSeries})
+        """
+        metrics = list(metrics or self.GENERAL_METRICS)
+        if projects is None:
+            projects = (p['key'] for p in self._search_projects())
+
+        # Build base queryset, with dates if required
+        qs = {'metrics': ','.join(metrics), 'ps': self.MAX_HISTORY_PAGE_SIZE}
+        for param, date in (('from', from_date), ('to', to_date)):
+            if date:
+                if isinstance(date, datetime.datetime):
+                    date = format_datetime(date)
+                qs[param] = date
+
+        def fetch(project):
+            # Get all history pages of a project (runs in a thread)
+            # Note: paging is by date, each page has all metrics
+            series = dict((m, MetricSeries(m)) for m in metrics)
+            page_qs = dict(qs, component=project)
+            while True:
+                res = self._make_call('get', self.MEASURES_HISTORY_ENDPOINT,
+                                      **page_qs).json()
+                for measure in res['measures']:
+                    s = series.setdefault(measure['metric'],
+                                          MetricSeries(measure['metric']))
+                    for entry in measure['history']:
+                        s.append(parse_datetime(entry['date']),
+                                 entry.get('value'))
+
+                page_num, page_size, total = PageCursor._get_paging(res)
+                if page_num * page_size >= total:
+                    return project, series
+                page_qs['p'] = page_num + 1
+
+        for result in parallel_imap(fetch, projects,
+                                    workers or self.DEFAULT_WORKERS):
+            yield result
+
     def get_metrics(self, fields=None):
         """
         Yield defined metrics.
 
         :param fields: iterable or comma-separated string of field names
-        :return: generator that yields metric data dicts
+        :return: cursor that yields metric data dicts
         """
         # Build queryset including fields if required
         qs = {}
@@ -195,37 +843,53 @@ class SonarAPIHandler(object):
                 fields = ','.join(fields)
             qs['f'] = fields.lower()
 
-        # Page counters
-        page_num = 1
-        page_size = 1
-        n_metrics = 2
+        return PageCursor(self, self.METRICS_LIST_ENDPOINT, 'metrics', qs)
 
-        # Cycle through rules
-        while page_num * page_size < n_metrics:
-            # Update paging information for calculation
-            res = self._make_call('get', self.METRICS_LIST_ENDPOINT,
-                                  **qs).json()
-            page_num = res['p']
-            page_size = res['ps']
-            n_metrics = res['total']
+    def get_quality_gate_status(self, project_key):
+        """
+        Return the quality gate status of a project.
 
-            # Update page number (next) in queryset
-            qs['p'] = page_num + 1
+        :param project_key: key of the project
+        :return: project status data dict (status and conditions)
+        """
+        res = self._make_call('get', self.QUALITY_GATE_STATUS_ENDPOINT,
+                              projectKey=project_key).json()
+        return res['projectStatus']
 
-            # Yield rules
-            for metric in res['metrics']:
-                yield metric
+    def get_quality_gates_status(self, project_keys, workers=None):
+        """
+        Yield the quality gate status of many projects, checked concurrently,
+        as soon as each one is ready.
 
-    def get_rules(self, active_only=False, profile=None, languages=None,
-                  custom_only=False):
+        :param project_keys: iterable of keys of projects
+        :param workers: number of projects to check concurrently
+        :return: generator that yields (project key, project status data
+        dict, error) tuples, where status is None if there was an error
         """
-        Yield rules in status ready, that are not template rules.
+        def check(key):
+            # Get status of a project (runs in a thread)
+            try:
+                return key, self.get_quality_gate_status(key), None
+            except (ClientError, ServerError) as e:
+                return key, None, e
+
+        for result in parallel_imap(check, project_keys,
+                                    workers or self.DEFAULT_WORKERS):
+            yield result
+
+    def _get_rules_queryset(self, active_only=False, profile=None,
+                            languages=None, custom_only=False,
+                            repositories=None):
+        """
+        Build the queryset to search rules in status ready, that are not
+        template rules.
 
         :param active_only: filter only active rules
         :param profile: key of profile to filter rules
         :param languages: key of languages to filter rules
         :param custom_only: filter only custom rules
-        :return: generator that yields rule data dicts
+        :param repositories: key of repositories to filter rules
+        :return: queryset dict
         """
         # Build the queryset
         qs = {'is_template': 'no', 'statuses': 'READY'}
@@ -236,36 +900,164 @@ class SonarAPIHandler(object):
         elif active_only:
             qs['activation'] = 'true'
 
-        # Add language param
+        # Add language and repository params
         # Note: we handle comma-separated string or list-like iterable)
         if languages:
             if not isinstance(languages, str):
                 languages = ','.join(languages)
             qs['languages'] = languages.lower()
+        if repositories:
+            if not isinstance(repositories, str):
+                repositories = ','.join(repositories)
+            qs['repositories'] = repositories
 
         # Filter by tech debt for custom only (custom have no tech debt)
         if custom_only:
             qs['has_debt_characteristic'] = 'false'
 
-        # Page counters
-        page_num = 1
-        page_size = 1
-        n_rules = 2
+        return qs
+
+    def get_rules(self, active_only=False, profile=None, languages=None,
+                  custom_only=False, repositories=None):
+        """
+        Yield rules in status ready, that are not template rules.
+
+        :param active_only: filter only active rules
+        :param profile: key of profile to filter rules
+        :param languages: key of languages to filter rules
+        :param custom_only: filter only custom rules
+        :param repositories: key of repositories to filter rules
+        :return: cursor that yields rule data dicts
+        """
+        qs = self._get_rules_queryset(active_only, profile, languages,
+                                      custom_only, repositories)
+
+        # Split searches that exceed the results window by facets
+        return PageCursor(self, self.RULES_LIST_ENDPOINT, 'rules', qs,
+                          partition=self._partition_rules_queryset,
+                          window=self.MAX_SEARCH_RESULTS)
+
+    def get_activations(self, profile, languages=None):
+        """
+        Yield the active rules of a profile (as get_rules with a profile,
+        but in any status, such as deprecated or beta) with only their key
+        and activations: a list of dicts with profile (qProfile), severity,
+        params and inheritance, under 'actives'.
+
+        :param profile: key of the profile
+        :param languages: key of languages to filter rules
+        :return: cursor that yields rule data dicts
+        """
+        qs = self._get_rules_queryset(profile=profile, languages=languages)
+        qs.update({'f': 'actives', 'ps': self.MAX_PAGE_SIZE})
+
+        # Note: every active rule counts (for profiles to be identical)
+        del qs['is_template'], qs['statuses']
+        return PageCursor(self, self.RULES_LIST_ENDPOINT, 'rules', qs,
+                          partition=self._partition_rules_queryset,
+                          attach='actives', window=self.MAX_SEARCH_RESULTS)
+
+    def _partition_rules_queryset(self, qs, facets=None):
+        """
+        Split a rules search queryset that exceeds the search results window
+        by the values of the first facet, recursing on the following facets
+        for the values that still exceed it.
+
+        :param qs: rules search queryset
+        :param facets: names of facets to use for partitioning
+        :return: list of (queryset, total) tuples
+        :raises SearchWindowError: if a value of the last facet still
+        exceeds the window (its rules couldn't all be paged through)
+        """
+        facets = facets or self.RULES_PARTITION_FACETS
+        partitions = []
+        for value, count in self._get_rules_facet(qs, facets[0]):
+            sub_qs = dict(qs, **{facets[0]: value})
+            if count > self.MAX_SEARCH_RESULTS:
+                if len(facets) == 1:
+                    filters = ', '.join('{}={}'.format(f, sub_qs[f])
+                                        for f in self.RULES_PARTITION_FACETS if f in sub_qs)
+                    raise SearchWindowError("Can't split rules search any further: "
+                                            "{} rules with {}".format(count, filters))
+                partitions.extend(self._partition_rules_queryset(sub_qs,
+                                                                 facets[1:]))
+            elif count:
+                partitions.append((sub_qs, count))
+        return partitions
+
+    def _get_rules_facet(self, qs, facet):
+        """
+        Return the values of a rules facet for a given queryset.
+
+        :param qs: rules search queryset
+        :param facet: name of the facet
+        :return: list of (value, count) tuples
+        """
+        # Only one rule per page, we're only interested in the facet
+        qs = dict(qs, ps=1, facets=facet)
+        qs.pop('p', None)
+        res = self._make_call('get', self.RULES_LIST_ENDPOINT, **qs).json()
+        for f in res.get('facets', []):
+            if f['property'] == facet:
+                return [(v['val'], v['count']) for v in f['values']]
+        return []
+
+    def get_rules_facet(self, facet, active_only=False, profile=None,
+                        languages=None, custom_only=False):
+        """
+        Return the values of a rules facet (such as languages or repositories)
+        with the number of matching rules for each one.
 
-        # Cycle through rules
-        while page_num * page_size < n_rules:
-            # Update paging information for calculation
-            res = self._make_call('get', self.RULES_LIST_ENDPOINT, **qs).json()
-            page_num = res['p']
-            page_size = res['ps']
-            n_rules = res['total']
+        :param facet: name of the facet (languages, repositories, severities)
+        :param active_only: filter only active rules
+        :param profile: key of profile to filter rules
+        :param languages: key of languages to filter rules
+        :param custom_only: filter only custom rules
+        :return: list of (value, count) tuples
+        """
+        qs = self._get_rules_queryset(active_only, profile, languages,
+                                      custom_only)
+        return self._get_rules_facet(qs, facet)
+
+    def get_source(self, component):
+        """
+        Return the raw source of a file.
 
-            # Update page number (next) in queryset
-            qs['p'] = page_num + 1
+        :param component: key of the file component
+        :return: source as bytes
+        """
+        res = self._make_call('get', self.SOURCES_RAW_ENDPOINT, key=component)
+        return res.content
 
-            # Yield rules
-            for rule in res['rules']:
-                yield rule
+    def get_sources(self, components, workers=None):
+        """
+        Yield the raw sources of many files, downloaded concurrently, as soon
+        as each one is ready.
+
+        :param components: iterable of keys of file components
+        :param workers: number of files to download concurrently
+        :return: generator that yields (component key, source, error) tuples,
+        where source is None if there was an error
+        """
+        def download(key):
+            # Get source of a file (runs in a thread)
+            try:
+                return key, self.get_source(key), None
+            except (ClientError, ServerError) as e:
+                return key, None, e
+
+        for result in parallel_imap(download, components,
+                                    workers or self.DEFAULT_WORKERS):
+            yield result
+
+    def get_users(self):
+        """
+        Yield all the active users.
+
+        :return: cursor that yields user data dicts
+        """
+        return PageCursor(self, self.USERS_SEARCH_ENDPOINT, 'users',
+                          {'ps': self.MAX_PAGE_SIZE})
 
     def get_resources_debt(self, resource=None, categories=None,
                            include_trends=False, include_modules=False):
@@ -364,6 +1156,206 @@ class SonarAPIHandler(object):
         for _, prj in sorted(prjs.items(), key=operator.itemgetter(0)):
             yield prj
 
+    def remove_group_member(self, group, login):
+        """
+        Remove a user from a group.
+
+        :param group: name of the group
+        :param login: login of the user
+        :return: request response
+        """
+        # Make call (might raise exception) and return
+        return self._make_call('post', self.USER_GROUPS_REMOVE_USER_ENDPOINT,
+                               name=group, login=login)
+
+    def remove_group_permission(self, group, permission, project=None):
+        """
+        Revoke a permission from a group, globally or on a project.
+
+        :param group: name of the group
+        :param permission: key of the permission (such as admin or scan)
+        :param project: key of the project (global permission if not given)
+        :return: request response
+        """
+        data = {'groupName': group, 'permission': permission}
+        if project:
+            data['projectKey'] = project
+
+        # Make call (might raise exception) and return
+        return self._make_call('post', self.PERMISSIONS_REMOVE_GROUP_ENDPOINT, **data)
+
+    def remove_user_permission(self, login, permission, project=None):
+        """
+        Revoke a permission from a user, globally or on a project.
+
+        :param login: login of the user
+        :param permission: key of the permission (such as admin or scan)
+        :param project: key of the project (global permission if not given)
+        :return: request response
+        """
+        data = {'login': login, 'permission': permission}
+        if project:
+            data['projectKey'] = project
+
+        # Make call (might raise exception) and return
+        return self._make_call('post', self.PERMISSIONS_REMOVE_USER_ENDPOINT, **data)
+
+    def wait_for_task(self, task_id, timeout=None, **kwargs):
+        """
+        Wait for a compute engine task to complete.
+
+        :param task_id: id of the task
+        :param timeout: maximum number of seconds to wait
+        :return: task data dict
+        """
+        for task in self.wait_for_tasks([task_id], timeout=timeout, **kwargs):
+            return task
+
+    def wait_for_tasks(self, task_ids, timeout=None, min_interval=1.0,
+                       max_interval=30.0):
+        """
+        Yield compute engine tasks as soon as each one completes (whatever
+        its final status).
+
+        All tasks are watched in a single loop, with one request per round
+        for the whole queue (plus one per completed task). Time between
+        rounds adapts to the earliest expected completion, estimated with
+        the queue position of each task and the typical task duration
+        (learned from recent and completed tasks).
+
+        :param task_ids: iterable of task ids
+        :param timeout: maximum number of seconds to wait
+        :param min_interval: minimum number of seconds between rounds
+        :param max_interval: maximum number of seconds between rounds
+        :return: generator that yields task data dicts
+        """
+        waiting = set(task_ids)
+        started = _clock()
+        in_progress_since = {}
+
+        # Estimate typical duration with recently finished tasks
+        res = self._make_call('get', self.CE_ACTIVITY_ENDPOINT, status='SUCCESS',
+                              ps=self.CE_RECENT_TASKS).json()
+        durations = sorted(t['executionTimeMs'] / 1000.0 for t in res['tasks']
+                           if t.get('executionTimeMs') is not None)
+        duration = durations[len(durations) // 2] if durations \
+            else self.CE_DEFAULT_TASK_DURATION
+
+        while waiting:
+            # Get the whole queue in a single call, oldest first
+            res = self._make_call('get', self.CE_ACTIVITY_ENDPOINT,
+                                  status=','.join(self.CE_QUEUED_STATUSES),
+                                  ps=self.CE_QUEUE_PAGE_SIZE).json()
+            queue = sorted(res['tasks'], key=lambda t: t['submittedAt'])
+            queued_ids = set(t['id'] for t in queue)
+
+            # Tasks out of queue: check (might be beyond queue page) and yield
+            for task_id in sorted(waiting - queued_ids):
+                task = self._make_call('get', self.CE_TASK_ENDPOINT,
+                                       id=task_id).json()['task']
+                if task['status'] in self.CE_QUEUED_STATUSES:
+                    continue
+                if task.get('executionTimeMs') is not None:
+                    duration += self.CE_DURATION_SMOOTHING * \
+                        (task['executionTimeMs'] / 1000.0 - duration)
+                waiting.discard(task_id)
+                yield task
+
+            if not waiting:
+                break
+
+            # Estimate time to earliest completion: tasks in progress are
+            # expected to take the typical duration, pending ones to wait for
+            # the ones ahead of them too
+            now = _clock()
+            expected = []
+            position = 0
+            for task in queue:
+                if task['status'] == 'IN_PROGRESS':
+                    since = in_progress_since.setdefault(task['id'], now)
+                    remaining = max(duration - (now - since), 0)
+                else:
+                    position += 1
+                    remaining = position * duration
+                if task['id'] in waiting:
+                    expected.append(remaining)
+            delay = min(expected) / 2 if expected else min_interval
+            delay = max(min_interval, min(delay, max_interval))
+
+            # Wait for next round, the last one right at the timeout
+            if timeout is not None:
+                if now - started >= timeout:
+                    raise TaskTimeoutError('Tasks not completed after {} seconds: '
+                                           '{}'.format(timeout, ', '.join(sorted(waiting))))
+                delay = min(delay, timeout - (now - started))
+            time.sleep(delay)
+
+    def walk_components(self, projects=None, metrics=None, workers=None):
+        """
+        Yield the components of the given projects (or all of them) level by
+        level: projects, modules, directories and files. The children of
+        each level are fetched concurrently, and only the keys of the
+        components to expand are kept in memory.
+
+        :param projects: iterable of keys of projects to walk (default all)
+        :param metrics: iterable or comma-separated string of metrics to
+        include in each component's measures
+        :param workers: number of components to expand concurrently
+        :return: generator that yields component data dicts
+        """
+        workers = workers or self.DEFAULT_WORKERS
+        if metrics and not isinstance(metrics, str):
+            metrics = ','.join(metrics)
+
+        def get_component(key):
+            # Get a single component, with measures if required
+            if metrics:
+                return self._make_call('get', self.MEASURES_COMPONENT_ENDPOINT,
+                                       component=key,
+                                       metricKeys=metrics).json()['component']
+            return self._make_call('get', self.COMPONENTS_SHOW_ENDPOINT,
+                                   component=key).json()['component']
+
+        def get_children(key):
+            # Get all children of a component, with measures if required
+            qs = {'component': key, 'strategy': 'children',
+                  'ps': self.MAX_PAGE_SIZE}
+            endpoint = self.COMPONENTS_TREE_ENDPOINT
+            if metrics:
+                qs['metricKeys'] = metrics
+                endpoint = self.MEASURES_COMPONENT_TREE_ENDPOINT
+            return list(PageCursor(self, endpoint, 'components', qs))
+
+        # Get projects, searching them if not given
+        if projects is None:
+            roots = self._search_projects()
+            if metrics:
+                roots = parallel_imap(get_component, (r['key'] for r in roots),
+                                      workers)
+        else:
+            roots = parallel_imap(get_component, projects, workers)
+
+        # Yield projects, and then their children level by level
+        level = [roots]
+        while level is not None:
+            frontier = []
+            for components in level:
+                for component in components:
+                    if component.get('qualifier') not in self.LEAF_QUALIFIERS:
+                        frontier.append(component['key'])
+                    yield component
+            level = parallel_imap(get_children, frontier, workers) if frontier else None
+
+    def _search_projects(self):
+        """
+        Return a cursor with all the projects.
+
+        :return: cursor that yields project component data dicts
+        """
+        return PageCursor(self, self.COMPONENTS_SEARCH_ENDPOINT, 'components',
+                          {'qualifiers': 'TRK', 'ps': self.MAX_PAGE_SIZE},
+                          window=self.MAX_SEARCH_RESULTS)
+
     def validate_authentication(self):
         """
         Validate the authentication credentials passed on client initialization.
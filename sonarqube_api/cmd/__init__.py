@@ -1 +1,102 @@
 __author__ = 'claudio.melendrez'
+
+from sonarqube_api.api import SonarAPIHandler
+
+
+def add_connection_arguments(parser, prefix=None):
+    """
+    Add the arguments to connect to a SonarQube server (host, port,
+    authentication and base path) to a parser.
+
+    :param parser: argparse parser (or argument group)
+    :param prefix: prefix of the options and destinations, to connect to
+    several servers (such as source, for --source-host stored as source_host)
+    """
+    option = '--{}-'.format(prefix) if prefix else '--'
+    dest = '{}_'.format(prefix) if prefix else ''
+    server = '{} '.format(prefix) if prefix else ''
+    auth = ' for {} server'.format(prefix) if prefix else ''
+
+    parser.add_argument(option + 'host', dest=dest + 'host', type=str,
+                        default='http://localhost',
+                        help='Host of the {}SonarQube server'.format(server))
+    parser.add_argument(option + 'port', dest=dest + 'port', type=str,
+                        default='9000',
+                        help='Port of the {}SonarQube server instance'.format(server))
+    parser.add_argument(option + 'user', dest=dest + 'user', type=str,
+                        default=None,
+                        help='Authentication user{}'.format(auth))
+    parser.add_argument(option + 'password', dest=dest + 'password', type=str,
+                        default=None,
+                        help='Authentication password{}'.format(auth))
+    parser.add_argument(option + 'authtoken', dest=dest + 'authtoken', type=str,
+                        default=None,
+                        help='Authentication token{}'.format(auth))
+    parser.add_argument(option + 'basepath', dest=dest + 'basepath', type=str,
+                        default=None,
+                        help='The base-path of the {}Sonar installation. '
+                             'Defaults to "/"'.format(server))
+
+
+# Destinations of the connection arguments
+CONNECTION_DESTS = ('host', 'port', 'user', 'password', 'authtoken', 'basepath')
+
+
+def connection_options(options, prefix=None):
+    """
+    Return the connection arguments of parsed options.
+
+    :param options: parsed options (argparse namespace)
+    :param prefix: prefix of the connection arguments
+    :return: dict of destination (without prefix) to value
+    """
+    dest = '{}_'.format(prefix) if prefix else ''
+    return dict((name, getattr(options, dest + name)) for name in CONNECTION_DESTS)
+
+
+class Connections(object):
+    """
+    Handlers for the connection arguments of commands, created once per
+    server so that commands run in the same process share their connection
+    pools (and auth).
+    """
+
+    def __init__(self, **handler_options):
+        """
+        Set the handler options forced on all handlers.
+
+        :param handler_options: keyword arguments for every SonarAPIHandler
+        (such as pool_size or coalesce), overriding the commands' ones
+        """
+        self.handler_options = handler_options
+        self._handlers = {}
+
+    def get(self, options, prefix=None, **handler_options):
+        """
+        Return the handler for the connection arguments of parsed options,
+        creating it on first use.
+
+        :param options: parsed options (argparse namespace)
+        :param prefix: prefix of the connection arguments
+        :param handler_options: keyword arguments for SonarAPIHandler
+        :return: SonarAPIHandler instance
+        """
+        connection = connection_options(options, prefix)
+        kwargs = dict(host=connection['host'], port=connection['port'],
+                      user=connection['user'], password=connection['password'],
+                      token=connection['authtoken'], base_path=connection['basepath'])
+        kwargs.update(handler_options)
+        kwargs.update(self.handler_options)
+
+        key = tuple(sorted(kwargs.items()))
+        if key not in self._handlers:
+            self._handlers[key] = SonarAPIHandler(**kwargs)
+        return self._handlers[key]
+
+    def close(self):
+        """
+        Close the connections of all handlers.
+        """
+        for h in self._handlers.values():
+            h.close()
+        self._handlers.clear()
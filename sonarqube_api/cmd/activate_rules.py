@@ -5,52 +5,69 @@ import argparse
 import csv
 import sys
 
-from sonarqube_api.api import SonarAPIHandler, ValidationError
-
-
-parser = argparse.ArgumentParser(description='Activate rules in SonarQube server.')
-
-# Rules arguments (required)
-parser.add_argument('profile_key', type=str,
-                    help='Key of the target profile to activate rules.')
-parser.add_argument('filename', type=str,
-                    help='File to use for source of the rules definitions.')
-
-# Server connection params
-parser.add_argument('--host', dest='host', type=str,
-                    default='http://localhost',
-                    help='Host of the source SonarQube server')
-parser.add_argument('--port', dest='port', type=str,
-                    default='9000',
-                    help='Port of the source SonarQube server instance')
-parser.add_argument('--user', dest='user', type=str,
-                    default=None,
-                    help='Authentication user for source server')
-parser.add_argument('--password', dest='password', type=str,
-                    default=None,
-                    help='Authentication password for source server')
-parser.add_argument('--authtoken', dest='authtoken', type=str,
-                    default=None,
-                    help='Authentication token for source server')
-parser.add_argument('--basepath', dest='basepath', type=str,
-                    default=None,
-                    help='The base-path of the Sonar installation. Defaults to "/"')
+from sonarqube_api.api import ValidationError
+from sonarqube_api.cmd import Connections, add_connection_arguments
+from sonarqube_api.profiles import get_profile_activations
+from sonarqube_api.utils import format_params
 
 
-def main():
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Rules arguments (required)
+    parser.add_argument('profile_key', type=str,
+                        help='Key of the target profile to activate rules.')
+    parser.add_argument('filename', type=str,
+                        help='File to use for source of the rules definitions.')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Activate rules in SonarQube server.')
+    add_connection_arguments(parser)
+    add_arguments(parser)
+
+    return parser
+
+
+def is_unchanged(activation, rule_def):
+    """
+    Check whether activating a rule with the given definition would leave
+    its current activation unchanged. Only definitions with explicit
+    severity (and no reset) can be compared.
+
+    :param activation: current activation dict (None if not active)
+    :param rule_def: cleaned rule definition (reset, severity and params)
+    :return: True if the activation can be skipped
+    """
+    if activation is None or rule_def.get('reset') or not rule_def.get('severity'):
+        return False
+    params = dict((k, v) for k, v in rule_def.items() if k not in ('reset', 'severity'))
+    return (rule_def['severity'].upper() == activation['severity'] and
+            format_params(params) == format_params(activation['params']))
+
+
+def run(h, options, connections):
     """
     Activate rules in a profile using a SonarAPIHandler instance.
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if the command failed
     """
-    options = parser.parse_args()
-    h = SonarAPIHandler(host=options.host, port=options.port,
-                        user=options.user, password=options.password,
-                        token=options.authtoken, base_path=options.basepath)
 
-    # Counters (total, created, skipped and failed)
-    a, f = 0, 0
+    # Counters (activated, skipped and failed)
+    a, s, f = 0, 0, 0
 
     # Read file and import
     try:
+        # Get current activations, to skip the ones that wouldn't change
+        activations = get_profile_activations(h, options.profile_key)
+
         with open(options.filename, 'r') as import_file:
             # Init reader and check headers
             reader = csv.DictReader(import_file)
@@ -62,6 +79,9 @@ def main():
                     # Pop key, clean data and attempt activation
                     rule_def['reset'] = rule_def.get('reset', '').lower() in ('y', 'yes', 'true')
                     rule_def = {k: v for k, v in rule_def.items() if v}
+                    if is_unchanged(activations.get(key), rule_def):
+                        s += 1
+                        continue
                     h.activate_rule(key, options.profile_key, **rule_def)
                     a += 1
 
@@ -81,5 +101,18 @@ def main():
         status = 'Complete'
 
     # Finally, write results
-    sys.stdout.write("{} rules activation: {} activated and "
-                     "{} failed.\n".format(status, a, f))
+    sys.stdout.write("{} rules activation: {} activated, {} skipped and "
+                     "{} failed.\n".format(status, a, s, f))
+    return 1 if f or status != 'Complete' else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options)
+    # Note: failed rules don't change the exit status of the script (only
+    # of batch steps)
+    run(h, options, connections)
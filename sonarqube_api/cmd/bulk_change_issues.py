@@ -0,0 +1,125 @@
+"""
+Utility to change issues in bulk on a SonarQube server.
+"""
+import argparse
+import sys
+
+from sonarqube_api.cmd import Connections, add_connection_arguments
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Issues argument
+    parser.add_argument('filename', type=str, nargs='?',
+                        default='-',
+                        help='File with one issue key per line (defaults to stdin)')
+
+    # Change arguments
+    parser.add_argument('--assign', dest='assign', type=str,
+                        default=None,
+                        help='Login of the user to assign the issues to')
+    parser.add_argument('--add-tags', dest='add_tags', type=str,
+                        default=None,
+                        help='Comma-separated tags to add')
+    parser.add_argument('--remove-tags', dest='remove_tags', type=str,
+                        default=None,
+                        help='Comma-separated tags to remove')
+    parser.add_argument('--transition', dest='transition', type=str,
+                        default=None,
+                        help='Transition to apply (confirm, resolve, wontfix...)')
+    parser.add_argument('--severity', dest='severity', type=str,
+                        default=None,
+                        help='Severity to set')
+    parser.add_argument('--type', dest='type', type=str,
+                        default=None,
+                        help='Type to set')
+    parser.add_argument('--comment', dest='comment', type=str,
+                        default=None,
+                        help='Comment to add')
+    parser.add_argument('--notify', dest='notify', action='store_true',
+                        help='Send notifications to the affected users')
+
+    # Batching options
+    parser.add_argument('--batch-size', dest='batch_size', type=int,
+                        default=None,
+                        help='Number of issues per request (defaults to server maximum)')
+    parser.add_argument('--workers', dest='workers', type=int,
+                        default=4,
+                        help='Number of requests to send in parallel')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Change issues in bulk in a SonarQube server.')
+    add_connection_arguments(parser)
+    add_arguments(parser)
+
+    return parser
+
+
+def read_keys(f):
+    """
+    Yield the issue keys in a file, one per line (ignoring blank lines).
+    """
+    for line in f:
+        key = line.strip()
+        if key:
+            yield key
+
+
+def run(h, options, connections):
+    """
+    Change issues in bulk using a SonarAPIHandler instance.
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if the command failed
+    """
+
+    # Counters (changed, ignored and failed)
+    result = {'success': 0, 'ignored': 0, 'failures': 0}
+
+    # Read keys (from file or stdin) and change issues
+    try:
+        f = sys.stdin if options.filename == '-' else open(options.filename, 'r')
+        try:
+            result = h.bulk_change_issues(
+                read_keys(f), assign=options.assign, add_tags=options.add_tags,
+                remove_tags=options.remove_tags, transition=options.transition,
+                severity=options.severity, issue_type=options.type,
+                comment=options.comment, send_notifications=options.notify,
+                batch_size=options.batch_size, workers=options.workers
+            )
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+    except Exception as e:
+        # Other errors, stop execution immediately
+        sys.stderr.write("Error: {}\n".format(e))
+        status = 'Incomplete'
+
+    else:
+        # No errors, write result
+        status = 'Complete'
+
+    # Finally, write results
+    sys.stdout.write("{} issues bulk change: {} changed, {} ignored and "
+                     "{} failed.\n".format(status, result['success'],
+                                           result['ignored'], result['failures']))
+    return 1 if result['failures'] or status != 'Complete' else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options)
+    return run(h, options, connections)
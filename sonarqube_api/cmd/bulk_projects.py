@@ -0,0 +1,138 @@
+"""
+Utility to create or delete projects in bulk on a SonarQube server.
+"""
+import argparse
+import sys
+
+from sonarqube_api.cmd import Connections, add_connection_arguments
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Action and projects arguments
+    parser.add_argument('action', type=str, choices=('create', 'delete'),
+                        help='Action to apply to the projects')
+    parser.add_argument('filename', type=str, nargs='?',
+                        default='-',
+                        help='File with one project key per line (defaults to stdin)')
+
+    # Projects options
+    parser.add_argument('--visibility', dest='visibility', type=str,
+                        default=None, choices=('public', 'private'),
+                        help='Visibility of the created projects')
+    parser.add_argument('--batch-size', dest='batch_size', type=int,
+                        default=None,
+                        help='Number of projects per delete request (defaults to server maximum)')
+    parser.add_argument('--workers', dest='workers', type=int,
+                        default=4,
+                        help='Number of requests to send in parallel')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Create or delete projects in bulk '
+                                                 'in a SonarQube server.')
+    add_connection_arguments(parser)
+    add_arguments(parser)
+
+    return parser
+
+
+def read_keys(f):
+    """
+    Yield the project keys in a file, one per line (ignoring blank lines).
+    """
+    for line in f:
+        key = line.strip()
+        if key:
+            yield key
+
+
+def create(h, keys, options):
+    """
+    Create projects, writing progress as each one is ready.
+
+    :return: tuple of done and failed counters
+    """
+    d, f = 0, 0
+    for key, project, error in h.create_projects(keys, visibility=options.visibility,
+                                                 workers=options.workers):
+        if error:
+            sys.stderr.write("Failed to create project {}: {}\n".format(key, error))
+            f += 1
+        else:
+            d += 1
+            sys.stdout.write("[{}] Created project {}\n".format(d + f, key))
+    return d, f
+
+
+def delete(h, keys, options):
+    """
+    Delete projects in batches, writing progress as each batch is ready.
+
+    :return: tuple of done and failed counters
+    """
+    d, f = 0, 0
+    for batch, error in h.delete_projects(keys, batch_size=options.batch_size,
+                                          workers=options.workers):
+        if error:
+            sys.stderr.write("Failed to delete {} projects ({}...): "
+                             "{}\n".format(len(batch), batch[0], error))
+            f += len(batch)
+        else:
+            d += len(batch)
+            sys.stdout.write("[{}] Deleted {} projects\n".format(d + f, len(batch)))
+    return d, f
+
+
+def run(h, options, connections):
+    """
+    Create or delete projects in bulk using a SonarAPIHandler instance.
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if any project failed
+    """
+
+    # Counters (done and failed)
+    d, f = 0, 0
+
+    # Read keys (from file or stdin) and apply action
+    try:
+        fp = sys.stdin if options.filename == '-' else open(options.filename, 'r')
+        try:
+            action = create if options.action == 'create' else delete
+            d, f = action(h, read_keys(fp), options)
+        finally:
+            if fp is not sys.stdin:
+                fp.close()
+
+    except Exception as e:
+        # Other errors, stop execution immediately
+        sys.stderr.write("Error: {}\n".format(e))
+        status = 'Incomplete'
+
+    else:
+        # No errors, complete
+        status = 'Complete'
+
+    # Finally, write results
+    verb = 'created' if options.action == 'create' else 'deleted'
+    sys.stdout.write("{} projects {}: {} {} and {} failed.\n".format(
+        status, options.action, d, verb, f))
+    return 1 if f or status != 'Complete' else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options)
+    return run(h, options, connections)
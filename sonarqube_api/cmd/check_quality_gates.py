@@ -0,0 +1,120 @@
+"""
+Utility to check the quality gate status of projects on a SonarQube server.
+"""
+import argparse
+import sys
+
+from sonarqube_api.cmd import Connections, add_connection_arguments
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Projects arguments
+    parser.add_argument('projects', type=str, nargs='*',
+                        help='Keys of the projects to check')
+    parser.add_argument('--file', dest='filename', type=str,
+                        default=None,
+                        help='File with one project key per line ("-" for stdin)')
+
+    # Check options
+    parser.add_argument('--fail-fast', dest='fail_fast', action='store_true',
+                        help='Stop on the first failed project')
+    parser.add_argument('--workers', dest='workers', type=int,
+                        default=8,
+                        help='Number of projects to check in parallel')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Check the quality gate status '
+                                                 'of projects in SonarQube server.')
+    add_connection_arguments(parser)
+    add_arguments(parser)
+
+    return parser
+
+
+# Quality gate statuses considered as failed
+FAILED_STATUSES = ('ERROR',)
+
+
+def read_projects(options):
+    """
+    Yield the project keys given as arguments and in the file (if any).
+    """
+    for key in options.projects:
+        yield key
+
+    if options.filename:
+        f = sys.stdin if options.filename == '-' else open(options.filename, 'r')
+        try:
+            for line in f:
+                key = line.strip()
+                if key:
+                    yield key
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def run(h, options, connections):
+    """
+    Check the quality gate status of projects concurrently using a
+    SonarAPIHandler instance, writing each result as soon as it's ready.
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if any project failed
+    """
+
+    # Counters (passed and failed)
+    p, f = 0, 0
+
+    # Check projects as they're read, stopping on failure if required
+    try:
+        results = h.get_quality_gates_status(read_projects(options),
+                                             workers=options.workers)
+        for key, project_status, error in results:
+            if error:
+                sys.stderr.write("Failed to check project {}: "
+                                 "{}\n".format(key, error))
+                f += 1
+            else:
+                sys.stdout.write("{}: {}\n".format(key, project_status['status']))
+                if project_status['status'] in FAILED_STATUSES:
+                    f += 1
+                else:
+                    p += 1
+
+            if f and options.fail_fast:
+                break
+
+    except Exception as e:
+        # Other errors, stop execution immediately
+        sys.stderr.write("Error: {}\n".format(e))
+        status = 'Incomplete'
+        f += 1
+
+    else:
+        # No errors, complete unless stopped
+        status = 'Incomplete' if f and options.fail_fast else 'Complete'
+
+    # Finally, write results
+    sys.stdout.write("{} quality gates check: {} passed and "
+                     "{} failed.\n".format(status, p, f))
+    return 1 if f else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options)
+    return run(h, options, connections)
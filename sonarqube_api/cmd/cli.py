@@ -0,0 +1,149 @@
+"""
+Utility to run any of the SonarQube commands, or a batch file of them, in a
+single process sharing the connections to the servers.
+"""
+import argparse
+import shlex
+import sys
+
+from sonarqube_api.cmd import (Connections, add_connection_arguments,
+                               connection_options)
+from sonarqube_api.cmd import (activate_rules, bulk_change_issues, bulk_projects,
+                               check_quality_gates, diff_rules, export_issues,
+                               export_rules, fetch_sources, import_rules,
+                               migrate_rules, sync_groups, sync_measures,
+                               sync_profiles)
+
+
+# Commands by name
+# Note: the connection arguments of the commands working with two servers
+# (migrate-rules and sync-profiles) are the target's
+COMMANDS = (
+    ('activate-rules', activate_rules),
+    ('bulk-change-issues', bulk_change_issues),
+    ('bulk-projects', bulk_projects),
+    ('check-quality-gates', check_quality_gates),
+    ('diff-rules', diff_rules),
+    ('export-issues', export_issues),
+    ('export-rules', export_rules),
+    ('fetch-sources', fetch_sources),
+    ('import-rules', import_rules),
+    ('migrate-rules', migrate_rules),
+    ('sync-groups', sync_groups),
+    ('sync-measures', sync_measures),
+    ('sync-profiles', sync_profiles),
+)
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Run SonarQube commands sharing '
+                                                 'the connections to the servers.')
+    add_connection_arguments(parser)
+    parser.add_argument('--pool-size', dest='pool_size', type=int,
+                        default=None,
+                        help='Maximum number of connections kept open per server')
+
+    # One subcommand per command, plus batch
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+    for name, module in COMMANDS:
+        summary = ' '.join(module.__doc__.split())
+        command_parser = subparsers.add_parser(name, help=summary, description=summary)
+        module.add_arguments(command_parser)
+        command_parser.set_defaults(run=module.run)
+
+    batch_parser = subparsers.add_parser('batch', help='Run the commands in a file, '
+                                                       'one per line')
+    batch_parser.add_argument('filename', type=str,
+                              help='File with one command line per line ("-" for stdin)')
+    batch_parser.add_argument('--keep-going', dest='keep_going', action='store_true',
+                              help='Run the remaining steps after a failed one')
+    batch_parser.set_defaults(run=run_batch)
+
+    return parser
+
+
+def run_step(parser, args, options, connections):
+    """
+    Run a step of a batch. Steps inherit the connection arguments of the
+    batch, unless they give their own.
+
+    :param parser: parser of the command line arguments
+    :param args: list of arguments of the step
+    :param options: parsed arguments of the batch
+    :param connections: Connections instance shared by the steps
+    :return: exit status of the step
+    """
+    step = argparse.Namespace(**connection_options(options))
+    try:
+        step = parser.parse_args(args, namespace=step)
+    except SystemExit:
+        # Invalid arguments (already reported by the parser)
+        return 2
+
+    if step.command == 'batch':
+        sys.stderr.write("Error: batches can't be nested\n")
+        return 2
+
+    try:
+        return step.run(connections.get(step), step, connections) or 0
+    except Exception as e:
+        sys.stderr.write("Error: {}\n".format(e))
+        return 1
+
+
+def run_batch(h, options, connections):
+    """
+    Run the commands in a batch file, one command line per line (ignoring
+    blank lines and comments), stopping on the first failed step unless
+    required to keep going.
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance shared by the steps
+    :return: exit status, 1 if any step failed
+    """
+    parser = build_parser()
+
+    # Counters (run and failed)
+    r, f = 0, 0
+    status = 'Complete'
+
+    batch_file = sys.stdin if options.filename == '-' else open(options.filename, 'r')
+    try:
+        for line in batch_file:
+            args = shlex.split(line, comments=True)
+            if not args:
+                continue
+
+            r += 1
+            sys.stdout.write("[{}] {}\n".format(r, line.strip()))
+            if run_step(parser, args, options, connections):
+                f += 1
+                if not options.keep_going:
+                    status = 'Incomplete'
+                    break
+    finally:
+        if batch_file is not sys.stdin:
+            batch_file.close()
+
+    # Finally, write results
+    sys.stdout.write("{} batch: {} steps run and {} failed.\n".format(status, r, f))
+    return 1 if f else 0
+
+
+def main():
+    """
+    Run a command (or batch), with handlers shared by all the steps.
+
+    :return: exit status of the command
+    """
+    options = build_parser().parse_args()
+    connections = Connections(pool_size=options.pool_size)
+    try:
+        return options.run(connections.get(options), options, connections) or 0
+    finally:
+        connections.close()
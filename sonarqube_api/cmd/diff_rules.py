@@ -0,0 +1,116 @@
+"""
+Utility to compare two snapshots of rules offline (as written by the export
+rules command).
+"""
+import argparse
+import json
+import os
+import sys
+
+from sonarqube_api.cmd import Connections
+from sonarqube_api.snapshots import ADDED, REMOVED, CHANGED, diff_snapshots, read_snapshot
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Snapshots arguments
+    parser.add_argument('old', type=str,
+                        help='Old snapshot file')
+    parser.add_argument('new', type=str,
+                        help='New snapshot file')
+
+    # Output options
+    parser.add_argument('--format', dest='format', type=str,
+                        default='text', choices=('text', 'jsonl'),
+                        help='Output format')
+    parser.add_argument('--exit-code', dest='exit_code', action='store_true',
+                        help='Exit with status 1 if there are differences')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Compare two snapshots of rules, '
+                                                 'without contacting any server.')
+    add_arguments(parser)
+
+    return parser
+
+
+# Text output prefixes by action
+PREFIXES = {ADDED: '+', REMOVED: '-', CHANGED: '~'}
+
+
+def format_change(change):
+    """
+    Return a change as text: the rule key (and name) of added and removed
+    rules, or the old and new values of each field of changed rules.
+    """
+    prefix = PREFIXES[change['action']]
+    if change['action'] != CHANGED:
+        return '{} {} ({})'.format(prefix, change['key'], change['rule'].get('name'))
+
+    fields = ('{} {} -> {}'.format(field, json.dumps(old), json.dumps(new))
+              for field, (old, new) in sorted(change['fields'].items()))
+    return '{} {}: {}'.format(prefix, change['key'], '; '.join(fields))
+
+
+def read_file(filename):
+    """
+    Read a snapshot file.
+    """
+    with open(os.path.expanduser(filename), 'r') as f:
+        return read_snapshot(f)
+
+
+def run(h, options, connections):
+    """
+    Compare two snapshots of rules, writing the added, removed and changed
+    rules (with the changed fields). The handler is not used.
+
+    :param h: SonarAPIHandler instance (unused)
+    :param options: parsed command line arguments
+    :param connections: Connections instance (unused)
+    :return: exit status, 2 if the command failed, or 1 if there are
+    differences (only if required)
+    """
+    # Counters (by action)
+    counts = {ADDED: 0, REMOVED: 0, CHANGED: 0}
+
+    try:
+        changes = diff_snapshots(read_file(options.old), read_file(options.new))
+        for change in changes:
+            counts[change['action']] += 1
+            if options.format == 'jsonl':
+                sys.stdout.write(json.dumps(change, sort_keys=True) + '\n')
+            else:
+                sys.stdout.write(format_change(change) + '\n')
+
+    except Exception as e:
+        # Errors (unreadable snapshots), stop execution immediately
+        sys.stderr.write("Error: {}\n".format(e))
+        status = 'Incomplete'
+
+    else:
+        # No errors, complete
+        status = 'Complete'
+
+    # Finally, write results
+    # Note: written to stderr with jsonl output, to keep it parseable
+    output = sys.stderr if options.format == 'jsonl' else sys.stdout
+    output.write("{} rules diff: {} added, {} removed and {} changed.\n".format(
+        status, counts[ADDED], counts[REMOVED], counts[CHANGED]))
+    if status != 'Complete':
+        return 2
+    return 1 if options.exit_code and any(counts.values()) else 0
+
+
+def main():
+    """
+    Run the command (no server connection needed).
+    """
+    options = build_parser().parse_args()
+    return run(None, options, Connections())
@@ -0,0 +1,129 @@
+"""
+Utility to export the issues on a SonarQube server.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from sonarqube_api.cmd import Connections, add_connection_arguments
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Output arguments
+    parser.add_argument('--output', dest='output', type=str,
+                        default='~/issues.jsonl',
+                        help='Output file')
+    parser.add_argument('--format', dest='format', type=str,
+                        default='jsonl', choices=('jsonl', 'csv'),
+                        help='Output format')
+
+    # Issue filtering options
+    parser.add_argument('--projects', dest='projects', type=str,
+                        default=None,
+                        help='Keys of the projects to filter issues')
+    parser.add_argument('--severities', dest='severities', type=str,
+                        default=None,
+                        help='Severities to filter issues')
+    parser.add_argument('--statuses', dest='statuses', type=str,
+                        default=None,
+                        help='Statuses to filter issues')
+    parser.add_argument('--types', dest='types', type=str,
+                        default=None,
+                        help='Types to filter issues')
+    parser.add_argument('--created-after', dest='created_after', type=str,
+                        default=None,
+                        help='Export issues created after the date (inclusive)')
+    parser.add_argument('--created-before', dest='created_before', type=str,
+                        default=None,
+                        help='Export issues created before the date (exclusive)')
+
+    # Concurrency options
+    parser.add_argument('--workers', dest='workers', type=int,
+                        default=4,
+                        help='Number of date windows to fetch in parallel')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Export issues from a SonarQube server')
+    add_connection_arguments(parser)
+    add_arguments(parser)
+
+    return parser
+
+
+# Fields exported to csv
+CSV_FIELDS = (
+    'key', 'rule', 'severity', 'status', 'resolution', 'type', 'project',
+    'component', 'line', 'message', 'author', 'assignee', 'creationDate',
+    'updateDate'
+)
+
+
+def run(h, options, connections):
+    """
+    Export a SonarQube's issues to a JSON lines or CSV file, using a
+    SonarAPIHandler connected to the given host.
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if the command failed
+    """
+
+    # Get the issues generator
+    issues = h.get_issues(projects=options.projects,
+                          severities=options.severities,
+                          statuses=options.statuses,
+                          types=options.types,
+                          created_after=options.created_after,
+                          created_before=options.created_before,
+                          workers=options.workers)
+
+    # Counter of exported issues
+    e = 0
+
+    # Write issues as they arrive
+    fn = os.path.expanduser(options.output)
+    with open(fn, 'w') as f:
+        if options.format == 'csv':
+            csv_w = csv.writer(f)
+            csv_w.writerow(CSV_FIELDS)
+            write = lambda i: csv_w.writerow([i.get(k, '') for k in CSV_FIELDS])
+        else:
+            write = lambda i: f.write(json.dumps(i, sort_keys=True) + '\n')
+
+        try:
+            for issue in issues:
+                write(issue)
+                e += 1
+
+        except Exception as exc:
+            # Errors, stop execution immediately
+            sys.stderr.write("Error: {}\n".format(exc))
+            status = 'Incomplete'
+
+        else:
+            # No errors, complete
+            status = 'Complete'
+
+    # Finally, write results
+    sys.stdout.write("{} issues export: {} exported.\n".format(status, e))
+    return 1 if status != 'Complete' else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options)
+    return run(h, options, connections)
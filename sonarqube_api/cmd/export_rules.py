@@ -4,48 +4,60 @@ Utility to export the rules on a SonarQube server.
 import argparse
 import csv
 import os
+import re
 import sys
 
-from sonarqube_api.api import SonarAPIHandler
-from sonarqube_api.utils import utf_encode
-
-
-parser = argparse.ArgumentParser(description='Export rules from a SonarQube server')
-
-# Connection arguments
-parser.add_argument('--host', dest='host', type=str,
-                    default='http://localhost',
-                    help='Host of the SonarQube server')
-parser.add_argument('--port', dest='port', type=str,
-                    default='9000',
-                    help='Port of the SonarQube server instance')
-parser.add_argument('--user', dest='user', type=str,
-                    default=None,
-                    help='Authentication user')
-parser.add_argument('--password', dest='password', type=str,
-                    default=None,
-                    help='Authentication password')
-parser.add_argument('--authtoken', dest='authtoken', type=str,
-                    default=None,
-                    help='Authentication token')
-parser.add_argument('--basepath', dest='basepath', type=str,
-                    default=None,
-                    help='The base-path of the Sonar installation. Defaults to "/"')
-
-# Output directory argument
-parser.add_argument('--output-dir', dest='output', type=str,
-                    default='~',
-                    help='Output file')
-
-# Rule filtering options
-parser.add_argument('--active-only', dest='active', action='store_true',
-                    help='Export only active rules')
-parser.add_argument('--profile', dest='profile', type=str,
-                    default='',
-                    help='Export only rules for a given profile')
-parser.add_argument('--languages', dest='languages', type=str,
-                    default='',
-                    help='Language to filter the rules to export')
+from sonarqube_api.cmd import Connections, add_connection_arguments
+from sonarqube_api.exceptions import SearchWindowError
+from sonarqube_api.snapshots import dump_rule, write_snapshot
+from sonarqube_api.utils import parallel_imap, utf_encode
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Output directory argument
+    parser.add_argument('--output-dir', dest='output', type=str,
+                        default='~',
+                        help='Output file')
+    parser.add_argument('--snapshot', dest='snapshot', type=str,
+                        default=None,
+                        help='Also write a snapshot of the rules to the file (to '
+                             'compare with diff-sonarqube-rules)')
+
+    # Rule filtering options
+    parser.add_argument('--active-only', dest='active', action='store_true',
+                        help='Export only active rules')
+    parser.add_argument('--profile', dest='profile', type=str,
+                        default='',
+                        help='Export only rules for a given profile')
+    parser.add_argument('--languages', dest='languages', type=str,
+                        default='',
+                        help='Language to filter the rules to export')
+
+    # Sharding options
+    parser.add_argument('--shard-by', dest='shard_by', type=str,
+                        default=None, choices=('language', 'repository'),
+                        help='Export one file per language or repository')
+    parser.add_argument('--jobs', dest='jobs', type=int,
+                        default=4,
+                        help='Number of shards to fetch in parallel')
+    parser.add_argument('--processes', dest='processes', type=int,
+                        default=None,
+                        help='Number of processes to render shards (defaults to '
+                             'the number of CPUs)')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Export rules from a SonarQube server')
+    add_connection_arguments(parser)
+    add_arguments(parser)
+
+    return parser
 
 
 # HTML rule section template
@@ -54,16 +66,196 @@ HTML_RULE_TEMPLATE = u'<h1 id="{}">{}</h1><dl><dt>Language</dt><dd>{}</dd>'\
                      u'<dt>Debt</dt><dd>{}</dd><dt>Parameters</dt><dd>{}</dd>'\
                      u'</dl><div>{}</div><hr>'
 
+# HTML index entry template
+HTML_INDEX_TEMPLATE = u'<li><a href="{}">{}</a> ({} rules)</li>'
 
-def main():
+# Facets and rule filters used to shard the export
+SHARD_FACETS = {
+    'language': ('languages', 'languages'),
+    'repository': ('repositories', 'repositories'),
+}
+
+
+def render_rule(rule):
+    """
+    Render a rule as a csv row and an html section.
+
+    :param rule: rule data dict
+    :return: tuple of csv row (list) and html (str)
+    """
+    # Note: debt can be in diff. fields depending on type
+    debt = rule.get('debtRemFnOffset', rule.get('debtRemFnCoeff', u'-'))
+    row = [rule['langName'], rule['key'], rule['name'], debt, rule['severity']]
+
+    # Render parameters sublist
+    params_htmls = []
+    if rule['params']:
+        for param in rule['params']:
+            params_htmls.append(u'<li>{}: {}</li>'.format(
+                param.get('key', u'-'),
+                param.get('defaultValue', u'-')
+            ))
+    else:
+        params_htmls.append(u'-')
+
+    # Build values to write in html
+    values = (
+        rule['key'], rule['name'], rule['langName'],
+        rule['key'], rule['severity'], debt,
+        u''.join(params_htmls), rule.get('htmlDesc', u'-')
+    )
+
+    # Render html
+    html = utf_encode(HTML_RULE_TEMPLATE.format(*values))
+    return row, html
+
+
+def _render_rule_safe(rule):
+    """
+    Render a rule in a worker process, returning missing keys instead of
+    raising KeyError.
+
+    :param rule: rule data dict
+    :return: tuple of csv row, html and missing keys
     """
-    Export a SonarQube's rules to a CSV and an HTML file, using a
-    SonarAPIHandler connected to the given host.
+    try:
+        row, html = render_rule(rule)
+        return row, html, None
+    except KeyError as exc:
+        return None, None, exc.args
+
+
+def _shard_filename(prefix, shard, extension):
+    """
+    Return a safe file name for the given shard.
     """
-    options = parser.parse_args()
-    h = SonarAPIHandler(host=options.host, port=options.port,
-                        user=options.user, password=options.password,
-                        token=options.authtoken, base_path=options.basepath)
+    return '{}-{}.{}'.format(prefix, re.sub(r'[^\w.-]', '_', shard), extension)
+
+
+def export_shards(h, options, snapshot_f=None):
+    """
+    Export rules into one csv and html file per shard (language or
+    repository), plus an html index. Shards are fetched in parallel using
+    threads, and rules rendered using a pool of processes.
+
+    :param h: SonarAPIHandler instance
+    :param options: parsed command options
+    :param snapshot_f: file to write the snapshot of the rules (optional)
+    :return: tuple of exported and failed counters
+    """
+    facet, rule_filter = SHARD_FACETS[options.shard_by]
+    shards = h.get_rules_facet(facet, options.active, options.profile,
+                               options.languages)
+
+    # Note: facets count all values, so keep only the languages required
+    if rule_filter == 'languages' and options.languages:
+        languages = set(l.strip().lower() for l in options.languages.split(','))
+        shards = [shard for shard in shards if shard[0].lower() in languages]
+
+    # Rules without a value for the facet (or beyond the values returned)
+    # would be missed
+    total = h.count_rules(active_only=options.active, profile=options.profile,
+                          languages=options.languages)
+    covered = sum(n for _, n in shards)
+    if covered < total:
+        raise SearchWindowError("Shards by {} cover {} of the {} rules".format(
+            options.shard_by, covered, total))
+
+    def fetch(shard):
+        # Fetch all rules of a shard (runs in a thread)
+        filters = {'active_only': options.active, 'profile': options.profile,
+                   'languages': options.languages}
+        filters[rule_filter] = shard[0]
+        return shard[0], list(h.get_rules(**filters))
+
+    # Render with a process pool only if it makes sense
+    # Note: multiprocessing is only imported when sharding
+    import multiprocessing
+    processes = options.processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
+
+    def render(rules):
+        # Render rules, in chunks of several per task when using processes
+        if not pool:
+            return map(_render_rule_safe, rules)
+        chunksize = len(rules) // (processes * 4) or 1
+        return pool.imap(_render_rule_safe, rules, chunksize)
+
+    # Counters (exported and failed) and index entries
+    s, f = 0, 0
+    index = []
+    try:
+        for shard, rules in parallel_imap(fetch, shards, options.jobs):
+            if snapshot_f is not None:
+                write_snapshot(rules, snapshot_f)
+
+            csv_fn = _shard_filename('rules', shard, 'csv')
+            html_fn = _shard_filename('rules', shard, 'html')
+            csv_path = os.path.expanduser(os.path.join(options.output, csv_fn))
+            html_path = os.path.expanduser(os.path.join(options.output, html_fn))
+
+            with open(csv_path, 'w') as csv_f, open(html_path, 'w') as html_f:
+                csv_w = csv.writer(csv_f)
+                csv_w.writerow(['language', 'key', 'name', 'debt', 'severity'])
+                html_f.write(u'<html><body>')
+
+                n = 0
+                for row, html, missing in render(rules):
+                    if missing:
+                        sys.stderr.write("Error: missing values for "
+                                         "{}\n".format(','.join(missing)))
+                        f += 1
+                    else:
+                        csv_w.writerow(row)
+                        html_f.write(html)
+                        n += 1
+
+                html_f.write(u'</body></html>')
+
+            index.append((shard, html_fn, n))
+            s += n
+
+    finally:
+        if pool:
+            pool.terminate()
+
+    # Write the index of shards
+    index_fn = os.path.expanduser(os.path.join(options.output, 'index.html'))
+    with open(index_fn, 'w') as index_f:
+        index_f.write(u'<html><body><ul>')
+        for shard, html_fn, n in sorted(index):
+            index_f.write(utf_encode(HTML_INDEX_TEMPLATE.format(html_fn, shard, n)))
+        index_f.write(u'</ul></body></html>')
+
+    return s, f
+
+
+def export(h, options, snapshot_f=None):
+    """
+    Export the rules into a csv and an html file (or one per shard), and
+    the snapshot file if any, writing the results.
+
+    :param h: SonarAPIHandler instance
+    :param options: parsed command options
+    :param snapshot_f: file to write the snapshot of the rules (optional)
+    :return: exit status, 1 if the export failed
+    """
+    if options.shard_by:
+        # Sharded export, one file per shard
+        try:
+            s, f = export_shards(h, options, snapshot_f)
+
+        except Exception as exc:
+            sys.stderr.write("Error: {}\n".format(exc))
+            status = 'Incomplete'
+            s, f = 0, 0
+
+        else:
+            status = 'Complete'
+
+        sys.stdout.write("{} rules export: {} exported and "
+                         "{} failed.\n".format(status, s, f))
+        return 1 if f or status != 'Complete' else 0
 
     # Determine output csv and html file names
     csv_fn = os.path.expanduser(os.path.join(options.output, 'rules.csv'))
@@ -89,39 +281,13 @@ def main():
         # Now import and keep count
         try:
             for rule in rules:
+                if snapshot_f is not None and 'key' in rule:
+                    snapshot_f.write(dump_rule(rule))
+
                 try:
-                    # Write CSV row
-                    csv_w.writerow([
-                        rule['langName'],
-                        rule['key'],
-                        rule['name'],
-                        # Note: debt can be in diff. fields depending on type
-                        rule.get('debtRemFnOffset',
-                                 rule.get('debtRemFnCoeff', u'-')),
-                        rule['severity']
-                    ])
-
-                    # Render parameters sublist
-                    params_htmls = []
-                    if rule['params']:
-                        for param in rule['params']:
-                            params_htmls.append(u'<li>{}: {}</li>'.format(
-                                param.get('key', u'-'),
-                                param.get('defaultValue', u'-')
-                            ))
-                    else:
-                        params_htmls.append(u'-')
-
-                    # Build values to write in html
-                    values = (
-                        rule['key'], rule['name'], rule['langName'],
-                        rule['key'], rule['severity'],
-                        rule.get('debtRemFnOffset', rule.get('debtRemFnCoeff', u'-')),
-                        u''.join(params_htmls), rule.get('htmlDesc', u'-')
-                    )
-
-                    # Render html and write to file
-                    html = utf_encode(HTML_RULE_TEMPLATE.format(*values))
+                    # Render rule, write csv row and html
+                    row, html = render_rule(rule)
+                    csv_w.writerow(row)
                     html_f.write(html)
                     s += 1
 
@@ -145,3 +311,36 @@ def main():
         # Finally, write results
         sys.stdout.write("{} rules export: {} exported and "
                          "{} failed.\n".format(status, s, f))
+    return 1 if f or status != 'Complete' else 0
+
+
+def run(h, options, connections):
+    """
+    Export a SonarQube's rules to a CSV and an HTML file (and a snapshot, if
+    required), using a SonarAPIHandler connected to the given host.
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if the command failed
+    """
+    snapshot_f = None
+    if options.snapshot:
+        snapshot_f = open(os.path.expanduser(options.snapshot), 'w')
+    try:
+        return export(h, options, snapshot_f)
+    finally:
+        if snapshot_f is not None:
+            snapshot_f.close()
+
+
+def main():
+    """
+    Run the command with a handler connected to the given server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options)
+    # Note: failed rules don't change the exit status of the script (only
+    # of batch steps)
+    run(h, options, connections)
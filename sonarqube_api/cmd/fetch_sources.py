@@ -0,0 +1,178 @@
+"""
+Utility to download the raw sources of files on a SonarQube server into a
+local cache.
+"""
+import argparse
+import os
+import shutil
+import sys
+
+from sonarqube_api.cmd import Connections, add_connection_arguments
+from sonarqube_api.sources import CACHED, SourceCache, fetch_sources, issue_components
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Components arguments
+    parser.add_argument('components', type=str, nargs='*',
+                        help='Keys of the files to fetch')
+    parser.add_argument('--file', dest='filename', type=str,
+                        default=None,
+                        help='File with one file key per line ("-" for stdin)')
+    parser.add_argument('--from-issues', dest='from_issues', action='store_true',
+                        help='Fetch the files with issues (see issue filters)')
+
+    # Issue filtering options
+    parser.add_argument('--projects', dest='projects', type=str,
+                        default=None,
+                        help='Keys of the projects to filter issues')
+    parser.add_argument('--severities', dest='severities', type=str,
+                        default=None,
+                        help='Severities to filter issues')
+    parser.add_argument('--statuses', dest='statuses', type=str,
+                        default=None,
+                        help='Statuses to filter issues')
+    parser.add_argument('--types', dest='types', type=str,
+                        default=None,
+                        help='Types to filter issues')
+
+    # Cache and output arguments
+    parser.add_argument('--cache-dir', dest='cache_dir', type=str,
+                        default='~/.sonarqube/sources',
+                        help='Directory of the sources cache')
+    parser.add_argument('--output-dir', dest='output', type=str,
+                        default=None,
+                        help='Also copy the sources to the directory (as '
+                             '<project>/<path>)')
+
+    # Concurrency options
+    parser.add_argument('--workers', dest='workers', type=int,
+                        default=8,
+                        help='Number of files to download in parallel')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Download raw sources from a '
+                                                 'SonarQube server into a local cache.')
+    add_connection_arguments(parser)
+    add_arguments(parser)
+
+    return parser
+
+
+def read_keys(options):
+    """
+    Yield the file keys given as arguments and in the file (if any).
+    """
+    for key in options.components:
+        yield key
+
+    if options.filename:
+        f = sys.stdin if options.filename == '-' else open(options.filename, 'r')
+        try:
+            for line in f:
+                key = line.strip()
+                if key:
+                    yield key
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def read_components(h, options):
+    """
+    Yield the files given as arguments, in the file (if any) and with
+    issues (if required), once each.
+    """
+    seen = set()
+    for item in read_keys(options):
+        if item not in seen:
+            seen.add(item)
+            yield item
+
+    if options.from_issues:
+        for item in issue_components(h, projects=options.projects,
+                                     severities=options.severities,
+                                     statuses=options.statuses,
+                                     types=options.types, workers=options.workers):
+            if item[0] not in seen:
+                seen.add(item[0])
+                yield item
+
+
+def output_path(output, component):
+    """
+    Return the path to copy the source of a file to, as <project>/<path>
+    under the output directory (ignoring relative parts of the key).
+    """
+    parts = [p for p in component.replace(':', '/').split('/') if p not in ('', '.', '..')]
+    return os.path.join(output, *parts)
+
+
+def run(h, options, connections):
+    """
+    Download the raw sources of files concurrently into a local cache,
+    skipping the ones already cached for the last analysis, using a
+    SonarAPIHandler instance.
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if any file failed
+    """
+    cache = SourceCache(os.path.expanduser(options.cache_dir))
+    output = os.path.expanduser(options.output) if options.output else None
+
+    # Counters (downloaded, cached and failed)
+    d, c, f = 0, 0, 0
+
+    # Fetch sources as they're read
+    try:
+        results = fetch_sources(h, read_components(h, options), cache,
+                                workers=options.workers)
+        for key, digest, result, error in results:
+            if error:
+                sys.stderr.write("Failed to fetch source of {}: "
+                                 "{}\n".format(key, error))
+                f += 1
+                continue
+
+            if result == CACHED:
+                c += 1
+            else:
+                d += 1
+
+            if output:
+                path = output_path(output, key)
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                shutil.copyfile(cache.object_path(digest), path)
+
+    except Exception as e:
+        # Other errors, stop execution immediately
+        sys.stderr.write("Error: {}\n".format(e))
+        status = 'Incomplete'
+
+    else:
+        # No errors, complete
+        status = 'Complete'
+
+    # Finally, write results
+    sys.stdout.write("{} sources fetch: {} downloaded, {} cached and "
+                     "{} failed.\n".format(status, d, c, f))
+    return 1 if f or status != 'Complete' else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options, pool_size=options.workers)
+    return run(h, options, connections)
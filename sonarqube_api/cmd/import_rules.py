@@ -0,0 +1,157 @@
+"""
+Utility to import custom rules from a file into a SonarQube server.
+"""
+import argparse
+import csv
+import json
+import sys
+
+from sonarqube_api.api import ValidationError
+from sonarqube_api.cmd import Connections, add_connection_arguments
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Rules argument
+    parser.add_argument('filename', type=str, nargs='?',
+                        default='-',
+                        help='CSV or JSONL file with the rules definitions (defaults to stdin)')
+    parser.add_argument('--format', dest='format', type=str,
+                        default=None, choices=('csv', 'jsonl'),
+                        help='Format of the file (defaults to the file extension, or csv)')
+
+    # Import options
+    parser.add_argument('--workers', dest='workers', type=int,
+                        default=4,
+                        help='Number of rules to create in parallel')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Import custom rules from a file '
+                                                 'into a SonarQube server.')
+    add_connection_arguments(parser)
+    add_arguments(parser)
+
+    return parser
+
+
+# Rule definition fields, and valid severities and statuses
+FIELDS = ('key', 'name', 'description', 'message', 'xpath', 'severity',
+          'status', 'template_key')
+SEVERITIES = ('INFO', 'MINOR', 'MAJOR', 'CRITICAL', 'BLOCKER')
+STATUSES = ('BETA', 'DEPRECATED', 'READY')
+
+
+def read_rules(f, file_format):
+    """
+    Yield the rule definitions in a CSV (with headers) or JSONL file.
+    """
+    if file_format == 'jsonl':
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        for row in csv.DictReader(f):
+            yield row
+
+
+def validate_rule(rule):
+    """
+    Check a rule definition locally, normalizing severity and status.
+
+    :param rule: rule definition dict
+    :return: rule definition dict
+    :raises ValidationError: if the definition is invalid
+    """
+    missing = [field for field in FIELDS if not rule.get(field)]
+    if missing:
+        raise ValidationError('Missing {}'.format(', '.join(missing)))
+
+    rule = dict(rule, severity=rule['severity'].upper(), status=rule['status'].upper())
+    if rule['severity'] not in SEVERITIES:
+        raise ValidationError('Invalid severity {}, must be one of: '
+                              '{}'.format(rule['severity'], ', '.join(SEVERITIES)))
+    if rule['status'] not in STATUSES:
+        raise ValidationError('Invalid status {}, must be one of: '
+                              '{}'.format(rule['status'], ', '.join(STATUSES)))
+    if rule['template_key'].count(':') != 1 or rule['template_key'].startswith(':') \
+            or rule['template_key'].endswith(':'):
+        raise ValidationError('Invalid template key {}, must be '
+                              'repository:key'.format(rule['template_key']))
+    return rule
+
+
+def run(h, options, connections):
+    """
+    Import custom rules from a file using a SonarAPIHandler instance,
+    creating them concurrently.
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if the command failed
+    """
+
+    # Counters (created, skipped and failed)
+    counts = {'created': 0, 'skipped': 0, 'failed': 0}
+
+    def valid_rules(rules):
+        # Yield valid definitions, failing invalid ones without requests
+        for n, rule in enumerate(rules, 1):
+            try:
+                yield validate_rule(rule)
+            except ValidationError as e:
+                counts['failed'] += 1
+                sys.stderr.write("Invalid rule {}: {}\n".format(rule.get('key') or '#{}'.format(n), e))
+
+    # Read file (or stdin) and import
+    try:
+        file_format = options.format or \
+            ('jsonl' if options.filename.endswith(('.jsonl', '.json')) else 'csv')
+        f = sys.stdin if options.filename == '-' else open(options.filename, 'r')
+        try:
+            rules = valid_rules(read_rules(f, file_format))
+            for rule, error in h.create_rules(rules, workers=options.workers):
+                if error is None:
+                    counts['created'] += 1
+                elif isinstance(error, ValidationError) and 'already exists' in str(error):
+                    # Rule already exists, skip
+                    counts['skipped'] += 1
+                else:
+                    # Invalid data for rule creation, fail
+                    counts['failed'] += 1
+                    sys.stderr.write("Failed to create rule {}: "
+                                     "{}\n".format(rule['key'], error))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+    except Exception as e:
+        # Other errors, stop execution immediately
+        sys.stderr.write("Error: {}\n".format(e))
+        status = 'Incomplete'
+
+    else:
+        # No errors, write result
+        status = 'Complete'
+
+    # Finally, write results
+    sys.stdout.write("{} rules import: {} created, {} skipped (already "
+                     "existing) and {} failed.\n".format(status, counts['created'],
+                                                         counts['skipped'], counts['failed']))
+    return 1 if counts['failed'] or status != 'Complete' else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options, pool_size=options.workers)
+    return run(h, options, connections)
@@ -4,65 +4,41 @@ Utility to migrate custom rules from one SonarQube server to another one.
 import argparse
 import sys
 
-from sonarqube_api.api import SonarAPIHandler, ValidationError
-
-
-parser = argparse.ArgumentParser(description='Migrate custom rules from one '
-                                             'SonarQube server to another')
-
-# Source connection arguments
-parser.add_argument('--source-host', dest='source_host', type=str,
-                    default='http://localhost',
-                    help='Host of the source SonarQube server')
-parser.add_argument('--source-port', dest='source_port', type=str,
-                    default='9000',
-                    help='Port of the source SonarQube server instance')
-parser.add_argument('--source-user', dest='source_user', type=str,
-                    default=None,
-                    help='Authentication user for source server')
-parser.add_argument('--source-password', dest='source_password', type=str,
-                    default=None,
-                    help='Authentication password for source server')
-parser.add_argument('--source-authtoken', dest='source_authtoken', type=str,
-                    default=None,
-                    help='Authentication token for source server')
-parser.add_argument('--source-basepath', dest='source_basepath', type=str,
-                    default=None,
-                    help='The base-path of the source Sonar installation. Defaults to "/"')
-
-# Target connection arguments
-parser.add_argument('--target-host', dest='target_host', type=str,
-                    default='http://localhost',
-                    help='Host of the target SonarQube server')
-parser.add_argument('--target-port', dest='target_port', type=str,
-                    default='9000',
-                    help='Port of the target SonarQube server instance')
-parser.add_argument('--target-user', dest='target_user', type=str,
-                    default=None,
-                    help='Authentication user for target server')
-parser.add_argument('--target-password', dest='target_password', type=str,
-                    default=None,
-                    help='Authentication password for target server')
-parser.add_argument('--target-authtoken', dest='target_authtoken', type=str,
-                    default=None,
-                    help='Authentication token for target server')
-parser.add_argument('--target-basepath', dest='target_basepath', type=str,
-                    default=None,
-                    help='The base-path of the target Sonar installation. Defaults to "/"')
+from sonarqube_api.api import ValidationError
+from sonarqube_api.cmd import Connections, add_connection_arguments
 
 
-def main():
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Source connection arguments
+    add_connection_arguments(parser, 'source')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Migrate custom rules from one '
+                                                 'SonarQube server to another')
+    add_connection_arguments(parser, 'target')
+    add_arguments(parser)
+
+    return parser
+
+
+def run(h, options, connections):
     """
     Migrate custom rules from one server to another one using two
     SonarAPIHandler instances.
+
+    :param h: SonarAPIHandler instance connected to the target server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if the command failed
     """
-    options = parser.parse_args()
-    sh = SonarAPIHandler(host=options.source_host, port=options.source_port,
-                         user=options.source_user, password=options.source_password,
-                         token=options.source_authtoken, base_path=options.source_basepath)
-    th = SonarAPIHandler(host=options.target_host, port=options.target_port,
-                         user=options.target_user, password=options.target_password,
-                         token=options.target_authtoken, base_path=options.target_basepath)
+    sh = connections.get(options, 'source')
 
     # Get the generator of source rules
     rules = sh.get_rules(active_only=True, custom_only=True)
@@ -89,9 +65,9 @@ def main():
                             xpath = p['defaultValue']
 
                     # Now create it and increase counter
-                    th.create_rule(key, rule['name'], rule['mdDesc'], message,
-                                   xpath, rule['severity'], rule['status'],
-                                   rule['templateKey'])
+                    h.create_rule(key, rule['name'], rule['mdDesc'], message,
+                                  xpath, rule['severity'], rule['status'],
+                                  rule['templateKey'])
                     c += 1
 
                 except ValidationError as e:
@@ -118,3 +94,16 @@ def main():
     # Finally, write results
     sys.stdout.write("{} rules migration: {} created, {} skipped (already "
                      "existing) and {} failed.\n".format(status, c, s, f))
+    return 1 if f or status != 'Complete' else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given target server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options, 'target')
+    # Note: failed rules don't change the exit status of the script (only
+    # of batch steps)
+    run(h, options, connections)
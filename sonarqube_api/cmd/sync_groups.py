@@ -0,0 +1,172 @@
+"""
+Utility to sync the members and permissions of groups of users in a
+SonarQube server with a directory's.
+"""
+import argparse
+import csv
+import json
+import sys
+
+from sonarqube_api.cmd import Connections, add_connection_arguments
+from sonarqube_api.groups import (ADD_MEMBER, CREATE_GROUP, CREATE_USER, GRANT,
+                                  REMOVE_MEMBER, REVOKE, sync_groups)
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Groups arguments
+    parser.add_argument('filename', type=str, nargs='?',
+                        default='-',
+                        help='File with the groups to sync (defaults to stdin)')
+    parser.add_argument('--format', dest='format', type=str,
+                        default='jsonl', choices=('jsonl', 'csv'),
+                        help='Format of the file (one group per line, or one '
+                             'membership per row)')
+
+    # Sync options
+    parser.add_argument('--create-users', dest='create_users', action='store_true',
+                        help='Create the members that don\'t exist yet (as '
+                             'externally authenticated users)')
+    parser.add_argument('--dry-run', dest='dry_run', action='store_true',
+                        help='Only write the changes to apply, without applying them')
+    parser.add_argument('--workers', dest='workers', type=int,
+                        default=8,
+                        help='Number of requests to send in parallel')
+    parser.add_argument('--rate', dest='rate', type=float,
+                        default=20.0,
+                        help='Maximum number of changes applied per second (0 '
+                             'for unlimited)')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Sync the members and permissions '
+                                                 'of groups in a SonarQube server.')
+    add_connection_arguments(parser)
+    add_arguments(parser)
+
+    return parser
+
+
+def read_groups(f, file_format):
+    """
+    Read the groups to sync from a file, as jsonl (one group per line, with
+    group, members and permissions, the last two optional) or csv (one
+    membership per row, with group, login and optional permission columns).
+    Members and permissions not given are left as they are.
+
+    :param f: file object
+    :param file_format: format of the file (jsonl or csv)
+    :return: dict of group name to dict with members and permissions (sets,
+    or None if not given)
+    """
+    groups = {}
+    if file_format == 'csv':
+        for row in csv.DictReader(f):
+            spec = groups.setdefault(row['group'], {'members': set(), 'permissions': None})
+            if row.get('login'):
+                spec['members'].add(row['login'])
+            if row.get('permission'):
+                spec['permissions'] = (spec['permissions'] or set()) | {row['permission']}
+        return groups
+
+    for line in f:
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        spec = groups.setdefault(data['group'], {'members': None, 'permissions': None})
+        for field in ('members', 'permissions'):
+            if data.get(field) is not None:
+                spec[field] = (spec[field] or set()) | set(data[field])
+    return groups
+
+
+def format_change(change):
+    """
+    Return a change of a sync plan as a line of text.
+    """
+    action = change['action']
+    if action == CREATE_USER:
+        return 'create user {}'.format(change['login'])
+    if action == CREATE_GROUP:
+        return 'create group {}'.format(change['group'])
+    if action == ADD_MEMBER:
+        return 'add {} to {}'.format(change['login'], change['group'])
+    if action == REMOVE_MEMBER:
+        return 'remove {} from {}'.format(change['login'], change['group'])
+    if action == GRANT:
+        return 'grant {} to {}'.format(change['permission'], change['group'])
+    return 'revoke {} from {}'.format(change['permission'], change['group'])
+
+
+def run(h, options, connections):
+    """
+    Sync groups with the ones in a file using a SonarAPIHandler instance,
+    applying only the needed changes (or writing them).
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if any change failed
+    """
+
+    # Counters (by action, and failed)
+    counts = dict.fromkeys((CREATE_USER, CREATE_GROUP, ADD_MEMBER, REMOVE_MEMBER,
+                            GRANT, REVOKE), 0)
+    f = 0
+
+    # Read groups (from file or stdin), compute the plan and apply it
+    # (unless dry run)
+    try:
+        fp = sys.stdin if options.filename == '-' else open(options.filename, 'r')
+        try:
+            groups = read_groups(fp, options.format)
+        finally:
+            if fp is not sys.stdin:
+                fp.close()
+
+        plan, results = sync_groups(h, groups, create_users=options.create_users,
+                                    dry_run=options.dry_run, workers=options.workers,
+                                    rate=options.rate)
+        if options.dry_run:
+            for change in plan:
+                sys.stdout.write(format_change(change) + '\n')
+                counts[change['action']] += 1
+
+        for change, error in results:
+            if error:
+                sys.stderr.write("Failed to {}: {}\n".format(format_change(change), error))
+                f += 1
+            else:
+                counts[change['action']] += 1
+
+    except Exception as e:
+        # Other errors, stop execution immediately
+        sys.stderr.write("Error: {}\n".format(e))
+        status = 'Incomplete'
+
+    else:
+        # No errors, complete
+        status = 'Planned' if options.dry_run else 'Complete'
+
+    # Finally, write results
+    sys.stdout.write("{} groups sync: {} users created, {} groups created, {} members "
+                     "added, {} removed, {} permissions granted, {} revoked and {} "
+                     "failed.\n".format(status, counts[CREATE_USER], counts[CREATE_GROUP],
+                                        counts[ADD_MEMBER], counts[REMOVE_MEMBER],
+                                        counts[GRANT], counts[REVOKE], f))
+    return 1 if f or status == 'Incomplete' else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options, pool_size=options.workers)
+    return run(h, options, connections)
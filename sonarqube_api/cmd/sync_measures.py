@@ -0,0 +1,95 @@
+"""
+Utility to sync the measures on a SonarQube server into a local SQLite
+database.
+"""
+import argparse
+import os
+import sys
+
+from sonarqube_api.cmd import Connections, add_connection_arguments
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Database argument
+    parser.add_argument('--database', dest='database', type=str,
+                        default='~/sonarqube.db',
+                        help='SQLite database file')
+
+    # Measures options
+    parser.add_argument('--metrics', dest='metrics', type=str,
+                        default=None,
+                        help='Comma-separated metrics to sync (defaults to general metrics)')
+    parser.add_argument('--include-modules', dest='modules', action='store_true',
+                        help='Sync modules too')
+    parser.add_argument('--batch-size', dest='batch_size', type=int,
+                        default=None,
+                        help='Number of resources inserted per transaction')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Sync measures from a SonarQube '
+                                                 'server into a SQLite database')
+    add_connection_arguments(parser)
+    add_arguments(parser)
+
+    return parser
+
+
+def run(h, options, connections):
+    """
+    Sync the resources measures into a SQLite database using a
+    SonarAPIHandler connected to the given host.
+
+    :param h: SonarAPIHandler instance connected to the server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if the command failed
+    """
+
+    # Get the resources generator
+    metrics = options.metrics.split(',') if options.metrics else None
+    resources = h.get_resources_full_data(metrics=metrics,
+                                          include_modules=options.modules)
+
+    # Counters (resources and measures)
+    r, m = 0, 0
+
+    # Open database and sync
+    # Note: sqlite3 is only imported when syncing
+    from sonarqube_api.warehouse import MeasuresWarehouse
+    warehouse = MeasuresWarehouse(os.path.expanduser(options.database))
+    try:
+        r, m = warehouse.sync(resources, batch_size=options.batch_size)
+
+    except Exception as e:
+        # Errors, stop execution immediately
+        sys.stderr.write("Error: {}\n".format(e))
+        status = 'Incomplete'
+
+    else:
+        # No errors, complete
+        status = 'Complete'
+
+    finally:
+        warehouse.close()
+
+    # Finally, write results
+    sys.stdout.write("{} measures sync: {} resources and {} measures "
+                     "synced.\n".format(status, r, m))
+    return 1 if status != 'Complete' else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options)
+    return run(h, options, connections)
@@ -0,0 +1,114 @@
+"""
+Utility to sync a quality profile with another one, on the same or different
+SonarQube servers.
+"""
+import argparse
+import sys
+
+from sonarqube_api.cmd import Connections, add_connection_arguments
+from sonarqube_api.profiles import ACTIVATE, UPDATE, DEACTIVATE, sync_profiles
+
+
+def add_arguments(parser):
+    """
+    Add the arguments of the command to a parser.
+    """
+    # Profiles arguments
+    parser.add_argument('source_profile', type=str,
+                        help='Key of the source profile')
+    parser.add_argument('target_profile', type=str,
+                        help='Key of the target profile to sync')
+
+    # Source connection arguments
+    add_connection_arguments(parser, 'source')
+
+    # Sync options
+    parser.add_argument('--dry-run', dest='dry_run', action='store_true',
+                        help='Only write the changes to apply, without applying them')
+    parser.add_argument('--workers', dest='workers', type=int,
+                        default=4,
+                        help='Number of changes to apply in parallel')
+
+
+def build_parser():
+    """
+    Build the parser of the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Sync a quality profile with another one, '
+                                                 'on the same or different SonarQube servers')
+    add_connection_arguments(parser, 'target')
+    add_arguments(parser)
+
+    return parser
+
+
+def format_change(change):
+    """
+    Return a change of a sync plan as a line of text.
+    """
+    if change['action'] == DEACTIVATE:
+        return '{} {}'.format(change['action'], change['rule'])
+    params = ';'.join('{}={}'.format(k, v) for k, v in sorted(change['params'].items()))
+    return '{} {} (severity {}{})'.format(change['action'], change['rule'],
+                                          change['severity'],
+                                          ', params ' + params if params else '')
+
+
+def run(h, options, connections):
+    """
+    Sync a quality profile with another one using two SonarAPIHandler
+    instances, applying only the needed changes (or writing them).
+
+    :param h: SonarAPIHandler instance connected to the target server
+    :param options: parsed command line arguments
+    :param connections: Connections instance, to get other servers' handlers
+    :return: exit status, 1 if any change failed
+    """
+    sh = connections.get(options, 'source')
+
+    # Counters (by action, and failed)
+    counts = {ACTIVATE: 0, UPDATE: 0, DEACTIVATE: 0}
+    f = 0
+
+    # Compute the plan and apply it (unless dry run)
+    try:
+        plan, results = sync_profiles(sh, options.source_profile, h,
+                                      options.target_profile,
+                                      dry_run=options.dry_run,
+                                      workers=options.workers)
+        if options.dry_run:
+            for change in plan:
+                sys.stdout.write(format_change(change) + '\n')
+                counts[change['action']] += 1
+
+        for change, error in results:
+            if error:
+                sys.stderr.write("Failed to {}: {}\n".format(format_change(change), error))
+                f += 1
+            else:
+                counts[change['action']] += 1
+
+    except Exception as e:
+        # Other errors, stop execution immediately
+        sys.stderr.write("Error: {}\n".format(e))
+        status = 'Incomplete'
+
+    else:
+        # No errors, complete
+        status = 'Planned' if options.dry_run else 'Complete'
+
+    # Finally, write results
+    sys.stdout.write("{} profile sync: {} activated, {} updated, {} deactivated "
+                     "and {} failed.\n".format(status, counts[ACTIVATE], counts[UPDATE],
+                                               counts[DEACTIVATE], f))
+    return 1 if f or status == 'Incomplete' else 0
+
+
+def main():
+    """
+    Run the command with a handler connected to the given target server.
+    """
+    options = build_parser().parse_args()
+    connections = Connections()
+    h = connections.get(options, 'target')
+    return run(h, options, connections)
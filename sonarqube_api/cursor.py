@@ -0,0 +1,302 @@
+"""
+This module contains the PageCursor, used to iterate through the paged
+results of the SonarQube server web service API.
+"""
+import math
+import warnings
+
+from .exceptions import SearchWindowError, SearchWindowWarning
+from .utils import parallel_imap
+
+
+class PageCursor(object):
+    """
+    Iterator over the items of a paged search, keeping track of the paging
+    state so it can be inspected, serialized and resumed.
+
+    A cursor is made of one or more segments (querysets with their totals):
+    searches that exceed the results window of their endpoint (if it has
+    one) are split into several segments when a partition function is
+    provided, or truncated with a SearchWindowWarning otherwise.
+    """
+
+    def __init__(self, handler, endpoint, items_key, qs=None, partition=None,
+                 attach=None, window=None):
+        """
+        Set handler, endpoint and queryset for the search. No request is
+        made until the cursor is iterated or inspected.
+
+        :param handler: SonarAPIHandler instance
+        :param endpoint: search endpoint
+        :param items_key: key of the items list in the response data
+        :param qs: search queryset
+        :param partition: function that splits a queryset exceeding the
+        results window, returning (queryset, total) tuples
+        :param attach: key of a dict in the response data, by item key,
+        whose entries are attached to each item (under the same key)
+        :param window: maximum number of results the endpoint can page
+        through (None if unlimited, as database backed endpoints)
+        """
+        self._handler = handler
+        self._endpoint = endpoint
+        self._items_key = items_key
+        self._qs = dict(qs or {})
+        self._partition = partition
+        self._attach = attach
+        self._window = window
+
+        # Paging state: segments as [queryset, total], current segment and
+        # number of items consumed from it
+        self._segments = None
+        self._page_size = None
+        self._segment = 0
+        self._position = 0
+
+        # First page (fetched when planning) and items generator
+        self._first_page = None
+        self._items = None
+
+    @classmethod
+    def from_state(cls, handler, state):
+        """
+        Build a cursor that resumes the iteration from the given state.
+
+        :param handler: SonarAPIHandler instance
+        :param state: state dict, as returned by get_state
+        :return: cursor instance
+        """
+        cursor = cls(handler, state['endpoint'], state['items_key'],
+                     attach=state.get('attach'), window=state.get('window'))
+        cursor._segments = [[dict(qs), total] for qs, total in state['segments']]
+        cursor._page_size = state['page_size']
+        cursor._segment = state['segment']
+        cursor._position = state['position']
+        return cursor
+
+    def get_state(self):
+        """
+        Return the state of the cursor as a JSON-serializable dict, which
+        can be used to resume the iteration with from_state.
+
+        :return: state dict
+        """
+        self._plan()
+        return {
+            'endpoint': self._endpoint,
+            'items_key': self._items_key,
+            'attach': self._attach,
+            'window': self._window,
+            'segments': [[dict(qs), total] for qs, total in self._segments],
+            'page_size': self._page_size,
+            'segment': self._segment,
+            'position': self._position,
+        }
+
+    @staticmethod
+    def _get_paging(res):
+        """
+        Return page number, page size and total from the response data.
+        Handles both flat (p, ps, total) and nested (paging) formats.
+
+        :param res: response data dict
+        :return: tuple of page number, page size and total
+        """
+        paging = res.get('paging')
+        if paging:
+            return paging['pageIndex'], paging['pageSize'], paging['total']
+        return res['p'], res['ps'], res['total']
+
+    def _limit(self, total):
+        """
+        Return the number of items that can be paged through for a total.
+        """
+        if self._window is None:
+            return total
+        return min(total, self._window)
+
+    def _count_pages(self, n_items):
+        """
+        Return the number of pages needed for a number of items.
+        """
+        if not self._page_size:
+            return 0
+        return int(math.ceil(float(n_items) / self._page_size))
+
+    def _fetch_page(self, qs, page):
+        """
+        Fetch a page of results for a queryset.
+
+        :param qs: search queryset
+        :param page: number of page
+        :return: response data dict
+        """
+        if page > 1:
+            qs = dict(qs, p=page)
+        return self._handler._make_call('get', self._endpoint, **qs).json()
+
+    def _plan(self):
+        """
+        Fetch the first page to get total and page size, and split the
+        search into segments if it exceeds the results window.
+        """
+        if self._segments is not None:
+            return
+
+        res = self._fetch_page(self._qs, 1)
+        _, self._page_size, total = self._get_paging(res)
+        if total > self._limit(total) and self._partition:
+            self._segments = [[qs, n] for qs, n in self._partition(self._qs)]
+
+            # Note: items without a value for the partition facets (or
+            # beyond the values returned) would be missed
+            covered = sum(n for _, n in self._segments)
+            if covered < total:
+                raise SearchWindowError("Partitions of the search of {} cover {} of its "
+                                        "{} results".format(self._endpoint, covered, total))
+        else:
+            self._segments = [[self._qs, total]]
+            self._first_page = res
+
+        # Never truncate silently
+        for qs, n in self._segments:
+            if n > self._limit(n):
+                warnings.warn("Search of {} has {} results, only the first {} can "
+                              "be paged through".format(self._endpoint, n, self._limit(n)),
+                              SearchWindowWarning)
+
+    def _iter_segment(self, index, position):
+        """
+        Yield the items of a segment, starting at the given position.
+
+        :param index: index of the segment
+        :param position: number of items to skip
+        :return: generator that yields items
+        """
+        qs, total = self._segments[index]
+        total = self._limit(total)
+        page_size = max(self._page_size, 1)
+        page = position // page_size + 1
+        offset = position % page_size
+
+        while position < total:
+            # Use the first page if we already have it
+            if page == 1 and index == 0 and self._first_page is not None:
+                res, self._first_page = self._first_page, None
+            else:
+                res = self._fetch_page(qs, page)
+
+            items = res[self._items_key][offset:offset + total - position]
+            if not items:
+                break
+            attached = res.get(self._attach, {}) if self._attach else None
+            for item in items:
+                position += 1
+                if attached is not None:
+                    item[self._attach] = attached.get(item.get('key'), [])
+                yield item
+
+            page += 1
+            offset = 0
+
+    def _fetch_segment(self, args):
+        """
+        Return all the items of a segment (used to fetch them in a thread).
+        """
+        return list(self._iter_segment(*args))
+
+    def _iterate(self):
+        """
+        Yield all remaining items, updating the paging state. When there's
+        more than one segment they're fetched concurrently (but yielded in
+        order), and items are yielded only once.
+
+        :return: generator that yields items
+        """
+        start, position = self._segment, self._position
+        indexes = range(start, len(self._segments))
+        args = [(i, position if i == start else 0) for i in indexes]
+
+        if len(args) > 1:
+            segments = parallel_imap(self._fetch_segment, args,
+                                     self._handler.DEFAULT_WORKERS,
+                                     ordered=True)
+            seen = set()
+        else:
+            segments = (self._iter_segment(*a) for a in args)
+            seen = None
+
+        for index, items in zip(indexes, segments):
+            self._segment = index
+            self._position = position if index == start else 0
+            for item in items:
+                self._position += 1
+                if seen is not None:
+                    # Partitions should not overlap, but never yield twice
+                    key = item.get('key')
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                yield item
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._items is None:
+            self._plan()
+            self._items = self._iterate()
+        return next(self._items)
+
+    # Python 2 iterator protocol
+    next = __next__
+
+    def __len__(self):
+        return self.total
+
+    @property
+    def total(self):
+        """
+        Total number of items of the search.
+        """
+        self._plan()
+        return sum(self._limit(n) for _, n in self._segments)
+
+    @property
+    def position(self):
+        """
+        Number of items already consumed.
+        """
+        self._plan()
+        done = sum(self._limit(n) for _, n in self._segments[:self._segment])
+        return done + self._position
+
+    @property
+    def pages(self):
+        """
+        Total number of pages of the search.
+        """
+        self._plan()
+        return sum(self._count_pages(self._limit(n)) for _, n in self._segments)
+
+    @property
+    def pages_remaining(self):
+        """
+        Number of pages not completely consumed yet.
+        """
+        self._plan()
+        done = sum(self._count_pages(self._limit(n))
+                   for _, n in self._segments[:self._segment])
+        if self._page_size and self._segment < len(self._segments):
+            # Last page of the segment is done when all its items are
+            if self._position >= self._limit(self._segments[self._segment][1]):
+                done += self._count_pages(self._position)
+            else:
+                done += self._position // self._page_size
+        return self.pages - done
+
+    @property
+    def page(self):
+        """
+        Number of the page of the next item (across all segments).
+        """
+        return min(self.pages - self.pages_remaining + 1, self.pages)
@@ -16,3 +16,18 @@ class AuthError(ClientError):
 class ValidationError(ClientError):
     pass
 
+
+class SearchWindowError(ClientError):
+    pass
+
+
+class TaskTimeoutError(Exception):
+    pass
+
+
+class ServerTimeoutError(ServerError):
+    pass
+
+
+class SearchWindowWarning(UserWarning):
+    pass
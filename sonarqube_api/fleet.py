@@ -0,0 +1,180 @@
+"""
+This module contains the SonarFleet, used to run the same queries against
+several SonarQube servers concurrently, as a single stream of results.
+"""
+import threading
+import time
+
+try:
+    from queue import Queue, Empty, Full
+except ImportError:
+    from Queue import Queue, Empty, Full
+
+from .exceptions import ServerTimeoutError
+
+
+class SonarFleet(object):
+    """
+    Wrapper of several SonarAPIHandler instances (one per server), that runs
+    searches against all of them concurrently and merges the results into a
+    single stream of (server, item) tuples, in the order they arrive.
+
+    Each server is read in its own thread. A server that fails, or takes
+    longer than the timeout to be read (timed in its own thread, not
+    counting the time waiting for the consumer), is dropped from the stream
+    and its error is recorded in the errors dict (by server name), without
+    blocking the rest. Results of servers already read are never dropped.
+    """
+
+    # Maximum number of results buffered (waiting to be consumed)
+    BUFFER_SIZE = 1000
+
+    # Seconds between checks for cancellation while buffer is full
+    POLL_INTERVAL = 0.1
+
+    # Message kinds (from server threads)
+    _ITEM, _DONE, _ERROR = range(3)
+
+    def __init__(self, handlers, timeout=None):
+        """
+        Set handlers and timeout.
+
+        :param handlers: dict of server name to SonarAPIHandler instance,
+        or iterable of handlers (named by their url)
+        :param timeout: maximum number of seconds to read each server
+        """
+        if not isinstance(handlers, dict):
+            handlers = dict((h._get_url(''), h) for h in handlers)
+        self.handlers = handlers
+        self.timeout = timeout
+        self.errors = {}
+
+    def _read_server(self, name, method, args, kwargs, queue, reader):
+        """
+        Put the results of a handler method in the queue, followed by a done
+        or error message (runs in a thread). The reader's deadline starts
+        with the first call, and is extended by the time spent waiting for
+        room in the buffer.
+        """
+        cancelled = reader['cancelled']
+
+        def put(message):
+            # Wait for room in the buffer unless cancelled
+            waiting = time.time()
+            while not cancelled.is_set():
+                try:
+                    queue.put(message, timeout=self.POLL_INTERVAL)
+                    if reader['deadline'] is not None:
+                        reader['deadline'] += time.time() - waiting
+                    return True
+                except Full:
+                    pass
+            return False
+
+        if self.timeout is not None:
+            reader['deadline'] = time.time() + self.timeout
+        try:
+            for item in getattr(self.handlers[name], method)(*args, **kwargs):
+                if not put((name, self._ITEM, item)):
+                    return
+        except Exception as e:
+            message = name, self._ERROR, e
+        else:
+            message = name, self._DONE, None
+
+        # Note: finished before the last message, so the server is never
+        # dropped once read, even if the buffer is full
+        reader['finished'].set()
+        put(message)
+
+    def fan_out(self, method, *args, **kwargs):
+        """
+        Call a handler method that returns an iterable on every server
+        concurrently, yielding results as they arrive.
+
+        :param method: name of the handler method
+        :param args: positional arguments for the method
+        :param kwargs: keyword arguments for the method
+        :return: generator that yields (server name, item) tuples
+        """
+        self.errors = {}
+        queue = Queue(self.BUFFER_SIZE)
+        active = set(self.handlers)
+
+        # Readers by server: deadline (set by the reader thread when it
+        # starts), and whether it finished reading or must stop
+        readers = dict((name, {'deadline': None, 'finished': threading.Event(),
+                               'cancelled': threading.Event()})
+                       for name in self.handlers)
+
+        for name in sorted(self.handlers):
+            thread = threading.Thread(target=self._read_server,
+                                      args=(name, method, args, kwargs,
+                                            queue, readers[name]))
+            thread.daemon = True
+            thread.start()
+
+        try:
+            while active:
+                # Wait for next message, no longer than the closest deadline
+                # of the servers still being read
+                deadlines = [readers[n]['deadline'] for n in active
+                             if not readers[n]['finished'].is_set()
+                             and readers[n]['deadline'] is not None]
+                wait = max(min(deadlines) - time.time(), 0) if deadlines else None
+                if self.timeout is not None and wait is None:
+                    wait = self.POLL_INTERVAL
+                try:
+                    name, kind, payload = queue.get(timeout=wait)
+                except Empty:
+                    name, kind = None, None
+
+                if name in active:
+                    if kind == self._ITEM:
+                        yield name, payload
+                    else:
+                        active.discard(name)
+                        if kind == self._ERROR:
+                            self.errors[name] = payload
+
+                # Drop servers still being read past their own deadline
+                # (their results are ignored)
+                now = time.time()
+                for name in list(active):
+                    reader = readers[name]
+                    if (reader['deadline'] is not None and now >= reader['deadline']
+                            and not reader['finished'].is_set()):
+                        self.errors[name] = ServerTimeoutError(
+                            'Server {} timed out after {} seconds'.format(name, self.timeout))
+                        reader['cancelled'].set()
+                        active.discard(name)
+        finally:
+            # Stop threads still reading
+            for reader in readers.values():
+                reader['cancelled'].set()
+
+    def get_rules(self, *args, **kwargs):
+        """
+        Yield the rules of every server (see SonarAPIHandler.get_rules).
+
+        :return: generator that yields (server name, rule data dict) tuples
+        """
+        return self.fan_out('get_rules', *args, **kwargs)
+
+    def get_metrics(self, *args, **kwargs):
+        """
+        Yield the metrics of every server (see SonarAPIHandler.get_metrics).
+
+        :return: generator that yields (server name, metric data dict) tuples
+        """
+        return self.fan_out('get_metrics', *args, **kwargs)
+
+    def get_resources_full_data(self, *args, **kwargs):
+        """
+        Yield the resources of every server, with their metrics and debt
+        (see SonarAPIHandler.get_resources_full_data).
+
+        :return: generator that yields (server name, resource data dict)
+        tuples
+        """
+        return self.fan_out('get_resources_full_data', *args, **kwargs)
@@ -0,0 +1,179 @@
+"""
+This module contains the functions to sync groups of users (their members
+and permissions) with a desired state, such as a directory's, applying only
+the changes needed to make the server's groups match it.
+"""
+from .exceptions import ClientError, ServerError
+from .utils import RateLimiter, parallel_imap
+
+
+# Plan actions
+CREATE_USER = 'create_user'
+CREATE_GROUP = 'create_group'
+ADD_MEMBER = 'add_member'
+REMOVE_MEMBER = 'remove_member'
+GRANT = 'grant'
+REVOKE = 'revoke'
+
+# Actions the other changes depend on, applied before them
+SETUP_ACTIONS = (CREATE_USER, CREATE_GROUP)
+
+
+def fetch_state(h, groups, users=False, permissions=False, workers=None):
+    """
+    Fetch the current state of groups with concurrent paginated sweeps:
+    existing groups, users (if required) and group permissions (if required)
+    at once, and then the members of the existing groups, many at once.
+
+    :param h: SonarAPIHandler instance
+    :param groups: iterable of names of the groups to fetch the members of
+    :param users: whether to fetch the logins of the existing users
+    :param permissions: whether to fetch the global permissions of groups
+    :param workers: number of groups to fetch concurrently
+    :return: state dict, with groups (set of existing group names), users
+    (set of logins, None if not fetched), members (dict of group name to set
+    of logins) and permissions (dict of group name to set of permissions,
+    None if not fetched)
+    """
+    sweeps = [
+        lambda: set(g['name'] for g in h.get_groups()),
+        lambda: set(u['login'] for u in h.get_users()) if users else None,
+        lambda: dict((g['name'], set(g.get('permissions', [])))
+                     for g in h.get_group_permissions()) if permissions else None,
+    ]
+    existing, logins, granted = parallel_imap(lambda sweep: sweep(), sweeps,
+                                              len(sweeps), ordered=True)
+
+    # Note: groups to create have no members yet
+    members = {}
+    for group, group_logins, error in h.get_group_memberships(
+            sorted(existing.intersection(groups)), workers):
+        if error:
+            raise error
+        members[group] = group_logins
+
+    return {'groups': existing, 'users': logins, 'members': members,
+            'permissions': granted}
+
+
+def diff_groups(desired, state):
+    """
+    Compute the changes to apply to the current state of groups to match
+    the desired one: users and groups to create, members to add and remove,
+    and permissions to grant and revoke. Only the groups in the desired
+    state are changed, and only their members and permissions given (not
+    None).
+
+    :param desired: dict of group name to dict with members (set of logins)
+    and permissions (set of global permissions)
+    :param state: current state dict, as returned by fetch_state (users are
+    only created if fetched)
+    :return: plan as list of change dicts (action, and group, login or
+    permission), users first and then sorted by group
+    """
+    plan = []
+    if state['users'] is not None:
+        logins = set(login for spec in desired.values() for login in spec.get('members') or ())
+        for login in sorted(logins - state['users']):
+            plan.append({'action': CREATE_USER, 'login': login})
+
+    for group in sorted(desired):
+        spec = desired[group]
+        if group not in state['groups']:
+            plan.append({'action': CREATE_GROUP, 'group': group})
+
+        if spec.get('members') is not None:
+            current = state['members'].get(group, set())
+            for login in sorted(spec['members'] - current):
+                plan.append({'action': ADD_MEMBER, 'group': group, 'login': login})
+            for login in sorted(current - spec['members']):
+                plan.append({'action': REMOVE_MEMBER, 'group': group, 'login': login})
+
+        if spec.get('permissions') is not None and state['permissions'] is not None:
+            current = state['permissions'].get(group, set())
+            for permission in sorted(spec['permissions'] - current):
+                plan.append({'action': GRANT, 'group': group, 'permission': permission})
+            for permission in sorted(current - spec['permissions']):
+                plan.append({'action': REVOKE, 'group': group, 'permission': permission})
+    return plan
+
+
+def apply_change(h, change):
+    """
+    Apply a change of a plan.
+
+    :param h: SonarAPIHandler instance
+    :param change: change dict
+    """
+    action = change['action']
+    if action == CREATE_USER:
+        # Note: users of a directory are authenticated by it, not SonarQube
+        h.create_user(change['login'], change['login'], local=False)
+    elif action == CREATE_GROUP:
+        h.create_group(change['group'])
+    elif action == ADD_MEMBER:
+        h.add_group_member(change['group'], change['login'])
+    elif action == REMOVE_MEMBER:
+        h.remove_group_member(change['group'], change['login'])
+    elif action == GRANT:
+        h.add_group_permission(change['group'], change['permission'])
+    else:
+        h.remove_group_permission(change['group'], change['permission'])
+
+
+def apply_plan(h, plan, workers=None, rate=None):
+    """
+    Apply the changes of a plan concurrently, at most at the given rate,
+    yielding each result as soon as it's ready. Users and groups are
+    created before applying the other changes.
+
+    :param h: SonarAPIHandler instance
+    :param plan: list of change dicts, as returned by diff_groups
+    :param workers: number of changes to apply concurrently
+    :param rate: maximum number of changes per second (unlimited if not
+    given)
+    :return: generator that yields (change, error) tuples, where error is
+    None if the change was applied
+    """
+    limiter = RateLimiter(rate) if rate else None
+
+    def apply(change):
+        # Apply a change (runs in a thread)
+        if limiter:
+            limiter.wait()
+        try:
+            apply_change(h, change)
+            return change, None
+        except (ClientError, ServerError) as e:
+            return change, e
+
+    setup = [c for c in plan if c['action'] in SETUP_ACTIONS]
+    changes = [c for c in plan if c['action'] not in SETUP_ACTIONS]
+    for step in (setup, changes):
+        for result in parallel_imap(apply, step, workers or h.DEFAULT_WORKERS):
+            yield result
+
+
+def sync_groups(h, desired, create_users=False, dry_run=False, workers=None,
+                rate=None):
+    """
+    Make the members and permissions of groups match the desired ones.
+
+    :param h: SonarAPIHandler instance
+    :param desired: dict of group name to dict with members (set of logins)
+    and permissions (set of global permissions), None to leave them as is
+    :param create_users: create the members that don't exist yet
+    :param dry_run: only compute the plan, don't apply it
+    :param workers: number of requests to send concurrently
+    :param rate: maximum number of changes per second (unlimited if not
+    given)
+    :return: tuple of plan and generator of (change, error) tuples (empty if
+    dry run)
+    """
+    permissions = any(spec.get('permissions') is not None for spec in desired.values())
+    state = fetch_state(h, desired, users=create_users, permissions=permissions,
+                        workers=workers)
+    plan = diff_groups(desired, state)
+    if dry_run:
+        return plan, iter(())
+    return plan, apply_plan(h, plan, workers, rate)
@@ -0,0 +1,137 @@
+"""
+This module contains the functions to sync quality profiles, on the same or
+different SonarQube servers, applying only the changes needed to make the
+target profile's activations match the source's.
+"""
+from .exceptions import ClientError, ServerError
+from .utils import parallel_imap
+
+
+# Plan actions
+ACTIVATE = 'activate'
+UPDATE = 'update'
+DEACTIVATE = 'deactivate'
+
+
+def get_profile_activations(h, profile):
+    """
+    Return the activations of a profile by rule key.
+
+    :param h: SonarAPIHandler instance
+    :param profile: key of the profile
+    :return: dict of rule key to activation dict (severity and params dict)
+    """
+    activations = {}
+    for rule in h.get_activations(profile):
+        for active in rule['actives']:
+            if active.get('qProfile', profile) == profile:
+                params = dict((p['key'], p.get('value', ''))
+                              for p in active.get('params', []))
+                activations[rule['key']] = {'severity': active.get('severity'),
+                                            'params': params}
+                break
+    return activations
+
+
+def fetch_profiles(source_handler, source_profile, target_handler,
+                   target_profile):
+    """
+    Fetch the activations of the source and target profiles concurrently.
+
+    :return: tuple of source and target activations dicts
+    """
+    profiles = [(source_handler, source_profile), (target_handler, target_profile)]
+    source, target = parallel_imap(lambda args: get_profile_activations(*args),
+                                   profiles, len(profiles), ordered=True)
+    return source, target
+
+
+def diff_activations(source, target):
+    """
+    Compute the changes to apply to the target activations to match the
+    source ones: rules to activate, rules whose severity or params changed
+    (to update) and rules to deactivate.
+
+    :param source: source activations dict, by rule key
+    :param target: target activations dict, by rule key
+    :return: plan as list of change dicts (action, rule, severity and
+    params), sorted by rule key
+    """
+    plan = []
+    for key in sorted(set(source) | set(target)):
+        if key not in source:
+            plan.append({'action': DEACTIVATE, 'rule': key})
+            continue
+
+        activation = source[key]
+        if key not in target:
+            action = ACTIVATE
+        elif activation != target[key]:
+            action = UPDATE
+        else:
+            continue
+        plan.append({'action': action, 'rule': key,
+                     'severity': activation['severity'],
+                     'params': activation['params']})
+    return plan
+
+
+def apply_change(h, profile, change):
+    """
+    Apply a change of a plan to a profile.
+
+    :param h: SonarAPIHandler instance
+    :param profile: key of the profile
+    :param change: change dict
+    """
+    if change['action'] == DEACTIVATE:
+        h.deactivate_rule(change['rule'], profile)
+    else:
+        h.activate_rule(change['rule'], profile, severity=change['severity'],
+                        **change['params'])
+
+
+def apply_plan(h, profile, plan, workers=None):
+    """
+    Apply the changes of a plan to a profile concurrently, yielding each
+    result as soon as it's ready.
+
+    :param h: SonarAPIHandler instance
+    :param profile: key of the profile
+    :param plan: list of change dicts, as returned by diff_activations
+    :param workers: number of changes to apply concurrently
+    :return: generator that yields (change, error) tuples, where error is
+    None if the change was applied
+    """
+    def apply(change):
+        # Apply a change (runs in a thread)
+        try:
+            apply_change(h, profile, change)
+            return change, None
+        except (ClientError, ServerError) as e:
+            return change, e
+
+    for result in parallel_imap(apply, plan, workers or h.DEFAULT_WORKERS):
+        yield result
+
+
+def sync_profiles(source_handler, source_profile, target_handler,
+                  target_profile, dry_run=False, workers=None):
+    """
+    Make the activations of the target profile match the source's.
+
+    :param source_handler: SonarAPIHandler instance of the source server
+    :param source_profile: key of the source profile
+    :param target_handler: SonarAPIHandler instance of the target server
+    :param target_profile: key of the target profile
+    :param dry_run: only compute the plan, don't apply it
+    :param workers: number of changes to apply concurrently
+    :return: tuple of plan and generator of (change, error) tuples (empty if
+    dry run)
+    """
+    source, target = fetch_profiles(source_handler, source_profile,
+                                    target_handler, target_profile)
+    plan = diff_activations(source, target)
+    if dry_run:
+        return plan, iter(())
+    return plan, apply_plan(target_handler, target_profile, plan, workers)
@@ -0,0 +1,64 @@
+"""
+This module contains the MetricSeries, a compact columnar time series used to
+hold the history of a metric's values.
+"""
+import calendar
+import datetime
+from array import array
+
+
+# Origin of timestamps
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class MetricSeries(object):
+    """
+    Time series of a metric's values, stored in two typed arrays: UTC
+    timestamps (seconds since epoch) and values (NaN when missing or not
+    numeric).
+    """
+
+    def __init__(self, metric):
+        """
+        Set metric and empty buffers.
+
+        :param metric: key of the metric
+        """
+        self.metric = metric
+        self.timestamps = array('d')
+        self.values = array('d')
+
+    def append(self, date, value):
+        """
+        Append a value to the series.
+
+        :param date: naive UTC datetime of the value
+        :param value: value as number or str (None if missing)
+        """
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = float('nan')
+        self.timestamps.append(calendar.timegm(date.utctimetuple()))
+        self.values.append(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        """
+        Yield (datetime, value) tuples.
+        """
+        for ts, value in zip(self.timestamps, self.values):
+            yield EPOCH + datetime.timedelta(seconds=ts), value
+
+    def to_numpy(self):
+        """
+        Return the series as NumPy arrays (requires NumPy).
+
+        :return: tuple of timestamps (datetime64[s]) and values arrays
+        """
+        import numpy
+        timestamps = numpy.array(self.timestamps, dtype='int64').astype('datetime64[s]')
+        values = numpy.array(self.values, dtype='float64')
+        return timestamps, values
@@ -0,0 +1,128 @@
+"""
+This module contains the functions to write, read and compare snapshots of
+rules: JSON lines files with one rule per line, keyed by rule key and with a
+hash of the rule's contents, so two snapshots can be compared offline in
+linear time, looking at the fields only of the rules whose hash changed.
+"""
+import hashlib
+import json
+
+
+# Change actions
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+
+def rule_hash(rule):
+    """
+    Return the hash of a rule's contents, independent of the order of its
+    fields.
+
+    :param rule: rule data dict
+    :return: hex digest of the rule's canonical JSON
+    """
+    content = json.dumps(rule, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def dump_rule(rule):
+    """
+    Return the snapshot line of a rule.
+
+    :param rule: rule data dict (with key)
+    :return: JSON line (with trailing newline) with key, hash and rule
+    """
+    entry = {'key': rule['key'], 'hash': rule_hash(rule), 'rule': rule}
+    return json.dumps(entry, sort_keys=True) + '\n'
+
+
+def write_snapshot(rules, f):
+    """
+    Write a snapshot of rules to a file, skipping the ones without key.
+
+    :param rules: iterable of rule data dicts
+    :param f: file object open for writing
+    :return: number of rules written
+    """
+    n = 0
+    for rule in rules:
+        if 'key' in rule:
+            f.write(dump_rule(rule))
+            n += 1
+    return n
+
+
+def read_snapshot(f):
+    """
+    Read a snapshot from a file.
+
+    :param f: file object open for reading
+    :return: dict of rule key to entry dict (key, hash and rule)
+    """
+    snapshot = {}
+    for line in f:
+        line = line.strip()
+        if line:
+            entry = json.loads(line)
+            snapshot[entry['key']] = entry
+    return snapshot
+
+
+def flatten_rule(rule):
+    """
+    Return the fields of a rule to compare, with one field per param (as
+    params.<key>, with its default value).
+
+    :param rule: rule data dict
+    :return: dict of field name to value
+    """
+    fields = dict((k, v) for k, v in rule.items() if k != 'params')
+    for param in rule.get('params') or []:
+        fields['params.{}'.format(param.get('key'))] = param.get('defaultValue')
+    return fields
+
+
+def diff_fields(old, new):
+    """
+    Compare the fields of two versions of a rule.
+
+    :param old: old rule data dict
+    :param new: new rule data dict
+    :return: dict of changed field name to (old value, new value) tuple,
+    with None for missing fields
+    """
+    old, new = flatten_rule(old), flatten_rule(new)
+    return dict((field, (old.get(field), new.get(field)))
+                for field in set(old) | set(new)
+                if old.get(field) != new.get(field))
+
+
+def diff_snapshots(old, new):
+    """
+    Compare two snapshots: rules only in the new one are added, rules only
+    in the old one removed, and rules in both with different hash (and
+    fields) changed.
+
+    :param old: old snapshot dict, as returned by read_snapshot
+    :param new: new snapshot dict, as returned by read_snapshot
+    :return: list of change dicts (action, key, and rule for added and
+    removed, or fields for changed, as returned by diff_fields), sorted by
+    rule key
+    """
+    changes = []
+    for key, entry in new.items():
+        previous = old.get(key)
+        if previous is None:
+            changes.append({'action': ADDED, 'key': key, 'rule': entry['rule']})
+        elif previous['hash'] != entry['hash']:
+            # Note: the fields can be equal if only the order of params changed
+            fields = diff_fields(previous['rule'], entry['rule'])
+            if fields:
+                changes.append({'action': CHANGED, 'key': key, 'fields': fields})
+
+    for key, entry in old.items():
+        if key not in new:
+            changes.append({'action': REMOVED, 'key': key, 'rule': entry['rule']})
+
+    return sorted(changes, key=lambda change: change['key'])
@@ -0,0 +1,184 @@
+"""
+This module contains the SourceCache, an on-disk content-addressed store of
+raw sources, and the functions to download the sources of many files
+through it, skipping the ones already cached for the same analysis.
+"""
+import errno
+import hashlib
+import os
+import tempfile
+import threading
+
+from .exceptions import ClientError, ServerError
+from .utils import parallel_imap
+
+
+# Fetch results
+DOWNLOADED = 'downloaded'
+CACHED = 'cached'
+
+# Rename replacing the target, if any (Py2 on Windows can't)
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _makedirs(path):
+    """
+    Create a directory and its parents, unless it already exists.
+    """
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+class SourceCache(object):
+    """
+    On-disk cache of raw sources. Each source is stored once, by the SHA-256
+    digest of its content (objects/), and each component and analysis date
+    is a reference to a digest (refs/). Files are written atomically, so
+    the cache can be shared by many threads and processes.
+    """
+
+    def __init__(self, path):
+        """
+        Set the cache directory, creating it if needed.
+
+        :param path: path of the cache directory
+        """
+        self.path = path
+        _makedirs(path)
+
+    def _ref_path(self, component, analysis_date):
+        """
+        Return the path of the reference of a component and analysis date.
+        """
+        key = u'{}\n{}'.format(component, analysis_date)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, 'refs', digest[:2], digest[2:])
+
+    def _write(self, path, content):
+        """
+        Write a file atomically, through a temporary file renamed to it.
+        """
+        directory = os.path.dirname(path)
+        _makedirs(directory)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        _replace(tmp_path, path)
+
+    def object_path(self, digest):
+        """
+        Return the path of a source in the cache.
+
+        :param digest: digest of the source
+        :return: path of the file with the source
+        """
+        return os.path.join(self.path, 'objects', digest[:2], digest[2:])
+
+    def get(self, component, analysis_date):
+        """
+        Return the digest of the source of a component for an analysis date,
+        if cached.
+
+        :param component: key of the file component
+        :param analysis_date: date of the analysis, as str
+        :return: digest of the source, None if not cached
+        """
+        try:
+            with open(self._ref_path(component, analysis_date), 'rb') as f:
+                digest = f.read().decode('ascii')
+        except (IOError, OSError):
+            return None
+        return digest if os.path.exists(self.object_path(digest)) else None
+
+    def read(self, digest):
+        """
+        Return a source in the cache.
+
+        :param digest: digest of the source
+        :return: source as bytes
+        """
+        with open(self.object_path(digest), 'rb') as f:
+            return f.read()
+
+    def put(self, component, analysis_date, source):
+        """
+        Store the source of a component for an analysis date (the content
+        only if not already stored).
+
+        :param component: key of the file component
+        :param analysis_date: date of the analysis, as str (None to store
+        only the content)
+        :param source: source as bytes
+        :return: digest of the source
+        """
+        digest = hashlib.sha256(source).hexdigest()
+        if not os.path.exists(self.object_path(digest)):
+            self._write(self.object_path(digest), source)
+        if analysis_date:
+            self._write(self._ref_path(component, analysis_date), digest.encode('ascii'))
+        return digest
+
+
+def issue_components(h, **filters):
+    """
+    Yield the files with issues, once each.
+
+    :param h: SonarAPIHandler instance
+    :param filters: keyword arguments for the handler's get_issues
+    :return: generator that yields (component key, project key) tuples
+    """
+    seen = set()
+    for issue in h.get_issues(**filters):
+        component = issue.get('component')
+        # Note: project level issues have no file
+        if component and component != issue.get('project') and component not in seen:
+            seen.add(component)
+            yield component, issue.get('project')
+
+
+def fetch_sources(h, components, cache, workers=None):
+    """
+    Download the raw sources of many files concurrently into a cache,
+    skipping the ones already cached for the last analysis of their
+    project. Files never analysed are always downloaded.
+
+    :param h: SonarAPIHandler instance
+    :param components: iterable of file component keys, or (component key,
+    project key) tuples, to look up the analysis date once per project
+    :param cache: SourceCache instance
+    :param workers: number of files to download concurrently
+    :return: generator that yields (component key, digest, result, error)
+    tuples, where result is downloaded or cached, and digest and result are
+    None if there was an error
+    """
+    # Analysis dates by project (or component if unknown), looked up once
+    # each: threads needing the same one wait for its lock
+    dates, locks = {}, {}
+    lock = threading.Lock()
+
+    def get_analysis_date(key):
+        with lock:
+            key_lock = locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in dates:
+                dates[key] = h.get_analysis_date(key)
+            return dates[key]
+
+    def fetch(item):
+        # Fetch a source unless cached (runs in a thread)
+        component, project = item if isinstance(item, tuple) else (item, None)
+        try:
+            date = get_analysis_date(project or component)
+            digest = cache.get(component, date) if date else None
+            if digest:
+                return component, digest, CACHED, None
+            digest = cache.put(component, date, h.get_source(component))
+            return component, digest, DOWNLOADED, None
+        except (ClientError, ServerError) as e:
+            return component, None, None, e
+
+    for result in parallel_imap(fetch, components, workers or h.DEFAULT_WORKERS):
+        yield result
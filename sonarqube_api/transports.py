@@ -0,0 +1,235 @@
+"""
+This module contains the transports used by the SonarAPIHandler to send
+requests to the server: a transport takes a method, url and data, and
+returns a response with status code, headers and body.
+"""
+import base64
+import json
+import threading
+import weakref
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+
+class Response(object):
+    """
+    Response of a transport, with the same interface as a requests
+    response: status code, reason, headers and content.
+    """
+
+    def __init__(self, status_code, headers=None, content=b'', reason=None):
+        """
+        Set status, headers and body.
+
+        :param status_code: http status code
+        :param headers: dict of response headers
+        :param content: body as bytes
+        :param reason: http reason phrase
+        """
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+        self.reason = reason
+
+    @property
+    def text(self):
+        """
+        Body decoded as text.
+        """
+        return self.content.decode('utf-8')
+
+    def json(self):
+        """
+        Return the body parsed as JSON.
+        """
+        return json.loads(self.text)
+
+
+class Transport(object):
+    """
+    Base transport. Subclasses must implement request, and close if they
+    keep connections open.
+    """
+
+    def __init__(self, auth=None, pool_size=None):
+        """
+        Set auth and connection options.
+
+        :param auth: (user, password) tuple for basic auth
+        :param pool_size: maximum number of connections kept open
+        """
+        self.auth = auth
+        self.pool_size = pool_size
+
+    def request(self, method, url, data=None):
+        """
+        Send a request and return its response.
+
+        :param method: http method (get, post, put, patch)
+        :param url: complete url
+        :param data: dict of query params (GET) or form data
+        :return: response, with status_code, reason, headers, content and json()
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Close the connections of the transport.
+        """
+        pass
+
+    def _auth_headers(self):
+        """
+        Return the basic auth header (if any) as a dict.
+        """
+        if not self.auth:
+            return {}
+        credentials = '{}:{}'.format(*self.auth).encode('utf-8')
+        return {'Authorization': 'Basic ' + base64.b64encode(credentials).decode('ascii')}
+
+
+class RequestsTransport(Transport):
+    """
+    Default transport, using requests sessions: one per thread (sessions
+    are not thread-safe), all of them sharing auth, configuration and a
+    single connection pool, so connections are reused by any thread
+    (including the short-lived threads of concurrent methods).
+    """
+
+    def __init__(self, auth=None, pool_size=None):
+        super(RequestsTransport, self).__init__(auth, pool_size)
+
+        # Sessions, one per thread (all of them tracked to be able to close
+        # them), and the adapter with the connection pool shared by all of
+        # them, created on first request
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sessions = weakref.WeakSet()
+        self._adapter = None
+
+    def _get_adapter(self):
+        """
+        Return the adapter shared by all sessions, creating it if needed.
+
+        Note: urllib3 pools (which keep the connections) are thread-safe.
+
+        :return: requests adapter
+        """
+        from requests.adapters import HTTPAdapter
+
+        with self._lock:
+            if self._adapter is None:
+                kwargs = {'pool_maxsize': self.pool_size} if self.pool_size else {}
+                self._adapter = HTTPAdapter(**kwargs)
+            return self._adapter
+
+    def _new_session(self):
+        """
+        Create a new session with the transport's auth and configuration,
+        using the shared adapter.
+
+        :return: requests session
+        """
+        # Note: requests is imported on first use, to keep imports light
+        import requests
+
+        session = requests.Session()
+        if self.auth:
+            session.auth = self.auth
+        adapter = self._get_adapter()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        with self._lock:
+            self._sessions.add(session)
+        return session
+
+    @property
+    def session(self):
+        """
+        Session to use in the current thread.
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._new_session()
+        return session
+
+    def request(self, method, url, data=None):
+        # Requests responses already have the expected interface
+        call = getattr(self.session, method.lower())
+        return call(url, data=data or {})
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions)
+            adapter, self._adapter = self._adapter, None
+        for session in sessions:
+            session.close()
+        if adapter is not None:
+            adapter.close()
+
+
+class Urllib3Transport(Transport):
+    """
+    Lightweight transport using a urllib3 pool manager directly, which is
+    thread-safe and keeps up to pool_size connections per host.
+    """
+
+    # Default maximum number of connections per host
+    DEFAULT_POOL_SIZE = 10
+
+    def __init__(self, auth=None, pool_size=None):
+        super(Urllib3Transport, self).__init__(auth, pool_size)
+        import urllib3
+        self._pool = urllib3.PoolManager(maxsize=pool_size or self.DEFAULT_POOL_SIZE,
+                                         headers=self._auth_headers())
+
+    def request(self, method, url, data=None):
+        method = method.upper()
+        if method == 'GET':
+            if data:
+                url = '{}?{}'.format(url, urlencode(data))
+            res = self._pool.request(method, url)
+        else:
+            res = self._pool.request(method, url, fields=data or {},
+                                     encode_multipart=False)
+        return Response(res.status, dict(res.headers), res.data, res.reason)
+
+    def close(self):
+        self._pool.clear()
+
+
+class HTTP2Transport(Transport):
+    """
+    Transport using an httpx client with HTTP/2, which multiplexes
+    concurrent requests over a single connection per host (requires httpx
+    with HTTP/2 support).
+    """
+
+    def __init__(self, auth=None, pool_size=None):
+        super(HTTP2Transport, self).__init__(auth, pool_size)
+        import httpx
+        limits = httpx.Limits(max_connections=pool_size) if pool_size else httpx.Limits()
+        self._client = httpx.Client(http2=True, auth=auth, limits=limits)
+
+    def request(self, method, url, data=None):
+        if method.upper() == 'GET':
+            res = self._client.request('GET', url, params=data or {})
+        else:
+            res = self._client.request(method.upper(), url, data=data or {})
+        return Response(res.status_code, dict(res.headers), res.content,
+                        res.reason_phrase)
+
+    def close(self):
+        self._client.close()
+
+
+# Transports by name
+TRANSPORTS = {
+    'requests': RequestsTransport,
+    'urllib3': Urllib3Transport,
+    'http2': HTTP2Transport,
+}
@@ -1,6 +1,10 @@
 __author__ = 'kako'
 
+import datetime
 import sys
+import threading
+import time
+from collections import deque
 
 
 # Encoding cleanup function
@@ -8,3 +12,162 @@ if sys.version_info.major == 3:
     utf_encode = lambda x: x
 else:
     utf_encode = lambda x: x.encode('utf-8')
+
+
+# Clock for intervals, not affected by system time changes (when available)
+_clock = getattr(time, 'monotonic', time.time)
+
+
+# Date-time format used by SonarQube
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def parse_datetime(value):
+    """
+    Parse a SonarQube date (2017-03-01) or date-time (with or without UTC
+    offset, such as 2017-03-01T12:00:00+0100) into a naive UTC datetime.
+
+    :param value: date or date-time as str
+    :return: datetime
+    """
+    if len(value) == 10:
+        return datetime.datetime.strptime(value, '%Y-%m-%d')
+
+    dt = datetime.datetime.strptime(value[:19], DATETIME_FORMAT)
+    offset = value[19:].replace(':', '')
+    if offset and offset != 'Z':
+        sign = -1 if offset[0] == '-' else 1
+        minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+        dt -= datetime.timedelta(minutes=sign * minutes)
+    return dt
+
+
+def format_datetime(dt):
+    """
+    Format a naive UTC datetime as a SonarQube date-time.
+
+    :param dt: datetime
+    :return: date-time as str
+    """
+    return dt.strftime(DATETIME_FORMAT) + '+0000'
+
+
+def format_params(params):
+    """
+    Format rule params as expected by the server: key=value pairs sorted by
+    key and separated by semicolons, ignoring empty values.
+
+    :param params: dict of param key to value
+    :return: params as str
+    """
+    return ';'.join('{}={}'.format(k, v) for k, v in sorted(params.items()) if v)
+
+
+def chunks(iterable, size):
+    """
+    Yield lists of up to the given size with the items of an iterable.
+
+    :param iterable: iterable of items
+    :param size: maximum size of each list
+    :return: generator that yields lists of items
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parallel_imap(func, iterable, workers, ordered=False):
+    """
+    Yield the results of applying a function to every item of an iterable,
+    using a pool of threads of the given size. Results are yielded as soon as
+    they're ready, unless ordered is set.
+
+    Note: items are consumed lazily, keeping at most twice as many tasks as
+    workers pending, and the pool is terminated when the generator is
+    exhausted or closed.
+
+    :param func: function to apply to each item
+    :param iterable: iterable of items
+    :param workers: number of threads to use
+    :param ordered: yield results in the order of the items
+    :return: generator that yields function results
+    """
+    # Note: imported on first use, to keep imports light
+    from multiprocessing.pool import ThreadPool
+    try:
+        from queue import Queue
+    except ImportError:
+        from Queue import Queue
+
+    workers = max(1, workers)
+    pool = ThreadPool(workers)
+    pending = deque()
+    done = Queue()
+
+    def run(item):
+        # Return errors, to raise them in the consumer thread
+        try:
+            return True, func(item)
+        except Exception as e:
+            return False, e
+
+    def wait():
+        # Get result of the first (ordered) or any finished task
+        task = pending.popleft()
+        ok, result = task.get() if ordered else done.get()
+        if not ok:
+            raise result
+        return result
+
+    callback = None if ordered else done.put
+    try:
+        for item in iterable:
+            pending.append(pool.apply_async(run, (item,), callback=callback))
+            if len(pending) >= 2 * workers:
+                yield wait()
+        while pending:
+            yield wait()
+    finally:
+        pool.terminate()
+
+
+class RateLimiter(object):
+    """
+    Limit the rate of calls made by any number of threads, spacing them
+    evenly at the given rate, with bursts of up to burst calls after idle
+    periods (a token bucket).
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        :param rate: maximum number of calls per second
+        :param burst: maximum number of calls allowed at once
+        """
+        self.rate = float(rate)
+        self.burst = burst
+        self._allowance = float(burst)
+        self._last = _clock()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Wait until a call is allowed.
+        """
+        with self._lock:
+            now = _clock()
+            allowance = self._allowance + (now - self._last) * self.rate
+            self._last = now
+
+            # Note: the allowance goes below zero to reserve the next slots,
+            # so threads waiting concurrently are spaced, not woken together
+            self._allowance = min(allowance, self.burst) - 1
+            delay = -self._allowance / self.rate if self._allowance < 0 else 0
+
+        # Sleep without the lock, other threads can reserve later slots
+        if delay:
+            time.sleep(delay)
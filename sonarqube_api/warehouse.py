@@ -0,0 +1,113 @@
+"""
+This module contains the MeasuresWarehouse, a local SQLite store for the
+resources and measures fetched from a SonarQube server.
+"""
+import datetime
+import sqlite3
+
+from .utils import chunks, format_datetime
+
+
+class MeasuresWarehouse(object):
+    """
+    Local SQLite database of resources and their measures. Syncing inserts or
+    replaces resources, and replaces all the measures of each one, so it can
+    be re-run to refresh the data.
+    """
+
+    # Default number of resources inserted per transaction
+    DEFAULT_BATCH_SIZE = 500
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS resources ('
+        ' key TEXT PRIMARY KEY, name TEXT, scope TEXT, qualifier TEXT,'
+        ' lang TEXT, version TEXT, date TEXT, synced_at TEXT)',
+        'CREATE TABLE IF NOT EXISTS metrics ('
+        ' key TEXT PRIMARY KEY)',
+        'CREATE TABLE IF NOT EXISTS measures ('
+        ' resource_key TEXT NOT NULL REFERENCES resources (key),'
+        ' metric_key TEXT NOT NULL REFERENCES metrics (key),'
+        ' characteristic TEXT NOT NULL DEFAULT \'\','
+        ' value REAL, formatted_value TEXT, data TEXT,'
+        ' PRIMARY KEY (resource_key, metric_key, characteristic))',
+        'CREATE INDEX IF NOT EXISTS measures_metric_idx'
+        ' ON measures (metric_key, characteristic)',
+    )
+
+    def __init__(self, path):
+        """
+        Open (or create) the database and ensure the schema exists.
+
+        :param path: path of the SQLite database file
+        """
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            for statement in self.SCHEMA:
+                self._conn.execute(statement)
+
+    @property
+    def connection(self):
+        """
+        SQLite connection, to query the database.
+        """
+        return self._conn
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self._conn.close()
+
+    def sync(self, resources, batch_size=None):
+        """
+        Insert or replace resources and their measures (as yielded by the
+        handler's get_resources_* methods), in batches of resources inserted
+        in a single transaction each. Measures of the synced resources that
+        are no longer given are deleted.
+
+        :param resources: iterable of resource data dicts
+        :param batch_size: number of resources per transaction
+        :return: tuple of synced resources and measures counters
+        """
+        synced_at = format_datetime(datetime.datetime.utcnow().replace(microsecond=0))
+        n_resources, n_measures = 0, 0
+
+        for batch in chunks(resources, batch_size or self.DEFAULT_BATCH_SIZE):
+            resource_rows, metric_rows, measure_rows = [], set(), []
+            for res in batch:
+                resource_rows.append((
+                    res['key'], res.get('name'), res.get('scope'),
+                    res.get('qualifier'), res.get('lang'), res.get('version'),
+                    res.get('date'), synced_at
+                ))
+                for msr in res.get('msr', []):
+                    metric_rows.add((msr['key'],))
+                    measure_rows.append((
+                        res['key'], msr['key'], msr.get('ctic_key', ''),
+                        msr.get('val'), msr.get('frmt_val'), msr.get('data')
+                    ))
+
+            # Insert the batch in a single transaction, replacing the measures
+            # of its resources
+            with self._conn:
+                self._conn.execute(
+                    'DELETE FROM measures WHERE resource_key IN ({})'.format(
+                        ', '.join('?' * len(resource_rows))),
+                    [row[0] for row in resource_rows]
+                )
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    resource_rows
+                )
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO metrics VALUES (?)', metric_rows
+                )
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO measures VALUES (?, ?, ?, ?, ?, ?)',
+                    measure_rows
+                )
+
+            n_resources += len(resource_rows)
+            n_measures += len(measure_rows)
+
+        return n_resources, n_measures
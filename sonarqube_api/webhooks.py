@@ -0,0 +1,239 @@
+"""
+This module contains the WebhookReceiver, a small embeddable HTTP server that
+accepts SonarQube webhook payloads (sent when an analysis is processed), as a
+push-based alternative to polling the compute engine.
+"""
+import hashlib
+import hmac
+import json
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+# Header with the payload signature, when the webhook has a secret
+SIGNATURE_HEADER = 'X-Sonar-Webhook-HMAC-SHA256'
+
+# Webhook condition operators, as quality gate status comparators
+COMPARATORS = {
+    'EQUALS': 'EQ',
+    'NOT_EQUALS': 'NE',
+    'GREATER_THAN': 'GT',
+    'LESS_THAN': 'LT',
+}
+
+
+def sign_payload(body, secret):
+    """
+    Return the signature of a webhook payload.
+
+    :param body: payload as bytes
+    :param secret: webhook secret
+    :return: hex digest of the payload's HMAC-SHA256
+    """
+    return hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, signature, secret):
+    """
+    Check the signature of a webhook payload (in constant time).
+
+    :param body: payload as bytes
+    :param signature: signature sent in the request header
+    :param secret: webhook secret
+    :return: True if the signature is valid
+    """
+    if not signature:
+        return False
+    return hmac.compare_digest(sign_payload(body, secret), str(signature))
+
+
+def parse_payload(payload):
+    """
+    Parse a webhook payload into an event dict, with the same structures
+    returned by the handler: the compute engine task (as wait_for_task), the
+    project, and its quality gate status (as get_quality_gate_status).
+
+    :param payload: webhook payload as dict
+    :return: event data dict (task, project, projectStatus and payload)
+    """
+    project = payload.get('project', {})
+    task = {
+        'id': payload.get('taskId'),
+        'status': payload.get('status'),
+        'componentKey': project.get('key'),
+        'executedAt': payload.get('analysedAt'),
+    }
+
+    project_status = None
+    gate = payload.get('qualityGate')
+    if gate:
+        conditions = []
+        for condition in gate.get('conditions', []):
+            converted = {
+                'status': condition.get('status'),
+                'metricKey': condition.get('metric'),
+                'comparator': COMPARATORS.get(condition.get('operator'),
+                                              condition.get('operator')),
+            }
+            if 'errorThreshold' in condition:
+                converted['errorThreshold'] = condition['errorThreshold']
+            if 'value' in condition:
+                converted['actualValue'] = condition['value']
+            conditions.append(converted)
+        project_status = {'status': gate.get('status'), 'conditions': conditions}
+
+    return {
+        'task': task,
+        'project': project,
+        'projectStatus': project_status,
+        'payload': payload,
+    }
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler for webhook payloads, delegating to the receiver.
+    """
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        code = self.server.receiver.handle(body, self.headers.get(SIGNATURE_HEADER))
+        self.send_response(code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        # Silence request logging
+        pass
+
+
+class WebhookServer(ThreadingMixIn, HTTPServer):
+    """
+    HTTP server handling each request in a thread.
+    """
+    daemon_threads = True
+
+
+class WebhookReceiver(object):
+    """
+    Local HTTP server that accepts SonarQube webhook payloads, verifies their
+    signature and dispatches the parsed events to callbacks and/or a queue.
+
+    Callbacks run in the request thread. Events are put in a queue.Queue
+    directly, or in an asyncio.Queue through its event loop when one is given.
+    """
+
+    def __init__(self, host='localhost', port=0, secret=None, callbacks=None,
+                 queue=None, loop=None):
+        """
+        Set the server address and dispatch targets.
+
+        :param host: interface to listen on
+        :param port: port to listen on (0 for any free port)
+        :param secret: webhook secret to verify signatures (optional)
+        :param callbacks: iterable of functions called with each event
+        :param queue: queue to put each event in
+        :param loop: asyncio event loop of the queue, if it's an asyncio.Queue
+        """
+        self.secret = secret
+        self.callbacks = list(callbacks or [])
+        self.queue = queue
+        self.loop = loop
+        self._server = WebhookServer((host, port), WebhookRequestHandler)
+        self._server.receiver = self
+        self._serving = False
+        self._thread = None
+
+    @property
+    def address(self):
+        """
+        Address (host, port) the server listens on.
+        """
+        return self._server.server_address[:2]
+
+    @property
+    def url(self):
+        """
+        URL to configure as webhook in the server.
+        """
+        return 'http://{}:{}/'.format(*self.address)
+
+    def add_callback(self, callback):
+        """
+        Add a function to call with each event.
+
+        :param callback: function that takes an event data dict
+        """
+        self.callbacks.append(callback)
+
+    def handle(self, body, signature=None):
+        """
+        Verify, parse and dispatch a webhook payload.
+
+        :param body: payload as bytes
+        :param signature: signature sent in the request header
+        :return: HTTP status code of the response
+        """
+        if self.secret and not verify_signature(body, signature, self.secret):
+            return 401
+
+        try:
+            event = parse_payload(json.loads(body.decode('utf-8')))
+        except (ValueError, AttributeError):
+            return 400
+
+        try:
+            self.dispatch(event)
+        except Exception:
+            return 500
+        return 200
+
+    def dispatch(self, event):
+        """
+        Send an event to callbacks and queue.
+
+        :param event: event data dict
+        """
+        for callback in self.callbacks:
+            callback(event)
+
+        if self.queue is not None:
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+            else:
+                self.queue.put(event)
+
+    def serve_forever(self):
+        """
+        Handle requests until stopped.
+        """
+        self._serving = True
+        self._server.serve_forever()
+
+    def start(self):
+        """
+        Handle requests in a background thread.
+        """
+        self._serving = True
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop handling requests and close the server.
+        """
+        if self._serving:
+            self._server.shutdown()
+            self._serving = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
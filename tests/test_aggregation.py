@@ -0,0 +1,63 @@
+import math
+from unittest import TestCase, skipUnless
+
+try:
+    import numpy
+    from sonarqube_api.aggregation import MetricsTable
+except ImportError:
+    numpy = None
+
+
+RESOURCES = [
+    {'key': 'p1', 'name': 'One', 'qualifier': 'TRK', 'lang': 'py',
+     'msr': [{'key': 'coverage', 'val': 80.0}, {'key': 'lines_to_cover', 'val': 1000.0},
+             {'key': 'violations', 'val': 10.0},
+             {'key': 'sqale_index', 'ctic_key': 'TESTABILITY', 'val': 30.0}]},
+    {'key': 'p2', 'name': 'Two', 'qualifier': 'TRK', 'lang': 'js',
+     'msr': [{'key': 'coverage', 'val': 40.0}, {'key': 'lines_to_cover', 'val': 3000.0},
+             {'key': 'violations', 'val': 30.0}]},
+    {'key': 'p3', 'name': 'Three', 'qualifier': 'BRC', 'lang': 'py',
+     'msr': [{'key': 'violations', 'val': 5.0}, {'key': 'alert_status', 'data': 'OK'}]},
+]
+
+
+@skipUnless(numpy, 'requires numpy')
+class MetricsTableTest(TestCase):
+
+    def setUp(self):
+        self.table = MetricsTable.from_resources(RESOURCES, tags={'p1': ['team-a', 'core'], 'p2': ['team-a']})
+
+    def test_from_resources(self):
+        # One row per resource, one column per numeric metric
+        self.assertEqual(len(self.table), 3)
+        self.assertEqual(self.table.keys, ['p1', 'p2', 'p3'])
+        self.assertEqual(self.table.metrics, ['coverage', 'lines_to_cover', 'violations',
+                                              'sqale_index:TESTABILITY'])
+        self.assertEqual(self.table.values.shape, (3, 4))
+        self.assertTrue(math.isnan(self.table.column('coverage')[2]))
+        self.assertTrue(numpy.isnan(self.table.column('ncloc')).all())
+
+    def test_aggregates(self):
+        self.assertEqual(self.table.total('violations'), 45.0)
+        self.assertEqual(self.table.mean('coverage'), 60.0)
+        self.assertEqual(self.table.weighted_average('coverage', 'lines_to_cover'), 50.0)
+        self.assertEqual(self.table.percentile('violations', 50), 10.0)
+        self.assertEqual(list(self.table.percentile('violations', [0, 100])), [5.0, 30.0])
+        self.assertTrue(math.isnan(self.table.weighted_average('ncloc', 'lines_to_cover')))
+
+    def test_group_by(self):
+        # Single-valued attribute
+        groups = self.table.group_by('qualifier')
+        self.assertEqual(sorted(groups), ['BRC', 'TRK'])
+        self.assertEqual(groups['TRK'].keys, ['p1', 'p2'])
+        self.assertEqual(groups['BRC'].total('violations'), 5.0)
+        self.assertEqual(self.table.group_total('lang', 'violations'), {'js': 30.0, 'py': 15.0})
+
+        # Tags, resources belong to every group of their tags
+        self.assertEqual(self.table.group_by('tags')['team-a'].keys, ['p1', 'p2'])
+        self.assertEqual(self.table.group_total('tags', 'violations'), {'core': 10.0, 'team-a': 40.0})
+        self.assertEqual(self.table.group_weighted_average('tags', 'coverage', 'lines_to_cover'),
+                         {'core': 80.0, 'team-a': 50.0})
+        averages = self.table.group_weighted_average('qualifier', 'coverage', 'lines_to_cover')
+        self.assertEqual(averages['TRK'], 50.0)
+        self.assertTrue(math.isnan(averages['BRC']))
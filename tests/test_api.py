@@ -1,5 +1,7 @@
 __author__ = 'claudio.melendrez'
 
+import threading
+import time
 from unittest import TestCase
 
 try:
@@ -8,7 +10,10 @@ except ImportError:
     import mock
 
 from sonarqube_api import SonarAPIHandler
-from sonarqube_api.exceptions import ClientError, AuthError, ValidationError, ServerError
+from sonarqube_api.utils import parse_datetime
+from sonarqube_api.exceptions import (
+    ClientError, AuthError, ValidationError, SearchWindowError, ServerError, TaskTimeoutError
+)
 
 
 class SonarAPIHandlerTest(TestCase):
@@ -33,7 +38,194 @@ class SonarAPIHandlerTest(TestCase):
             "http://localhost:9000{}".format(test.RESOURCES_ENDPOINT),
             test._get_url(test.RESOURCES_ENDPOINT))
 
-    @mock.patch('sonarqube_api.api.requests.Session.get')
+    def test_thread_safe_sessions(self):
+        # One session per thread, sharing auth and the connection pool
+        h = SonarAPIHandler(token='t0k3n', pool_size=32)
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(h._transport.session)) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertIs(h._transport.session, h._transport.session)
+        self.assertEqual(len(set(id(s) for s in sessions + [h._transport.session])), 4)
+        adapter = h._transport.session.get_adapter('http://localhost')
+        self.assertEqual(adapter._pool_maxsize, 32)
+        for session in sessions:
+            self.assertEqual(session.auth, ('t0k3n', ''))
+            self.assertIs(session.get_adapter('https://localhost'), adapter)
+
+        # Closing the handler closes all sessions
+        with mock.patch('requests.Session.close') as mock_close:
+            h.close()
+            self.assertEqual(mock_close.call_count, 4)
+
+    @mock.patch('requests.Session.get')
+    def test_coalesced_calls(self, mock_get):
+        # Slow server: response is held until released
+        started, release = threading.Event(), threading.Event()
+        resp = mock.MagicMock(status_code=200)
+        resp.json.return_value = {'p': 1, 'ps': 100, 'total': 0, 'metrics': []}
+
+        def slow_get(url, data=None):
+            started.set()
+            release.wait(5)
+            return resp
+        mock_get.side_effect = slow_get
+
+        # Start one call, then four identical ones while it's in flight
+        h = SonarAPIHandler(coalesce=True)
+        results = []
+        call = lambda: results.append(h._make_call('get', h.METRICS_LIST_ENDPOINT, f='name'))
+        threads = [threading.Thread(target=call)]
+        threads[0].start()
+        started.wait(5)
+        threads.extend(threading.Thread(target=call) for _ in range(4))
+        for t in threads[1:]:
+            t.start()
+
+        # A different call is not coalesced
+        other = threading.Thread(target=lambda: h._make_call('get', h.METRICS_LIST_ENDPOINT, f='key'))
+        other.start()
+        time.sleep(0.2)
+        release.set()
+        for t in threads + [other]:
+            t.join()
+
+        # Only two calls made, all identical callers got the same response
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r is resp for r in results))
+
+        # Errors are raised as usual, and nothing is left in flight
+        started.clear()
+        resp.status_code = 500
+        resp.reason = 'Internal Server Error'
+        self.assertRaises(ServerError, h._make_call, 'get', h.METRICS_LIST_ENDPOINT)
+        self.assertEqual(h._in_flight, {})
+
+    @mock.patch('sonarqube_api.api._clock')
+    @mock.patch('sonarqube_api.api.time')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_wait_for_tasks(self, mock_call, mock_time, mock_clock):
+        # Server state by round: t1 in progress and t2 pending, then t1 done, then t2 done
+        rounds = [
+            [{'id': 't0', 'status': 'IN_PROGRESS', 'submittedAt': '2017-01-01T09:59:00+0000'},
+             {'id': 't2', 'status': 'PENDING', 'submittedAt': '2017-01-01T10:00:02+0000'},
+             {'id': 't1', 'status': 'PENDING', 'submittedAt': '2017-01-01T10:00:01+0000'}],
+            [{'id': 't2', 'status': 'IN_PROGRESS', 'submittedAt': '2017-01-01T10:00:02+0000'}],
+            [],
+        ]
+        state = {'round': 0}
+        mock_clock.return_value = 100.0
+        mock_time.sleep.side_effect = lambda s: state.update({'round': state['round'] + 1})
+
+        def call(method, endpoint, **qs):
+            if endpoint == self.h.CE_TASK_ENDPOINT:
+                data = {'task': {'id': qs['id'], 'status': 'SUCCESS', 'executionTimeMs': 4000}}
+            elif qs['status'] == 'SUCCESS':
+                data = {'tasks': [{'id': 'x', 'executionTimeMs': ms} for ms in (2000, 6000, 8000)]}
+            else:
+                data = {'tasks': rounds[state['round']]}
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value=data))
+        mock_call.side_effect = call
+
+        # Tasks are yielded as they complete
+        tasks = self.h.wait_for_tasks(['t1', 't2'], min_interval=0.5, max_interval=60)
+        self.assertEqual([t['id'] for t in tasks], ['t1', 't2'])
+
+        # Waits adapt to the queue: half the expected time of t1 (first pending,
+        # typical 6s), then of t2 (in progress, typical 6s updated with t1's 4s)
+        self.assertEqual(mock_time.sleep.mock_calls, [mock.call(3.0), mock.call(2.7)])
+
+        # Single task staying in queue, with timeout exceeded
+        state['round'] = 0
+        mock_time.sleep.side_effect = None
+        mock_clock.side_effect = [100.0, 100.0, 200.0]
+        with self.assertRaises(TaskTimeoutError):
+            self.h.wait_for_task('t1', timeout=30)
+
+    @mock.patch('sonarqube_api.api._clock')
+    @mock.patch('sonarqube_api.api.time')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_wait_for_tasks_timeout(self, mock_call, mock_time, mock_clock):
+        # Typical duration (20s) longer than the timeout, t1 done just before it
+        state = {'queue': [{'id': 't1', 'status': 'IN_PROGRESS',
+                            'submittedAt': '2017-01-01T10:00:01+0000'}]}
+        clock = {'now': 100.0}
+        mock_clock.side_effect = lambda: clock['now']
+
+        def sleep(seconds):
+            clock['now'] += seconds
+            state['queue'] = []
+        mock_time.sleep.side_effect = sleep
+
+        def call(method, endpoint, **qs):
+            if endpoint == self.h.CE_TASK_ENDPOINT:
+                data = {'task': {'id': qs['id'], 'status': 'SUCCESS', 'executionTimeMs': 4900}}
+            elif qs['status'] == 'SUCCESS':
+                data = {'tasks': [{'id': 'x', 'executionTimeMs': 20000}]}
+            else:
+                data = {'tasks': state['queue']}
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value=data))
+        mock_call.side_effect = call
+
+        # Waits up to the timeout before polling again, instead of giving up
+        self.assertEqual(self.h.wait_for_task('t1', timeout=5)['status'], 'SUCCESS')
+        self.assertEqual(mock_time.sleep.mock_calls, [mock.call(5.0)])
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_walk_components(self, mock_call):
+        # Two projects, one with a module with two directories
+        tree = {
+            'p1': [{'key': 'p1:m', 'qualifier': 'BRC'}, {'key': 'p1:a.py', 'qualifier': 'FIL'}],
+            'p1:m': [{'key': 'p1:m:d1', 'qualifier': 'DIR'}, {'key': 'p1:m:d2', 'qualifier': 'DIR'}],
+            'p1:m:d1': [{'key': 'p1:m:d1/b.py', 'qualifier': 'FIL'}, {'key': 'p1:m:d1/test_b.py', 'qualifier': 'UTS'}],
+            'p1:m:d2': [],
+            'p2': [{'key': 'p2:c.py', 'qualifier': 'FIL'}],
+        }
+
+        def call(method, endpoint, **qs):
+            # Paged search of projects and children, pages of one component
+            if endpoint in (self.h.COMPONENTS_SHOW_ENDPOINT, self.h.MEASURES_COMPONENT_ENDPOINT):
+                data = {'component': {'key': qs['component'], 'qualifier': 'TRK'}}
+            else:
+                if endpoint == self.h.COMPONENTS_SEARCH_ENDPOINT:
+                    components = [{'key': 'p1', 'qualifier': 'TRK'}, {'key': 'p2', 'qualifier': 'TRK'}]
+                else:
+                    components = tree[qs['component']]
+                page = qs.get('p', 1)
+                data = {'paging': {'pageIndex': page, 'pageSize': 1, 'total': len(components)},
+                        'components': components[page - 1:page]}
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value=data))
+        mock_call.side_effect = call
+
+        # Walk all projects: components yielded level by level
+        components = list(self.h.walk_components(workers=3))
+        levels = [['p1', 'p2'], ['p1:a.py', 'p1:m', 'p2:c.py'], ['p1:m:d1', 'p1:m:d2'],
+                  ['p1:m:d1/b.py', 'p1:m:d1/test_b.py']]
+        keys = [c['key'] for c in components]
+        for level in levels:
+            self.assertEqual(sorted(keys[:len(level)]), level)
+            keys = keys[len(level):]
+        self.assertEqual(keys, [])
+
+        # Files and tests are never expanded
+        mock_call.assert_any_call('get', self.h.COMPONENTS_TREE_ENDPOINT, component='p1:m:d1',
+                                  strategy='children', ps=self.h.MAX_PAGE_SIZE)
+        for args, kwargs in mock_call.call_args_list:
+            self.assertNotIn(kwargs.get('component'), ('p1:a.py', 'p1:m:d1/b.py', 'p1:m:d1/test_b.py'))
+
+        # Walk a project with measures
+        mock_call.reset_mock()
+        components = list(self.h.walk_components(projects=['p2'], metrics=['coverage', 'ncloc']))
+        self.assertEqual([c['key'] for c in components], ['p2', 'p2:c.py'])
+        mock_call.assert_any_call('get', self.h.MEASURES_COMPONENT_ENDPOINT,
+                                  component='p2', metricKeys='coverage,ncloc')
+        mock_call.assert_any_call('get', self.h.MEASURES_COMPONENT_TREE_ENDPOINT, component='p2',
+                                  strategy='children', ps=self.h.MAX_PAGE_SIZE, metricKeys='coverage,ncloc')
+
+    @mock.patch('requests.Session.get')
     def test_validate_auth(self, mock_res):
         resp = mock.MagicMock(status_code=200)
         mock_res.return_value = resp
@@ -50,7 +242,7 @@ class SonarAPIHandlerTest(TestCase):
         resp.json.return_value = {'valid': True}
         self.assertTrue(self.h.validate_authentication())
 
-    @mock.patch('sonarqube_api.api.requests.Session.get')
+    @mock.patch('requests.Session.get')
     def test_errors(self, mock_get):
         # Empty response , cannot get next
         resp = mock.MagicMock(status_code=200)
@@ -83,7 +275,7 @@ class SonarAPIHandlerTest(TestCase):
         resp.reason = 'Internal Server Error'
         self.assertRaises(ServerError, next, self.h.get_metrics())
 
-    @mock.patch('sonarqube_api.api.requests.Session.post')
+    @mock.patch('requests.Session.post')
     def test_activate_rule(self, mock_post):
         # Missing param key
         resp = mock.MagicMock(status_code=400)
@@ -106,7 +298,88 @@ class SonarAPIHandlerTest(TestCase):
         mock_post.assert_called_with(url, data={'rule_key': 'py:S1291', 'profile_key': 'py-234454',
                                                 'reset': 'false', 'params': 'format=^setUp|tearDown$'})
 
-    @mock.patch('sonarqube_api.api.requests.Session.post')
+    @mock.patch('requests.Session.post')
+    def test_deactivate_rule(self, mock_post):
+        mock_post.return_value = mock.MagicMock(status_code=204)
+        self.h.deactivate_rule('py:S1291', 'py-234454')
+        mock_post.assert_called_once_with(self.h._get_url(self.h.RULES_DEACTIVATION_ENDPOINT),
+                                          data={'rule_key': 'py:S1291', 'profile_key': 'py-234454'})
+
+    @mock.patch('requests.Session.post')
+    def test_bulk_change_issues(self, mock_post):
+        def bulk_change(url, data=None):
+            # Fail batches with issue AV4, ignore AV2
+            keys = data['issues'].split(',')
+            if 'AV4' in keys:
+                return mock.MagicMock(status_code=400, json=mock.MagicMock(
+                    return_value={'errors': [{'msg': 'Issue AV4 is invalid'}]}))
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value={
+                'total': len(keys), 'success': len(keys) - keys.count('AV2'),
+                'ignored': keys.count('AV2'), 'failures': 0
+            }))
+        mock_post.side_effect = bulk_change
+
+        # Change 7 issues in batches of 2
+        result = self.h.bulk_change_issues(
+            ('AV{}'.format(i) for i in range(7)), assign='pancho', add_tags=['triage', 'legacy'],
+            transition='confirm', severity='minor', batch_size=2, workers=3
+        )
+        self.assertEqual(result, {'total': 7, 'success': 4, 'ignored': 1, 'failures': 2})
+
+        # Check calls, one per batch with the same changes
+        url = self.h._get_url(self.h.ISSUES_BULK_CHANGE_ENDPOINT)
+        self.assertEqual(mock_post.call_count, 4)
+        mock_post.assert_any_call(url, data={
+            'issues': 'AV0,AV1', 'assign': 'pancho', 'add_tags': 'triage,legacy',
+            'do_transition': 'confirm', 'set_severity': 'MINOR', 'sendNotifications': 'false'
+        })
+        mock_post.assert_any_call(url, data={
+            'issues': 'AV6', 'assign': 'pancho', 'add_tags': 'triage,legacy',
+            'do_transition': 'confirm', 'set_severity': 'MINOR', 'sendNotifications': 'false'
+        })
+
+    @mock.patch('requests.Session.post')
+    def test_create_projects(self, mock_post):
+        def create(url, data=None):
+            # Project lol:hahaha already exists
+            if data['project'] == 'lol:hahaha':
+                return mock.MagicMock(status_code=400, json=mock.MagicMock(
+                    return_value={'errors': [{'msg': 'Project already exists'}]}))
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value={
+                'project': {'key': data['project'], 'name': data['name'],
+                            'visibility': data.get('visibility', 'public')}
+            }))
+        mock_post.side_effect = create
+
+        # Create 3 projects, one fails
+        results = sorted(self.h.create_projects(['wow:wtf', 'lol:hahaha', 'wow:omg'],
+                                                visibility='private', workers=2))
+        self.assertEqual([(k, p and p['visibility']) for k, p, e in results],
+                         [('lol:hahaha', None), ('wow:omg', 'private'), ('wow:wtf', 'private')])
+        self.assertIsInstance(results[0][2], ValidationError)
+        mock_post.assert_any_call(self.h._get_url(self.h.PROJECTS_CREATE_ENDPOINT), data={
+            'project': 'wow:wtf', 'name': 'wow:wtf', 'visibility': 'private'
+        })
+
+    @mock.patch('requests.Session.post')
+    def test_delete_projects(self, mock_post):
+        def bulk_delete(url, data=None):
+            # Fail batches with project p4
+            if 'p4' in data['projects'].split(','):
+                return mock.MagicMock(status_code=500, reason='Internal Server Error')
+            return mock.MagicMock(status_code=204)
+        mock_post.side_effect = bulk_delete
+
+        # Delete 5 projects in batches of 2
+        results = sorted(self.h.delete_projects(('p{}'.format(i) for i in range(5)),
+                                                batch_size=2, workers=2))
+        self.assertEqual([(keys, error is None) for keys, error in results],
+                         [(['p0', 'p1'], True), (['p2', 'p3'], True), (['p4'], False)])
+        self.assertIsInstance(results[2][1], ServerError)
+        mock_post.assert_any_call(self.h._get_url(self.h.PROJECTS_BULK_DELETE_ENDPOINT),
+                                  data={'projects': 'p0,p1'})
+
+    @mock.patch('requests.Session.post')
     def test_create_rule(self, mock_post):
         # Rule exists, error
         resp = mock.MagicMock(status_code=400)
@@ -132,6 +405,79 @@ class SonarAPIHandlerTest(TestCase):
         url = self.h._get_url(self.h.RULES_CREATE_ENDPOINT)
         mock_post.assert_called_with(url, data=posted_data)
 
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_get_issues(self, mock_call):
+        # Small results window: 8 issues, 5 of them created the same day
+        self.h.MAX_SEARCH_RESULTS = 3
+        issues = [{'key': 'i{}'.format(i), 'creationDate': d} for i, d in enumerate([
+            '2017-01-01T10:00:00+0000', '2017-01-15T10:00:00+0100', '2017-02-01T00:00:00+0000',
+            '2017-02-03T10:00:00+0000', '2017-02-03T11:00:00+0000', '2017-02-03T12:00:00+0000',
+            '2017-02-03T13:00:00+0000', '2017-02-03T14:00:00+0000',
+        ])]
+
+        def search(method, endpoint, **qs):
+            # Filter by creation date window (half-open) and sort
+            matches = sorted(issues, key=lambda i: parse_datetime(i['creationDate']))
+            if 'createdAfter' in qs:
+                after, before = parse_datetime(qs['createdAfter']), parse_datetime(qs['createdBefore'])
+                matches = [i for i in matches if after <= parse_datetime(i['creationDate']) < before]
+            page, page_size = qs.get('p', 1), qs.get('ps', 100)
+            data = {'paging': {'pageIndex': page, 'pageSize': page_size, 'total': len(matches)},
+                    'issues': matches[(page - 1) * page_size:page * page_size]}
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value=data))
+        mock_call.side_effect = search
+
+        # All issues are yielded, even if total exceeds the window
+        result = list(self.h.get_issues(projects='prj', created_before='2017-03-01'))
+        self.assertEqual(sorted(i['key'] for i in result), ['i{}'.format(i) for i in range(8)])
+
+        # Oldest issue was searched first, and no window exceeded the results window
+        self.assertEqual(mock_call.call_args_list[0], mock.call(
+            'get', self.h.ISSUES_SEARCH_ENDPOINT, componentKeys='prj', ps=1, s='CREATION_DATE', asc='true'
+        ))
+        windows = [kwargs for _, kwargs in mock_call.call_args_list if kwargs['ps'] == self.h.MAX_PAGE_SIZE]
+        self.assertGreater(len(windows), 2)
+        for kwargs in windows:
+            self.assertLessEqual(search('get', self.h.ISSUES_SEARCH_ENDPOINT, **kwargs).json()['paging']['total'], 3)
+
+        # Nothing to split if there are no issues
+        mock_call.reset_mock()
+        issues = []
+        self.assertEqual(list(self.h.get_issues()), [])
+        self.assertEqual(mock_call.call_count, 1)
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_get_measures_history(self, mock_call):
+        # Two pages of history (by date) for each project, page size of two dates
+        history = {
+            'coverage': [('2017-01-01T10:00:00+0000', '70.0'), ('2017-01-02T10:00:00+0000', '71.0'),
+                         ('2017-01-03T10:00:00+0000', '72.5')],
+            'sqale_index': [('2017-01-01T10:00:00+0000', '120'), ('2017-01-02T10:00:00+0000', '118'),
+                            ('2017-01-03T10:00:00+0000', None)],
+        }
+
+        def search_history(method, endpoint, **qs):
+            page = qs.get('p', 1)
+            data = {'paging': {'pageIndex': page, 'pageSize': 2, 'total': 3}, 'measures': [
+                {'metric': m, 'history': [{'date': d, 'value': v} for d, v in history[m][(page - 1) * 2:page * 2]]}
+                for m in qs['metrics'].split(',')
+            ]}
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value=data))
+        mock_call.side_effect = search_history
+
+        # Get history of two projects
+        result = dict(self.h.get_measures_history(projects=['p1', 'p2'], metrics=['coverage', 'sqale_index'],
+                                                  from_date='2017-01-01'))
+        self.assertEqual(sorted(result), ['p1', 'p2'])
+        coverage = result['p1']['coverage']
+        self.assertEqual(list(coverage.values), [70.0, 71.0, 72.5])
+        self.assertEqual(len(result['p2']['sqale_index']), 3)
+
+        # Check calls, two pages per project
+        self.assertEqual(mock_call.call_count, 4)
+        mock_call.assert_any_call('get', self.h.MEASURES_HISTORY_ENDPOINT, component='p2',
+                                  metrics='coverage,sqale_index', ps=1000, p=2, **{'from': '2017-01-01'})
+
     @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
     def test_get_metrics(self, mock_call):
         # Two pages, once each
@@ -158,6 +504,114 @@ class SonarAPIHandlerTest(TestCase):
             'get', self.h.METRICS_LIST_ENDPOINT, f='coverage,violations', p=2
         )
 
+    @mock.patch('requests.Session.get')
+    def test_get_quality_gates_status(self, mock_get):
+        def project_status(url, data=None):
+            if data['projectKey'] == 'missing':
+                return mock.MagicMock(status_code=404, reason='Not Found')
+            status = 'ERROR' if data['projectKey'] == 'bad' else 'OK'
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value={
+                'projectStatus': {'status': status, 'conditions': []}
+            }))
+        mock_get.side_effect = project_status
+
+        # Single project
+        self.assertEqual(self.h.get_quality_gate_status('good'), {'status': 'OK', 'conditions': []})
+        mock_get.assert_called_once_with(self.h._get_url(self.h.QUALITY_GATE_STATUS_ENDPOINT),
+                                         data={'projectKey': 'good'})
+
+        # Many projects, errors are yielded too
+        results = sorted(self.h.get_quality_gates_status(['good', 'bad', 'missing'], workers=3))
+        self.assertEqual(results[0][:2], ('bad', {'status': 'ERROR', 'conditions': []}))
+        self.assertEqual(results[1][:2], ('good', {'status': 'OK', 'conditions': []}))
+        self.assertEqual(results[2][:2], ('missing', None))
+        self.assertIsInstance(results[2][2], ClientError)
+
+    @mock.patch('requests.Session.get')
+    def test_get_sources(self, mock_get):
+        def raw(url, data=None):
+            if data['key'] == 'p:missing.py':
+                return mock.MagicMock(status_code=404, reason='Not Found')
+            return mock.MagicMock(status_code=200, content=u'# {}\n'.format(data['key']).encode('utf-8'))
+        mock_get.side_effect = raw
+
+        # Single file
+        self.assertEqual(self.h.get_source('p:a.py'), b'# p:a.py\n')
+        mock_get.assert_called_once_with(self.h._get_url(self.h.SOURCES_RAW_ENDPOINT),
+                                         data={'key': 'p:a.py'})
+
+        # Many files, errors are yielded too
+        results = sorted(self.h.get_sources(['p:b.py', 'p:missing.py'], workers=2))
+        self.assertEqual(results[0], ('p:b.py', b'# p:b.py\n', None))
+        self.assertEqual(results[1][:2], ('p:missing.py', None))
+        self.assertIsInstance(results[1][2], ClientError)
+
+    @mock.patch('requests.Session.get')
+    def test_get_analysis_date(self, mock_get):
+        # Date of the component, or of its closest ancestor
+        mock_get.return_value = mock.MagicMock(status_code=200, json=mock.MagicMock(side_effect=[
+            {'component': {'key': 'p', 'analysisDate': '2024-05-01T10:00:00+0000'}},
+            {'component': {'key': 'p:src/a.py'}, 'ancestors': [
+                {'key': 'p:src'}, {'key': 'p', 'analysisDate': '2024-05-08T10:00:00+0000'}
+            ]},
+            {'component': {'key': 'new'}, 'ancestors': []},
+        ]))
+        self.assertEqual(self.h.get_analysis_date('p'), '2024-05-01T10:00:00+0000')
+        self.assertEqual(self.h.get_analysis_date('p:src/a.py'), '2024-05-08T10:00:00+0000')
+        self.assertIsNone(self.h.get_analysis_date('new'))
+        mock_get.assert_called_with(self.h._get_url(self.h.COMPONENTS_SHOW_ENDPOINT),
+                                    data={'component': 'new'})
+
+    @mock.patch('requests.Session.get')
+    def test_get_group_memberships(self, mock_get):
+        def users(url, data=None):
+            if data['name'] == 'missing':
+                return mock.MagicMock(status_code=404, reason='Not Found')
+            logins = {'devs': ['alice', 'bob'], 'ops': []}[data['name']]
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value={
+                'p': 1, 'ps': 500, 'total': len(logins), 'users': [{'login': l} for l in logins]
+            }))
+        mock_get.side_effect = users
+
+        # Members only, many groups at once, errors are yielded too
+        results = sorted(self.h.get_group_memberships(['devs', 'missing', 'ops'], workers=2))
+        self.assertEqual(results[0], ('devs', {'alice', 'bob'}, None))
+        self.assertEqual(results[1][:2], ('missing', None))
+        self.assertIsInstance(results[1][2], ClientError)
+        self.assertEqual(results[2], ('ops', set(), None))
+        mock_get.assert_any_call(self.h._get_url(self.h.USER_GROUPS_USERS_ENDPOINT),
+                                 data={'name': 'devs', 'selected': 'selected', 'ps': 500})
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_group_changes(self, mock_call):
+        mock_call.return_value.json.return_value = {'group': {'name': 'devs'}}
+        self.assertEqual(self.h.create_group('devs'), {'name': 'devs'})
+        mock_call.assert_called_with('post', self.h.USER_GROUPS_CREATE_ENDPOINT, name='devs')
+
+        self.h.add_group_member('devs', 'alice')
+        mock_call.assert_called_with('post', self.h.USER_GROUPS_ADD_USER_ENDPOINT,
+                                     name='devs', login='alice')
+        self.h.remove_group_member('devs', 'bob')
+        mock_call.assert_called_with('post', self.h.USER_GROUPS_REMOVE_USER_ENDPOINT,
+                                     name='devs', login='bob')
+
+        # Global and project permissions
+        self.h.add_group_permission('devs', 'scan')
+        mock_call.assert_called_with('post', self.h.PERMISSIONS_ADD_GROUP_ENDPOINT,
+                                     groupName='devs', permission='scan')
+        self.h.remove_group_permission('devs', 'admin', project='p')
+        mock_call.assert_called_with('post', self.h.PERMISSIONS_REMOVE_GROUP_ENDPOINT,
+                                     groupName='devs', permission='admin', projectKey='p')
+        self.h.add_user_permission('alice', 'user', project='p')
+        mock_call.assert_called_with('post', self.h.PERMISSIONS_ADD_USER_ENDPOINT,
+                                     login='alice', permission='user', projectKey='p')
+
+        # External users have no password
+        mock_call.return_value.json.return_value = {'user': {'login': 'carol'}}
+        self.assertEqual(self.h.create_user('carol', 'Carol', local=False), {'login': 'carol'})
+        mock_call.assert_called_with('post', self.h.USERS_CREATE_ENDPOINT,
+                                     login='carol', name='Carol', local='false')
+
     @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
     def test_get_rules(self, mock_call):
         # Two pages, once each
@@ -183,6 +637,116 @@ class SonarAPIHandlerTest(TestCase):
             activation='true', qprofile='prof1', languages='py,js', p=2
         )
 
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_get_rules_partitioned(self, mock_call):
+        # Small results window to force partitioning: py has to be split again
+        self.h.MAX_SEARCH_RESULTS = 3
+        rules = [
+            {'key': 'py:1', 'lang': 'py', 'repo': 'pylint'}, {'key': 'py:2', 'lang': 'py', 'repo': 'pylint'},
+            {'key': 'py:3', 'lang': 'py', 'repo': 'common'}, {'key': 'py:4', 'lang': 'py', 'repo': 'common'},
+            {'key': 'js:1', 'lang': 'js', 'repo': 'eslint'}, {'key': 'js:2', 'lang': 'js', 'repo': 'eslint'},
+        ]
+
+        def search(method, endpoint, **qs):
+            # Filter rules and build facets and pages of two rules
+            matches = [r for r in rules
+                       if qs.get('languages', r['lang']) == r['lang']
+                       and qs.get('repositories', r['repo']) == r['repo']]
+            page, page_size = qs.get('p', 1), qs.get('ps', 2)
+            data = {'p': page, 'ps': page_size, 'total': len(matches),
+                    'rules': matches[(page - 1) * page_size:page * page_size]}
+            if 'facets' in qs:
+                field = {'languages': 'lang', 'repositories': 'repo'}[qs['facets']]
+                values = sorted(set(r[field] for r in matches))
+                data['facets'] = [{'property': qs['facets'], 'values': [
+                    {'val': v, 'count': len([r for r in matches if r[field] == v])} for v in values
+                ]}]
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value=data))
+        mock_call.side_effect = search
+
+        # All rules are yielded once, even if total exceeds the window
+        result = list(self.h.get_rules())
+        self.assertEqual(sorted(r['key'] for r in result),
+                         ['js:1', 'js:2', 'py:1', 'py:2', 'py:3', 'py:4'])
+
+        # Python rules were partitioned by repository
+        mock_call.assert_any_call('get', self.h.RULES_LIST_ENDPOINT, is_template='no', statuses='READY',
+                                  languages='py', ps=1, facets='repositories')
+        mock_call.assert_any_call('get', self.h.RULES_LIST_ENDPOINT, is_template='no', statuses='READY',
+                                  languages='py', repositories='common')
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_get_rules_partition_exceeded(self, mock_call):
+        # Four rules of the same language, repository and severity
+        self.h.MAX_SEARCH_RESULTS = 3
+        values = {'languages': 'py', 'repositories': 'pylint', 'severities': 'MAJOR'}
+
+        def search(method, endpoint, **qs):
+            data = {'p': 1, 'ps': 2, 'total': 4, 'rules': [{'key': 'py:1'}, {'key': 'py:2'}]}
+            if 'facets' in qs:
+                data['facets'] = [{'property': qs['facets'], 'values': [
+                    {'val': values[qs['facets']], 'count': 4}
+                ]}]
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value=data))
+        mock_call.side_effect = search
+
+        # Can't be paged through completely, never truncated
+        with self.assertRaises(SearchWindowError) as ctx:
+            list(self.h.get_rules())
+        self.assertEqual(str(ctx.exception), "Can't split rules search any further: 4 rules with "
+                                             "languages=py, repositories=pylint, severities=MAJOR")
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_get_rules_partition_uncovered(self, mock_call):
+        # Half of the rules have no language in the facet
+        self.h.MAX_SEARCH_RESULTS = 20
+
+        def search(method, endpoint, **qs):
+            data = {'p': 1, 'ps': 2, 'total': 30, 'rules': [{'key': 'py:1'}, {'key': 'py:2'}]}
+            if 'facets' in qs:
+                data['facets'] = [{'property': 'languages', 'values': [{'val': 'py', 'count': 15}]}]
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value=data))
+        mock_call.side_effect = search
+
+        # Never drops the rules not in any partition
+        with self.assertRaises(SearchWindowError) as ctx:
+            list(self.h.get_rules())
+        self.assertEqual(str(ctx.exception), "Partitions of the search of {} cover 15 of its "
+                                             "30 results".format(self.h.RULES_LIST_ENDPOINT))
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_count_rules(self, mock_call):
+        resp = mock.MagicMock(status_code=200)
+        resp.json.return_value = {'p': 1, 'ps': 1, 'total': 5, 'rules': [{'key': 'lala'}]}
+        mock_call.return_value = resp
+
+        self.assertEqual(self.h.count_rules(languages='py'), 5)
+        mock_call.assert_called_once_with(
+            'get', self.h.RULES_LIST_ENDPOINT, is_template='no', statuses='READY',
+            languages='py', ps=1
+        )
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_get_rules_facet(self, mock_call):
+        resp = mock.MagicMock(status_code=200)
+        resp.json.return_value = {
+            'p': 1, 'ps': 1, 'total': 5, 'rules': [{'key': 'lala'}],
+            'facets': [{'property': 'languages', 'values': [{'val': 'py', 'count': 3},
+                                                            {'val': 'js', 'count': 2}]}]
+        }
+        mock_call.return_value = resp
+
+        # Get languages facet for active rules
+        facet = self.h.get_rules_facet('languages', active_only=True)
+        self.assertEqual(facet, [('py', 3), ('js', 2)])
+        mock_call.assert_called_once_with(
+            'get', self.h.RULES_LIST_ENDPOINT, is_template='no', statuses='READY',
+            activation='true', ps=1, facets='languages'
+        )
+
+        # Missing facet, empty list
+        self.assertEqual(self.h.get_rules_facet('repositories'), [])
+
     @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
     def test_get_resources_metrics(self, mock_call):
         # Note: resource metrics responses are not paged
@@ -1,5 +1,9 @@
 __author__ = 'kako'
 
+import json
+import os
+import shutil
+import tempfile
 from io import StringIO
 from unittest import TestCase
 
@@ -9,7 +13,15 @@ except ImportError:
     import mock
 
 from sonarqube_api.api import SonarAPIHandler
-from sonarqube_api.cmd import activate_rules, export_rules, migrate_rules
+from sonarqube_api.cmd import (
+    activate_rules, bulk_change_issues, bulk_projects, check_quality_gates, cli, diff_rules,
+    export_issues, export_rules, fetch_sources, import_rules, migrate_rules, sync_groups,
+    sync_measures, sync_profiles
+)
+from sonarqube_api.exceptions import ClientError
+from sonarqube_api.snapshots import read_snapshot, write_snapshot
+
+from .test_transports import start_keep_alive_server
 
 
 GET_RULES_DATA = [
@@ -52,7 +64,8 @@ class ExportRulesTest(TestCase):
         # Set call arguments: active only, spec profile and langs
         parse_mock.return_value = mock.MagicMock(
             host='localhost', port='9000', user='pancho', password='primero',
-            output='~', active=True, profile='prof1', languages='py,js'
+            output='~', active=True, profile='prof1', languages='py,js',
+            shard_by=None, snapshot=None
         )
 
         # Mock file handlers
@@ -64,8 +77,8 @@ class ExportRulesTest(TestCase):
         # Set data to receive from server
         get_rules_mock.return_value = iter(GET_RULES_DATA)
 
-        # Execute command
-        export_rules.main()
+        # Execute command (a failed rule doesn't change the exit status)
+        self.assertIsNone(export_rules.main())
 
         # Check call to get_rules, should be one
         get_rules_mock.assert_called_once_with(True, 'prof1', 'py,js')
@@ -87,6 +100,156 @@ class ExportRulesTest(TestCase):
 
         # TODO: add checks for html file write
 
+        # As a batch step, it fails
+        open_mock.side_effect = [csv_file, html_file]
+        get_rules_mock.return_value = iter(GET_RULES_DATA)
+        self.assertEqual(export_rules.run(SonarAPIHandler(), parse_mock.return_value, None), 1)
+
+    @mock.patch('sonarqube_api.cmd.export_rules.sys.stdout')
+    @mock.patch('sonarqube_api.cmd.export_rules.sys.stderr')
+    @mock.patch('sonarqube_api.cmd.export_rules.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.count_rules')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.get_rules_facet')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.get_rules')
+    def test_main_sharded(self, get_rules_mock, facet_mock, count_mock, parse_mock,
+                          stderr_mock, stdout_mock):
+        # Set call arguments: shard by language, render with two processes
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+        parse_mock.return_value = mock.MagicMock(
+            host='localhost', port='9000', user='pancho', password='primero',
+            output=output, active=False, profile='', languages='',
+            shard_by='language', jobs=2, processes=2,
+            snapshot=os.path.join(output, 'rules.jsonl')
+        )
+
+        # Set shards and data to receive from server
+        facet_mock.return_value = [('py', 3), ('js', 2)]
+        count_mock.return_value = 5
+        rules = {
+            'py': [r for r in GET_RULES_DATA if r['langName'] == 'Python'],
+            'js': [r for r in GET_RULES_DATA if r['langName'] == 'JavaScript'],
+        }
+        get_rules_mock.side_effect = lambda *args, **kwargs: iter(rules[kwargs['languages']])
+
+        # Execute command
+        export_rules.main()
+
+        # Check calls: one facet and one get_rules per shard
+        facet_mock.assert_called_once_with('languages', False, '', '')
+        get_rules_mock.assert_any_call(active_only=False, profile='', languages='py')
+        get_rules_mock.assert_any_call(active_only=False, profile='', languages='js')
+
+        # Check files, one csv and html per shard plus index and snapshot
+        self.assertEqual(sorted(os.listdir(output)), [
+            'index.html', 'rules-js.csv', 'rules-js.html', 'rules-py.csv', 'rules-py.html',
+            'rules.jsonl'
+        ])
+        with open(os.path.join(output, 'rules.jsonl')) as snapshot_f:
+            self.assertEqual(sorted(read_snapshot(snapshot_f)), ['L1456', 'S1456', 'X123', 'X1456'])
+        with open(os.path.join(output, 'rules-py.csv')) as csv_f:
+            self.assertEqual(csv_f.read().splitlines(), [
+                'language,key,name,debt,severity',
+                'Python,L1456,Do not break userspace,15,BLOCKER',
+                'Python,X123,Do not use so many elifs,15,MAJOR',
+            ])
+        with open(os.path.join(output, 'index.html')) as index_f:
+            self.assertEqual(index_f.read(), (
+                '<html><body><ul>'
+                '<li><a href="rules-js.html">js</a> (2 rules)</li>'
+                '<li><a href="rules-py.html">py</a> (2 rules)</li>'
+                '</ul></body></html>'
+            ))
+
+        # Check error and result output
+        stderr_mock.write.assert_called_once_with("Error: missing values for key\n")
+        stdout_mock.write.assert_called_once_with('Complete rules export: 4 exported and 1 failed.\n')
+
+        # Rules without language aren't in any shard, never exported partially
+        count_mock.return_value = 6
+        stderr_mock.reset_mock()
+        stdout_mock.reset_mock()
+        export_rules.main()
+        stderr_mock.write.assert_called_once_with("Error: Shards by language cover 5 of the 6 rules\n")
+        stdout_mock.write.assert_called_once_with('Incomplete rules export: 0 exported and 0 failed.\n')
+
+    @mock.patch('sonarqube_api.cmd.export_rules.sys.stdout')
+    @mock.patch('sonarqube_api.cmd.export_rules.sys.stderr')
+    @mock.patch('sonarqube_api.cmd.export_rules.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_main_sharded_languages(self, call_mock, parse_mock, stderr_mock, stdout_mock):
+        # Shard by language, only the languages given
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+        parse_mock.return_value = mock.MagicMock(
+            host='localhost', port='9000', user='pancho', password='primero',
+            output=output, active=False, profile='', languages='py,JS',
+            shard_by='language', jobs=2, processes=1, snapshot=None
+        )
+
+        # Facet with every language, and the rules of each shard
+        def call(method, endpoint, **qs):
+            if 'facets' in qs:
+                data = {'facets': [{'property': 'languages', 'values': [
+                    {'val': 'py', 'count': 2}, {'val': 'js', 'count': 2}, {'val': 'java', 'count': 1}
+                ]}]}
+            else:
+                languages = qs['languages'].split(',')
+                rules = [r for r in GET_RULES_DATA if 'key' in r
+                         and {'Python': 'py', 'JavaScript': 'js'}[r['langName']] in languages]
+                data = {'p': 1, 'ps': 500, 'total': len(rules), 'rules': rules}
+            return mock.MagicMock(json=mock.MagicMock(return_value=data))
+        call_mock.side_effect = call
+
+        # Execute command
+        export_rules.main()
+        stdout_mock.write.assert_called_once_with('Complete rules export: 4 exported and 0 failed.\n')
+        self.assertEqual(sorted(c[1].get('languages') for c in call_mock.call_args_list),
+                         ['js', 'py', 'py,js', 'py,js'])
+        self.assertEqual(sorted(os.listdir(output)), [
+            'index.html', 'rules-js.csv', 'rules-js.html', 'rules-py.csv', 'rules-py.html'
+        ])
+
+
+class ExportIssuesTest(TestCase):
+
+    @mock.patch('sonarqube_api.cmd.export_issues.sys.stdout')
+    @mock.patch('sonarqube_api.cmd.export_issues.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.get_issues')
+    def test_main(self, get_issues_mock, parse_mock, stdout_mock):
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+        issues = [
+            {'key': 'AV1', 'rule': 'py:S1', 'severity': 'MAJOR', 'component': 'prj:a.py', 'line': 3},
+            {'key': 'AV2', 'rule': 'py:S2', 'severity': 'MINOR', 'component': 'prj:b.py'},
+        ]
+
+        # Export as json lines
+        parse_mock.return_value = mock.MagicMock(
+            host='localhost', port='9000', output=os.path.join(output, 'issues.jsonl'),
+            format='jsonl', projects='prj', severities=None, statuses='OPEN', types=None,
+            created_after='2017-01-01', created_before=None, workers=8
+        )
+        get_issues_mock.return_value = iter(issues)
+        export_issues.main()
+        get_issues_mock.assert_called_once_with(
+            projects='prj', severities=None, statuses='OPEN', types=None,
+            created_after='2017-01-01', created_before=None, workers=8
+        )
+        with open(os.path.join(output, 'issues.jsonl')) as f:
+            self.assertEqual([json.loads(l) for l in f], issues)
+        stdout_mock.write.assert_called_once_with('Complete issues export: 2 exported.\n')
+
+        # Export as csv
+        parse_mock.return_value.format = 'csv'
+        parse_mock.return_value.output = os.path.join(output, 'issues.csv')
+        get_issues_mock.return_value = iter(issues)
+        export_issues.main()
+        with open(os.path.join(output, 'issues.csv')) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], ','.join(export_issues.CSV_FIELDS))
+        self.assertEqual(lines[1], 'AV1,py:S1,MAJOR,,,,,prj:a.py,3,,,,,')
+
 
 class MigrateRulesTest(TestCase):
 
@@ -94,7 +257,7 @@ class MigrateRulesTest(TestCase):
     @mock.patch('sonarqube_api.cmd.export_rules.sys.stderr')
     @mock.patch('sonarqube_api.cmd.export_rules.argparse.ArgumentParser.parse_args')
     @mock.patch('sonarqube_api.api.SonarAPIHandler.get_rules')
-    @mock.patch('sonarqube_api.api.requests.Session.post')
+    @mock.patch('requests.Session.post')
     def test_main(self, post_mock, get_rules_mock, parse_mock, stderr_mock, stdout_mock):
         # Set call arguments: active only, spec profile and langs
         parse_mock.return_value = mock.MagicMock(
@@ -117,8 +280,8 @@ class MigrateRulesTest(TestCase):
                            json=mock.MagicMock(return_value={'errors': [{'msg': 'Missing field newField.'}]})),
         ]
 
-        # Execute command
-        migrate_rules.main()
+        # Execute command (a failed rule doesn't change the exit status)
+        self.assertIsNone(migrate_rules.main())
 
         # Check call to get_rules, should be one
         get_rules_mock.assert_called_once_with(active_only=True, custom_only=True)
@@ -138,8 +301,9 @@ class ActivateRulesTest(TestCase):
     @mock.patch('sonarqube_api.cmd.activate_rules.sys.stdout')
     @mock.patch('sonarqube_api.cmd.activate_rules.sys.stderr')
     @mock.patch('sonarqube_api.cmd.export_rules.argparse.ArgumentParser.parse_args')
-    @mock.patch('sonarqube_api.api.requests.Session.post')
-    def test_main(self, post_mock, parse_mock, stderr_mock,
+    @mock.patch('requests.Session.get')
+    @mock.patch('requests.Session.post')
+    def test_main(self, post_mock, get_mock, parse_mock, stderr_mock,
                   stdout_mock, open_mock):
         # Set call arguments
         parse_mock.return_value = mock.MagicMock(
@@ -158,6 +322,10 @@ class ActivateRulesTest(TestCase):
             'pylint:346,,,,,\n'
             # Customized rule: set severity and format
             'S123,,major,,,^foo|bar$\n'
+            # Already active with same severity and params: skipped
+            'S234,,MINOR,,,^test\n'
+            # Already active with other params: activated
+            'S345,,MINOR,,,^test\n'
             # Custom rule: set severity, xpath and message
             'X123,no,BLOCKER,\lala,Do not use lala,\n'
             # Error: incorrect severity
@@ -165,6 +333,18 @@ class ActivateRulesTest(TestCase):
         )
         open_mock.return_value = csv_file
 
+        # Current activations, prefetched in a single call
+        get_mock.return_value = mock.MagicMock(status_code=200, json=mock.MagicMock(return_value={
+            'p': 1, 'ps': 500, 'total': 2,
+            'rules': [{'key': 'S234'}, {'key': 'S345'}],
+            'actives': {
+                'S234': [{'qProfile': 'py-234345', 'severity': 'MINOR',
+                          'params': [{'key': 'format', 'value': '^test'}]}],
+                'S345': [{'qProfile': 'py-234345', 'severity': 'MINOR',
+                          'params': [{'key': 'format', 'value': '^test'}, {'key': 'max', 'value': '3'}]}],
+            }
+        }))
+
         # Set data to receive from server
         post_mock.side_effect = [
             # First fix rules OK
@@ -174,15 +354,16 @@ class ActivateRulesTest(TestCase):
             mock.MagicMock(status_code=200),
             mock.MagicMock(status_code=200),
             mock.MagicMock(status_code=200),
-            # Sixth rule wrong: bad severity
+            mock.MagicMock(status_code=200),
+            # Last rule wrong: bad severity
             mock.MagicMock(status_code=400, json=mock.MagicMock(return_value={'errors': [{
                     'msg': "Value of parameter 'severity' (SO-SO) "
                            "must be one of: [INFO, MINOR, MAJOR, CRITICAL, BLOCKER]."
             }]})),
         ]
 
-        # Execute command
-        activate_rules.main()
+        # Execute command (a failed rule doesn't change the exit status)
+        self.assertIsNone(activate_rules.main())
 
         # Check post calls
         # Note: check by one to ease debugging
@@ -205,10 +386,14 @@ class ActivateRulesTest(TestCase):
                        'severity': 'MAJOR', 'params': 'format=^foo|bar$'}
         ))
         self.assertEqual(post_mock.mock_calls[5], mock.call(
+            url, data={'profile_key': 'py-234345', 'rule_key': 'S345', 'reset': 'false',
+                       'severity': 'MINOR', 'params': 'format=^test'}
+        ))
+        self.assertEqual(post_mock.mock_calls[6], mock.call(
             url, data={'profile_key': 'py-234345', 'rule_key': 'X123', 'reset': 'false',
                        'severity': 'BLOCKER', 'params': 'message=Do not use lala;xpathQuery=\\lala'}
         ))
-        self.assertEqual(post_mock.mock_calls[6], mock.call(
+        self.assertEqual(post_mock.mock_calls[7], mock.call(
             url, data={'profile_key': 'py-234345', 'rule_key': 'X123', 'reset': 'false',
                        'severity': 'SO-SO', 'params': 'message=Do not use lala;xpathQuery=\\lala'}
         ))
@@ -219,5 +404,550 @@ class ActivateRulesTest(TestCase):
             "(SO-SO) must be one of: [INFO, MINOR, MAJOR, CRITICAL, BLOCKER].\n"
         )
 
-        # Check stdout write: 3 exported and 1 failed
-        stdout_mock.write.assert_called_once_with('Complete rules activation: 6 activated and 1 failed.\n')
+        # Check stdout write: 7 activated, 1 skipped and 1 failed
+        self.assertEqual(post_mock.call_count, 8)
+        get_mock.assert_called_once_with(h._get_url(h.RULES_LIST_ENDPOINT), data={
+            'activation': 'true', 'qprofile': 'py-234345', 'f': 'actives', 'ps': 500
+        })
+        stdout_mock.write.assert_called_once_with(
+            'Complete rules activation: 7 activated, 1 skipped and 1 failed.\n'
+        )
+
+
+class BulkChangeIssuesTest(TestCase):
+
+    @mock.patch('sonarqube_api.cmd.bulk_change_issues.sys')
+    @mock.patch('sonarqube_api.cmd.bulk_change_issues.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.bulk_change_issues')
+    def test_main(self, bulk_change_mock, parse_mock, sys_mock):
+        # Read keys from stdin
+        parse_mock.return_value = mock.MagicMock(
+            host='localhost', port='9000', filename='-', assign=None, add_tags='triage',
+            remove_tags=None, transition='wontfix', severity=None, type=None,
+            comment='Legacy code', notify=False, batch_size=None, workers=8
+        )
+        sys_mock.stdin = StringIO(u'AV1\n\nAV2\n  AV3  \n')
+        keys = []
+
+        def bulk_change(issue_keys, **kwargs):
+            keys.extend(issue_keys)
+            return {'total': 3, 'success': 2, 'ignored': 0, 'failures': 1}
+        bulk_change_mock.side_effect = bulk_change
+
+        # Execute command
+        bulk_change_issues.main()
+
+        # Check keys and changes
+        self.assertEqual(keys, ['AV1', 'AV2', 'AV3'])
+        bulk_change_mock.assert_called_once_with(
+            mock.ANY, assign=None, add_tags='triage', remove_tags=None, transition='wontfix',
+            severity=None, issue_type=None, comment='Legacy code', send_notifications=False,
+            batch_size=None, workers=8
+        )
+        sys_mock.stdout.write.assert_called_once_with(
+            'Complete issues bulk change: 2 changed, 0 ignored and 1 failed.\n'
+        )
+
+
+class BulkProjectsTest(TestCase):
+
+    @mock.patch('sonarqube_api.cmd.bulk_projects.sys')
+    @mock.patch('sonarqube_api.cmd.bulk_projects.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.create_projects')
+    def test_create(self, create_mock, parse_mock, sys_mock):
+        # Read keys from stdin
+        parse_mock.return_value = mock.MagicMock(
+            host='localhost', port='9000', action='create', filename='-',
+            visibility='private', batch_size=None, workers=8
+        )
+        sys_mock.stdin = StringIO(u'wow:wtf\n\nlol:hahaha\n')
+        keys = []
+
+        def create(project_keys, **kwargs):
+            keys.extend(project_keys)
+            yield 'wow:wtf', {'key': 'wow:wtf'}, None
+            yield 'lol:hahaha', None, Exception('Project already exists')
+        create_mock.side_effect = create
+
+        # Execute command, failed
+        self.assertEqual(bulk_projects.main(), 1)
+
+        # Check keys, progress and result
+        self.assertEqual(keys, ['wow:wtf', 'lol:hahaha'])
+        create_mock.assert_called_once_with(mock.ANY, visibility='private', workers=8)
+        sys_mock.stderr.write.assert_called_once_with(
+            'Failed to create project lol:hahaha: Project already exists\n'
+        )
+        self.assertEqual(sys_mock.stdout.write.mock_calls, [
+            mock.call('[1] Created project wow:wtf\n'),
+            mock.call('Complete projects create: 1 created and 1 failed.\n'),
+        ])
+
+    @mock.patch('sonarqube_api.cmd.bulk_projects.sys')
+    @mock.patch('sonarqube_api.cmd.bulk_projects.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.delete_projects')
+    def test_delete(self, delete_mock, parse_mock, sys_mock):
+        parse_mock.return_value = mock.MagicMock(
+            host='localhost', port='9000', action='delete', filename='-',
+            visibility=None, batch_size=2, workers=8
+        )
+        sys_mock.stdin = StringIO(u'p1\np2\np3\n')
+        delete_mock.return_value = iter([(['p1', 'p2'], None), (['p3'], None)])
+
+        # Execute command, all deleted
+        self.assertEqual(bulk_projects.main(), 0)
+        delete_mock.assert_called_once_with(mock.ANY, batch_size=2, workers=8)
+        self.assertEqual(sys_mock.stdout.write.mock_calls, [
+            mock.call('[2] Deleted 2 projects\n'),
+            mock.call('[3] Deleted 1 projects\n'),
+            mock.call('Complete projects delete: 3 deleted and 0 failed.\n'),
+        ])
+
+
+class SyncMeasuresTest(TestCase):
+
+    @mock.patch('sonarqube_api.cmd.sync_measures.sys.stdout')
+    @mock.patch('sonarqube_api.cmd.sync_measures.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.get_resources_full_data')
+    def test_main(self, get_resources_mock, parse_mock, stdout_mock):
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+        parse_mock.return_value = mock.MagicMock(
+            host='localhost', port='9000', database=os.path.join(output, 'sonar.db'),
+            metrics='coverage,violations', modules=True, batch_size=None
+        )
+        get_resources_mock.return_value = iter([
+            {'key': 'wow:wtf', 'name': 'WTF', 'msr': [{'key': 'coverage', 'val': 26.0},
+                                                      {'key': 'violations', 'val': 3.0}]},
+        ])
+
+        # Execute command
+        sync_measures.main()
+
+        # Check calls and results
+        get_resources_mock.assert_called_once_with(metrics=['coverage', 'violations'], include_modules=True)
+        stdout_mock.write.assert_called_once_with('Complete measures sync: 1 resources and 2 measures synced.\n')
+        self.assertTrue(os.path.exists(os.path.join(output, 'sonar.db')))
+
+
+class CheckQualityGatesTest(TestCase):
+
+    @mock.patch('sonarqube_api.cmd.check_quality_gates.sys')
+    @mock.patch('sonarqube_api.cmd.check_quality_gates.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.get_quality_gates_status')
+    def test_main(self, gates_mock, parse_mock, sys_mock):
+        # Projects from arguments and stdin
+        parse_mock.return_value = mock.MagicMock(
+            host='localhost', port='9000', projects=['p1', 'p2'], filename='-',
+            fail_fast=False, workers=16
+        )
+        sys_mock.stdin = StringIO(u'p3\np4\n')
+        keys = []
+
+        def check(project_keys, workers=None):
+            for key in project_keys:
+                keys.append(key)
+                if key == 'p4':
+                    yield key, None, Exception('Not Found')
+                else:
+                    yield key, {'status': 'ERROR' if key == 'p2' else 'OK'}, None
+        gates_mock.side_effect = check
+
+        # Execute command, fails
+        self.assertEqual(check_quality_gates.main(), 1)
+        self.assertEqual(keys, ['p1', 'p2', 'p3', 'p4'])
+        gates_mock.assert_called_once_with(mock.ANY, workers=16)
+        self.assertEqual(sys_mock.stdout.write.mock_calls, [
+            mock.call('p1: OK\n'), mock.call('p2: ERROR\n'), mock.call('p3: OK\n'),
+            mock.call('Complete quality gates check: 2 passed and 2 failed.\n'),
+        ])
+        sys_mock.stderr.write.assert_called_once_with('Failed to check project p4: Not Found\n')
+
+        # Fail fast, stop on first failure
+        parse_mock.return_value.fail_fast = True
+        sys_mock.stdin = StringIO(u'p3\np4\n')
+        sys_mock.stdout.reset_mock()
+        del keys[:]
+        self.assertEqual(check_quality_gates.main(), 1)
+        self.assertEqual(keys, ['p1', 'p2'])
+        sys_mock.stdout.write.assert_called_with('Incomplete quality gates check: 1 passed and 1 failed.\n')
+
+        # All passed
+        parse_mock.return_value.projects = ['p1']
+        parse_mock.return_value.filename = None
+        self.assertEqual(check_quality_gates.main(), 0)
+
+
+class SyncProfilesTest(TestCase):
+
+    @mock.patch('sonarqube_api.cmd.sync_profiles.sys')
+    @mock.patch('sonarqube_api.cmd.sync_profiles.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.cmd.sync_profiles.sync_profiles')
+    def test_main(self, sync_mock, parse_mock, sys_mock):
+        parse_mock.return_value = mock.MagicMock(
+            source_profile='py-1', target_profile='py-2', dry_run=True, workers=8
+        )
+        plan = [
+            {'action': 'activate', 'rule': 'a', 'severity': 'MAJOR', 'params': {'max': '10', 'min': '1'}},
+            {'action': 'update', 'rule': 'b', 'severity': 'MINOR', 'params': {}},
+            {'action': 'deactivate', 'rule': 'c'},
+        ]
+        sync_mock.return_value = plan, iter(())
+
+        # Dry run, write plan
+        self.assertEqual(sync_profiles.main(), 0)
+        sync_mock.assert_called_once_with(mock.ANY, 'py-1', mock.ANY, 'py-2', dry_run=True, workers=8)
+        self.assertEqual(sys_mock.stdout.write.mock_calls, [
+            mock.call('activate a (severity MAJOR, params max=10;min=1)\n'),
+            mock.call('update b (severity MINOR)\n'),
+            mock.call('deactivate c\n'),
+            mock.call('Planned profile sync: 1 activated, 1 updated, 1 deactivated and 0 failed.\n'),
+        ])
+
+        # Apply, one failure
+        parse_mock.return_value.dry_run = False
+        sync_mock.return_value = plan, iter([(plan[0], Exception('Rule a not found')),
+                                             (plan[1], None), (plan[2], None)])
+        sys_mock.stdout.reset_mock()
+        self.assertEqual(sync_profiles.main(), 1)
+        sys_mock.stderr.write.assert_called_once_with(
+            'Failed to activate a (severity MAJOR, params max=10;min=1): Rule a not found\n'
+        )
+        sys_mock.stdout.write.assert_called_once_with(
+            'Complete profile sync: 0 activated, 1 updated, 1 deactivated and 1 failed.\n'
+        )
+
+
+class SyncGroupsTest(TestCase):
+
+    def test_read_groups(self):
+        # One group per line, members and permissions optional
+        groups = sync_groups.read_groups(StringIO(
+            u'{"group": "devs", "members": ["alice", "bob"], "permissions": ["scan"]}\n'
+            u'\n'
+            u'{"group": "ops"}\n'
+            u'{"group": "ops", "members": ["carol"]}\n'
+        ), 'jsonl')
+        self.assertEqual(groups, {
+            'devs': {'members': {'alice', 'bob'}, 'permissions': {'scan'}},
+            'ops': {'members': {'carol'}, 'permissions': None},
+        })
+
+        # One membership per row, groups without members are emptied
+        groups = sync_groups.read_groups(StringIO(
+            u'group,login,permission\ndevs,alice,scan\ndevs,bob,\nqa,,\n'
+        ), 'csv')
+        self.assertEqual(groups, {
+            'devs': {'members': {'alice', 'bob'}, 'permissions': {'scan'}},
+            'qa': {'members': set(), 'permissions': None},
+        })
+
+    @mock.patch('sonarqube_api.cmd.sync_groups.sys')
+    @mock.patch('sonarqube_api.cmd.sync_groups.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.cmd.sync_groups.sync_groups')
+    def test_main(self, sync_mock, parse_mock, sys_mock):
+        parse_mock.return_value = mock.MagicMock(
+            filename='-', format='jsonl', create_users=True, dry_run=True, workers=8, rate=20.0
+        )
+        sys_mock.stdin = StringIO(u'{"group": "qa", "members": ["carol"]}\n')
+        plan = [
+            {'action': 'create_user', 'login': 'carol'},
+            {'action': 'create_group', 'group': 'qa'},
+            {'action': 'add_member', 'group': 'qa', 'login': 'carol'},
+            {'action': 'remove_member', 'group': 'qa', 'login': 'bob'},
+            {'action': 'grant', 'group': 'qa', 'permission': 'scan'},
+            {'action': 'revoke', 'group': 'qa', 'permission': 'admin'},
+        ]
+        sync_mock.return_value = plan, iter(())
+
+        # Dry run, write plan
+        self.assertEqual(sync_groups.main(), 0)
+        sync_mock.assert_called_once_with(
+            mock.ANY, {'qa': {'members': {'carol'}, 'permissions': None}},
+            create_users=True, dry_run=True, workers=8, rate=20.0
+        )
+        self.assertEqual(sys_mock.stdout.write.mock_calls, [
+            mock.call('create user carol\n'),
+            mock.call('create group qa\n'),
+            mock.call('add carol to qa\n'),
+            mock.call('remove bob from qa\n'),
+            mock.call('grant scan to qa\n'),
+            mock.call('revoke admin from qa\n'),
+            mock.call('Planned groups sync: 1 users created, 1 groups created, 1 members '
+                      'added, 1 removed, 1 permissions granted, 1 revoked and 0 failed.\n'),
+        ])
+
+        # Apply, one failure
+        parse_mock.return_value.dry_run = False
+        sys_mock.stdin = StringIO(u'{"group": "qa", "members": ["carol"]}\n')
+        sync_mock.return_value = plan[1:3], iter([(plan[1], None),
+                                                  (plan[2], Exception('User carol not found'))])
+        sys_mock.stdout.reset_mock()
+        self.assertEqual(sync_groups.main(), 1)
+        sys_mock.stderr.write.assert_called_once_with(
+            'Failed to add carol to qa: User carol not found\n'
+        )
+        sys_mock.stdout.write.assert_called_once_with(
+            'Complete groups sync: 0 users created, 1 groups created, 0 members '
+            'added, 0 removed, 0 permissions granted, 0 revoked and 1 failed.\n'
+        )
+
+
+class ImportRulesTest(TestCase):
+
+    @mock.patch('sonarqube_api.cmd.import_rules.sys')
+    @mock.patch('sonarqube_api.cmd.import_rules.argparse.ArgumentParser.parse_args')
+    @mock.patch('requests.Session.post')
+    def test_main(self, post_mock, parse_mock, sys_mock):
+        parse_mock.return_value = mock.MagicMock(
+            host='localhost', port='9000', filename='-', format='jsonl', workers=2
+        )
+        rule = {'key': 'X1', 'name': 'No lala', 'description': 'Do not use lala', 'message': 'Remove lala',
+                'xpath': '//lala', 'severity': 'major', 'status': 'ready', 'template_key': 'xpath:XPath'}
+        sys_mock.stdin = StringIO(u'\n'.join(json.dumps(r) for r in [
+            rule,
+            dict(rule, key='X2'),
+            # Invalid: severity, missing message, template key
+            dict(rule, key='X3', severity='so-so'),
+            dict(rule, key='X4', message=''),
+            dict(rule, key='X5', template_key='XPath'),
+            # Rejected by the server
+            dict(rule, key='X6'),
+        ]))
+
+        def create(url, data=None):
+            if data['custom_key'] == 'X2':
+                msg = 'A rule with the key X2 already exists'
+            elif data['custom_key'] == 'X6':
+                msg = 'Template rule not found'
+            else:
+                return mock.MagicMock(status_code=200)
+            return mock.MagicMock(status_code=400, json=mock.MagicMock(return_value={'errors': [{'msg': msg}]}))
+        post_mock.side_effect = create
+
+        # Execute command, only valid rules are sent
+        import_rules.main()
+        self.assertEqual(sorted(c[1]['data']['custom_key'] for c in post_mock.call_args_list), ['X1', 'X2', 'X6'])
+        post_mock.assert_any_call(mock.ANY, data={
+            'custom_key': 'X1', 'name': 'No lala', 'markdown_description': 'Do not use lala',
+            'params': 'message=Remove lala;xpathQuery=//lala', 'severity': 'MAJOR', 'status': 'READY',
+            'template_key': 'xpath:XPath'
+        })
+        self.assertEqual(sorted(c[1][0] for c in sys_mock.stderr.write.mock_calls), [
+            'Failed to create rule X6: Template rule not found\n',
+            'Invalid rule X3: Invalid severity SO-SO, must be one of: INFO, MINOR, MAJOR, CRITICAL, BLOCKER\n',
+            'Invalid rule X4: Missing message\n',
+            'Invalid rule X5: Invalid template key XPath, must be repository:key\n',
+        ])
+        sys_mock.stdout.write.assert_called_once_with(
+            'Complete rules import: 1 created, 1 skipped (already existing) and 4 failed.\n'
+        )
+
+    def test_read_rules(self):
+        csv_file = StringIO(u'key,name,description,message,xpath,severity,status,template_key\n'
+                            u'X1,No lala,Do not use lala,Remove lala,//lala,MAJOR,READY,xpath:XPath\n')
+        rules = list(import_rules.read_rules(csv_file, 'csv'))
+        self.assertEqual(len(rules), 1)
+        self.assertEqual(import_rules.validate_rule(rules[0])['template_key'], 'xpath:XPath')
+
+
+class CLITest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @mock.patch('sonarqube_api.cmd.check_quality_gates.sys')
+    @mock.patch('sonarqube_api.cmd.cli.sys')
+    @mock.patch('sonarqube_api.cmd.SonarAPIHandler')
+    def test_main(self, handler_mock, cli_sys_mock, gates_sys_mock):
+        # Single command, with global connection arguments
+        h = handler_mock.return_value
+        h.get_quality_gates_status.return_value = iter([('p1', {'status': 'OK'}, None)])
+        with mock.patch('sys.argv', ['sonarqube', '--host', 'http://sonar', '--pool-size', '4',
+                                     'check-quality-gates', 'p1']):
+            self.assertEqual(cli.main(), 0)
+        handler_mock.assert_called_once_with(host='http://sonar', port='9000', user=None,
+                                             password=None, token=None, base_path=None,
+                                             pool_size=4)
+        h.get_quality_gates_status.assert_called_once_with(mock.ANY, workers=8)
+        h.close.assert_called_once_with()
+        gates_sys_mock.stdout.write.assert_called_with(
+            'Complete quality gates check: 1 passed and 0 failed.\n'
+        )
+
+    @mock.patch('sonarqube_api.cmd.check_quality_gates.sys')
+    @mock.patch('sonarqube_api.cmd.cli.sys')
+    @mock.patch('sonarqube_api.cmd.SonarAPIHandler')
+    def test_batch(self, handler_mock, cli_sys_mock, gates_sys_mock):
+        # One handler per server, shared by the steps
+        handlers = {}
+
+        def handler(**kwargs):
+            h = handlers.setdefault(kwargs['host'], mock.MagicMock())
+            h.get_quality_gates_status.side_effect = lambda keys, workers=None: iter([
+                (key, {'status': 'ERROR' if key == 'bad' else 'OK'}, None) for key in keys
+            ])
+            return h
+        handler_mock.side_effect = handler
+
+        fn = os.path.join(self.tmp_dir, 'batch.txt')
+        with open(fn, 'w') as f:
+            f.write('# Check gates\n'
+                    'check-quality-gates p1 p2\n'
+                    '\n'
+                    '--host http://other check-quality-gates "p3"  # other server\n'
+                    'check-quality-gates bad\n'
+                    'check-quality-gates --unknown\n'
+                    'batch other.txt\n'
+                    'check-quality-gates p4\n')
+
+        # Stop on first failed step
+        with mock.patch('sys.argv', ['sonarqube', '--host', 'http://sonar', 'batch', fn]):
+            self.assertEqual(cli.main(), 1)
+        self.assertEqual(handler_mock.call_count, 2)
+        self.assertEqual(sorted(handlers), ['http://other', 'http://sonar'])
+        self.assertEqual(handlers['http://sonar'].get_quality_gates_status.call_count, 2)
+        self.assertEqual(handlers['http://other'].get_quality_gates_status.call_count, 1)
+        self.assertEqual(cli_sys_mock.stdout.write.mock_calls, [
+            mock.call('[1] check-quality-gates p1 p2\n'),
+            mock.call('[2] --host http://other check-quality-gates "p3"  # other server\n'),
+            mock.call('[3] check-quality-gates bad\n'),
+            mock.call('Incomplete batch: 3 steps run and 1 failed.\n'),
+        ])
+
+        # Keep going, invalid and nested steps fail too
+        cli_sys_mock.reset_mock()
+        with mock.patch('sys.argv', ['sonarqube', '--host', 'http://sonar', 'batch', fn,
+                                     '--keep-going']):
+            with mock.patch('sys.stderr'):
+                self.assertEqual(cli.main(), 1)
+        cli_sys_mock.stderr.write.assert_called_once_with("Error: batches can't be nested\n")
+        cli_sys_mock.stdout.write.assert_called_with('Complete batch: 6 steps run and 3 failed.\n')
+
+    @mock.patch('sonarqube_api.cmd.check_quality_gates.sys')
+    @mock.patch('sonarqube_api.cmd.cli.sys')
+    def test_batch_connections(self, cli_sys_mock, gates_sys_mock):
+        # Concurrent steps, against a server that keeps connections open
+        server = start_keep_alive_server(self)
+        fn = os.path.join(self.tmp_dir, 'batch.txt')
+        with open(fn, 'w') as f:
+            f.write('check-quality-gates p1 p2 p3 p4 --workers 4\n'
+                    'check-quality-gates p5 p6 p7 p8 --workers 4\n')
+
+        # Connections opened by the first step are reused by the second
+        with mock.patch('sys.argv', ['sonarqube', '--host', 'http://localhost', '--port',
+                                     str(server.server_address[1]), 'batch', fn]):
+            self.assertEqual(cli.main(), 0)
+        cli_sys_mock.stdout.write.assert_called_with('Complete batch: 2 steps run and 0 failed.\n')
+        self.assertLessEqual(server.connections, 4)
+
+
+class DiffRulesTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_snapshot(self, name, rules):
+        fn = os.path.join(self.tmp_dir, name)
+        with open(fn, 'w') as f:
+            write_snapshot(rules, f)
+        return fn
+
+    @mock.patch('sonarqube_api.cmd.diff_rules.sys')
+    @mock.patch('sonarqube_api.cmd.diff_rules.argparse.ArgumentParser.parse_args')
+    def test_main(self, parse_mock, sys_mock):
+        rules = [r for r in GET_RULES_DATA if 'key' in r]
+        changed = dict(rules[1], severity='MINOR')
+        parse_mock.return_value = mock.MagicMock(
+            old=self.write_snapshot('old.jsonl', rules[:3]),
+            new=self.write_snapshot('new.jsonl', [rules[0], changed, rules[3]]),
+            format='text', exit_code=False
+        )
+
+        # Text output
+        self.assertEqual(diff_rules.main(), 0)
+        self.assertEqual(sys_mock.stdout.write.mock_calls, [
+            mock.call('- S1456 (Missing semi-colon)\n'),
+            mock.call('~ X123: severity "MAJOR" -> "MINOR"\n'),
+            mock.call('+ X1456 (wrong format)\n'),
+            mock.call('Complete rules diff: 1 added, 1 removed and 1 changed.\n'),
+        ])
+
+        # JSON lines output, exit code for differences
+        parse_mock.return_value.format = 'jsonl'
+        parse_mock.return_value.exit_code = True
+        sys_mock.stdout.reset_mock()
+        self.assertEqual(diff_rules.main(), 1)
+        changes = [json.loads(c[1][0]) for c in sys_mock.stdout.write.mock_calls]
+        self.assertEqual([(c['action'], c['key']) for c in changes],
+                         [('removed', 'S1456'), ('changed', 'X123'), ('added', 'X1456')])
+        self.assertEqual(changes[1]['fields'], {'severity': ['MAJOR', 'MINOR']})
+        sys_mock.stderr.write.assert_called_once_with(
+            'Complete rules diff: 1 added, 1 removed and 1 changed.\n'
+        )
+
+        # Missing snapshot
+        parse_mock.return_value.new = os.path.join(self.tmp_dir, 'missing.jsonl')
+        self.assertEqual(diff_rules.main(), 2)
+
+
+class FetchSourcesTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @mock.patch('sonarqube_api.cmd.fetch_sources.sys')
+    @mock.patch('sonarqube_api.cmd.fetch_sources.argparse.ArgumentParser.parse_args')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.get_source')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.get_analysis_date')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.get_issues')
+    def test_main(self, issues_mock, date_mock, source_mock, parse_mock, sys_mock):
+        # Files from arguments, stdin and issues (once each)
+        parse_mock.return_value = mock.MagicMock(
+            host='localhost', port='9000', components=['p:a.py'], filename='-',
+            from_issues=True, projects='p', severities=None, statuses=None, types=None,
+            cache_dir=os.path.join(self.tmp_dir, 'cache'),
+            output=os.path.join(self.tmp_dir, 'out'), workers=4
+        )
+        sys_mock.stdin = StringIO(u'p:src/b.py\np:missing.py\n')
+        issues_mock.return_value = iter([{'component': 'p:src/b.py', 'project': 'p'},
+                                         {'component': 'p:c.py', 'project': 'p'}])
+        date_mock.return_value = '2024-05-01T10:00:00+0000'
+
+        def get_source(key):
+            if key == 'p:missing.py':
+                raise ClientError('Not Found')
+            return u'# {}\n'.format(key).encode('utf-8')
+        source_mock.side_effect = get_source
+
+        # Execute command, one failed
+        self.assertEqual(fetch_sources.main(), 1)
+        issues_mock.assert_called_once_with(projects='p', severities=None, statuses=None,
+                                            types=None, workers=4)
+        sys_mock.stderr.write.assert_called_once_with(
+            'Failed to fetch source of p:missing.py: Not Found\n'
+        )
+        sys_mock.stdout.write.assert_called_once_with(
+            'Complete sources fetch: 3 downloaded, 0 cached and 1 failed.\n'
+        )
+        with open(os.path.join(self.tmp_dir, 'out', 'p', 'src', 'b.py')) as f:
+            self.assertEqual(f.read(), '# p:src/b.py\n')
+
+        # Re-run, cached
+        parse_mock.return_value.components = ['p:a.py', 'p:c.py']
+        parse_mock.return_value.filename = None
+        parse_mock.return_value.from_issues = False
+        sys_mock.stdout.reset_mock()
+        self.assertEqual(fetch_sources.main(), 0)
+        sys_mock.stdout.write.assert_called_once_with(
+            'Complete sources fetch: 0 downloaded, 2 cached and 0 failed.\n'
+        )
@@ -0,0 +1,131 @@
+import json
+import warnings
+from unittest import TestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from sonarqube_api import SonarAPIHandler
+from sonarqube_api.cursor import PageCursor
+from sonarqube_api.exceptions import SearchWindowWarning
+
+
+def paged_search(items, page_size=2, key='metrics'):
+    """
+    Return a fake _make_call that pages through the given items.
+    """
+    def search(method, endpoint, **qs):
+        page = qs.get('p', 1)
+        data = {'p': page, 'ps': page_size, 'total': len(items),
+                key: items[(page - 1) * page_size:page * page_size]}
+        return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value=data))
+    return search
+
+
+class PageCursorTest(TestCase):
+
+    def setUp(self):
+        self.h = SonarAPIHandler(user='admin', password='admin')
+        self.metrics = [{'key': 'm{}'.format(i)} for i in range(5)]
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_paging_info(self, mock_call):
+        mock_call.side_effect = paged_search(self.metrics)
+        cursor = self.h.get_metrics()
+
+        # Total and pages are known before iterating, with a single call
+        self.assertEqual(len(cursor), 5)
+        self.assertEqual(cursor.total, 5)
+        self.assertEqual(cursor.pages, 3)
+        self.assertEqual(cursor.pages_remaining, 3)
+        self.assertEqual(cursor.page, 1)
+        self.assertEqual(mock_call.call_count, 1)
+
+        # Consume first page and one more item, first page is not re-read
+        self.assertEqual([next(cursor) for _ in range(3)], self.metrics[:3])
+        self.assertEqual(cursor.position, 3)
+        self.assertEqual(cursor.pages_remaining, 2)
+        self.assertEqual(cursor.page, 2)
+        self.assertEqual(mock_call.call_count, 2)
+
+        # Consume the rest
+        self.assertEqual(list(cursor), self.metrics[3:])
+        self.assertEqual(cursor.position, 5)
+        self.assertEqual(cursor.pages_remaining, 0)
+        self.assertEqual(mock_call.call_count, 3)
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_resume(self, mock_call):
+        mock_call.side_effect = paged_search(self.metrics)
+        cursor = self.h.get_metrics(fields=['name'])
+        next(cursor)
+        next(cursor)
+        next(cursor)
+
+        # Serialize state and resume: pages already consumed are not fetched
+        state = json.loads(json.dumps(cursor.get_state()))
+        mock_call.reset_mock()
+        resumed = PageCursor.from_state(self.h, state)
+        self.assertEqual(len(resumed), 5)
+        self.assertEqual(resumed.position, 3)
+        self.assertEqual(list(resumed), self.metrics[3:])
+        self.assertEqual(mock_call.call_args_list, [
+            mock.call('get', self.h.METRICS_LIST_ENDPOINT, f='name', p=2),
+            mock.call('get', self.h.METRICS_LIST_ENDPOINT, f='name', p=3),
+        ])
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_nested_paging(self, mock_call):
+        # Newer endpoints return paging info in a nested object
+        resp = mock.MagicMock(status_code=200)
+        resp.json.return_value = {
+            'paging': {'pageIndex': 1, 'pageSize': 100, 'total': 2},
+            'components': [{'key': 'a'}, {'key': 'b'}]
+        }
+        mock_call.return_value = resp
+
+        cursor = PageCursor(self.h, '/api/components/search', 'components')
+        self.assertEqual(list(cursor), [{'key': 'a'}, {'key': 'b'}])
+        self.assertEqual(cursor.pages, 1)
+        self.assertEqual(mock_call.call_count, 1)
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_attach(self, mock_call):
+        # Activations are returned by rule key, next to the rules
+        def search(method, endpoint, **qs):
+            page = qs.get('p', 1)
+            data = {'p': page, 'ps': 1, 'total': 2,
+                    'rules': [{'key': 'r{}'.format(page)}],
+                    'actives': {'r1': [{'qProfile': 'py-1', 'severity': 'MAJOR'}]}}
+            return mock.MagicMock(status_code=200, json=mock.MagicMock(return_value=data))
+        mock_call.side_effect = search
+
+        # Attached to each rule (empty if missing), also when resumed
+        cursor = self.h.get_activations('py-1')
+        self.assertEqual(next(cursor), {'key': 'r1', 'actives': [{'qProfile': 'py-1', 'severity': 'MAJOR'}]})
+        resumed = PageCursor.from_state(self.h, json.loads(json.dumps(cursor.get_state())))
+        self.assertEqual(list(resumed), [{'key': 'r2', 'actives': []}])
+        # Active rules in any status
+        mock_call.assert_called_with('get', self.h.RULES_LIST_ENDPOINT, activation='true', qprofile='py-1',
+                                     f='actives', ps=500, p=2)
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler._make_call')
+    def test_window(self, mock_call):
+        # Database backed endpoints have no results window
+        self.h.MAX_SEARCH_RESULTS = 3
+        members = [{'login': 'u{}'.format(i)} for i in range(5)]
+        mock_call.side_effect = paged_search(members, key='users')
+        self.assertEqual(list(self.h.get_group_members('devs')), members)
+
+        # Searches exceeding their window are truncated, with a warning
+        mock_call.side_effect = paged_search(self.metrics, key='components')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            cursor = self.h._search_projects()
+            self.assertEqual(list(cursor), self.metrics[:3])
+        self.assertEqual([w.category for w in caught], [SearchWindowWarning])
+        self.assertEqual(str(caught[0].message), 'Search of /api/components/search has 5 '
+                                                 'results, only the first 3 can be paged through')
+        self.assertEqual(cursor.get_state()['window'], 3)
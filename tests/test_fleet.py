@@ -0,0 +1,86 @@
+import threading
+import time
+from unittest import TestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from sonarqube_api import SonarAPIHandler
+from sonarqube_api.exceptions import ServerError, ServerTimeoutError
+from sonarqube_api.fleet import SonarFleet
+
+
+class SonarFleetTest(TestCase):
+
+    def setUp(self):
+        self.handlers = dict((name, SonarAPIHandler(host='http://{}'.format(name)))
+                             for name in ('bu1', 'bu2', 'bu3'))
+        self.fleet = SonarFleet(self.handlers, timeout=1)
+
+    def test_get_metrics(self):
+        # Third server fails after its first metric
+        def failing(fields=None):
+            yield {'key': 'coverage'}
+            raise ServerError('Internal Server Error')
+
+        with mock.patch.object(self.handlers['bu1'], 'get_metrics',
+                               return_value=iter([{'key': 'coverage'}, {'key': 'ncloc'}])), \
+                mock.patch.object(self.handlers['bu2'], 'get_metrics',
+                                  return_value=iter([{'key': 'coverage'}])), \
+                mock.patch.object(self.handlers['bu3'], 'get_metrics', side_effect=failing):
+            results = list(self.fleet.get_metrics(fields=['name']))
+            self.handlers['bu1'].get_metrics.assert_called_once_with(fields=['name'])
+
+        # Results tagged with server, errors recorded
+        self.assertEqual(sorted((s, m['key']) for s, m in results), [
+            ('bu1', 'coverage'), ('bu1', 'ncloc'), ('bu2', 'coverage'), ('bu3', 'coverage')
+        ])
+        self.assertEqual(list(self.fleet.errors), ['bu3'])
+        self.assertIsInstance(self.fleet.errors['bu3'], ServerError)
+
+    def test_timeout(self):
+        # Second server hangs after its first rule, until released
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def hanging(*args, **kwargs):
+            yield {'key': 'py:S2'}
+            release.wait()
+            yield {'key': 'py:S3'}
+
+        self.fleet.timeout = 0.2
+        with mock.patch.object(self.handlers['bu1'], 'get_rules',
+                               return_value=iter([{'key': 'py:S1'}])), \
+                mock.patch.object(self.handlers['bu2'], 'get_rules', side_effect=hanging), \
+                mock.patch.object(self.handlers['bu3'], 'get_rules', return_value=iter([])):
+            results = list(self.fleet.get_rules(active_only=True))
+
+        # Slow server dropped, the rest complete
+        self.assertEqual(sorted(results), [('bu1', {'key': 'py:S1'}), ('bu2', {'key': 'py:S2'})])
+        self.assertEqual(list(self.fleet.errors), ['bu2'])
+        self.assertIsInstance(self.fleet.errors['bu2'], ServerTimeoutError)
+
+    def test_timeout_slow_consumer(self):
+        # Fast servers, but the consumer takes longer than the timeout
+        # (and the buffer gets full)
+        self.fleet.timeout = 0.3
+        self.fleet.BUFFER_SIZE = 2
+        rules = [{'key': 'py:S{}'.format(i)} for i in range(5)]
+        results = []
+        with mock.patch.object(self.handlers['bu1'], 'get_rules', return_value=iter(rules)), \
+                mock.patch.object(self.handlers['bu2'], 'get_rules', return_value=iter(rules)), \
+                mock.patch.object(self.handlers['bu3'], 'get_rules', return_value=iter([])):
+            for result in self.fleet.get_rules():
+                time.sleep(0.05)
+                results.append(result)
+
+        # Nothing dropped, each server is timed on its own
+        self.assertEqual(len(results), 10)
+        self.assertEqual(self.fleet.errors, {})
+
+    def test_names(self):
+        # Handlers named by url
+        fleet = SonarFleet([SonarAPIHandler(host='http://sonar.bu1.com', port=80)])
+        self.assertEqual(list(fleet.handlers), ['http://sonar.bu1.com:80'])
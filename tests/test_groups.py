@@ -0,0 +1,119 @@
+from unittest import TestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from sonarqube_api.exceptions import ValidationError
+from sonarqube_api.groups import diff_groups, sync_groups
+from sonarqube_api.utils import RateLimiter
+
+
+class GroupsTest(TestCase):
+
+    def setUp(self):
+        self.h = mock.MagicMock(DEFAULT_WORKERS=4)
+        self.h.get_groups.return_value = iter([{'name': 'devs'}, {'name': 'ops'}])
+        self.h.get_users.return_value = iter([{'login': 'alice'}, {'login': 'bob'}])
+        self.h.get_group_permissions.return_value = iter([
+            {'name': 'devs', 'permissions': ['scan', 'admin']}, {'name': 'ops', 'permissions': []},
+        ])
+        members = {'devs': {'alice', 'bob'}, 'ops': {'bob'}}
+        self.h.get_group_memberships.side_effect = lambda groups, workers: iter(
+            [(g, members[g], None) for g in groups]
+        )
+
+    def test_diff_groups(self):
+        state = {'groups': {'devs', 'ops'}, 'users': {'alice', 'bob'},
+                 'members': {'devs': {'alice', 'bob'}, 'ops': {'bob'}},
+                 'permissions': {'devs': {'scan', 'admin'}}}
+        desired = {
+            'devs': {'members': {'alice', 'carol'}, 'permissions': {'scan', 'provisioning'}},
+            'ops': {'members': None, 'permissions': None},
+            'qa': {'members': {'bob'}, 'permissions': None},
+        }
+        self.assertEqual(diff_groups(desired, state), [
+            {'action': 'create_user', 'login': 'carol'},
+            {'action': 'add_member', 'group': 'devs', 'login': 'carol'},
+            {'action': 'remove_member', 'group': 'devs', 'login': 'bob'},
+            {'action': 'grant', 'group': 'devs', 'permission': 'provisioning'},
+            {'action': 'revoke', 'group': 'devs', 'permission': 'admin'},
+            {'action': 'create_group', 'group': 'qa'},
+            {'action': 'add_member', 'group': 'qa', 'login': 'bob'},
+        ])
+
+        # Users not fetched are never created, and in sync there's nothing to do
+        state['users'] = None
+        self.assertEqual(diff_groups(desired, state)[0]['action'], 'add_member')
+        self.assertEqual(diff_groups({'ops': {'members': {'bob'}}}, state), [])
+
+    def test_sync_groups(self):
+        desired = {'devs': {'members': {'alice'}, 'permissions': None},
+                   'qa': {'members': {'alice', 'bob'}, 'permissions': None}}
+
+        # Dry run, nothing applied (only members of existing groups fetched)
+        plan, results = sync_groups(self.h, desired, dry_run=True, workers=8)
+        self.assertEqual([(c['action'], c['group']) for c in plan], [
+            ('remove_member', 'devs'), ('create_group', 'qa'),
+            ('add_member', 'qa'), ('add_member', 'qa'),
+        ])
+        self.assertEqual(list(results), [])
+        self.h.get_group_memberships.assert_called_once_with(['devs'], 8)
+        self.assertFalse(self.h.get_users.called or self.h.get_group_permissions.called)
+        self.assertFalse(self.h.create_group.called or self.h.remove_group_member.called)
+
+        # Apply, groups created first, adding bob fails
+        order = []
+        self.h.create_group.side_effect = lambda group: order.append('create')
+
+        def add_member(group, login):
+            order.append('add')
+            if login == 'bob':
+                raise ValidationError('User bob not found')
+        self.h.add_group_member.side_effect = add_member
+
+        self.h.get_groups.return_value = iter([{'name': 'devs'}, {'name': 'ops'}])
+        plan, results = sync_groups(self.h, desired, workers=2, rate=1000)
+        results = dict((c.get('login'), e) for c, e in results if c['group'] == 'qa')
+        self.assertIsInstance(results.pop('bob'), ValidationError)
+        self.assertEqual(results, {None: None, 'alice': None})
+        self.assertEqual(order, ['create', 'add', 'add'])
+        self.h.remove_group_member.assert_called_once_with('devs', 'bob')
+
+    def test_sync_groups_users_permissions(self):
+        desired = {'devs': {'members': {'alice', 'carol'}, 'permissions': {'scan'}}}
+        plan, results = sync_groups(self.h, desired, create_users=True)
+        self.assertEqual(plan, [
+            {'action': 'create_user', 'login': 'carol'},
+            {'action': 'add_member', 'group': 'devs', 'login': 'carol'},
+            {'action': 'remove_member', 'group': 'devs', 'login': 'bob'},
+            {'action': 'revoke', 'group': 'devs', 'permission': 'admin'},
+        ])
+        self.assertEqual([e for _, e in results], [None] * 4)
+        self.h.create_user.assert_called_once_with('carol', 'carol', local=False)
+        self.h.remove_group_permission.assert_called_once_with('devs', 'admin')
+
+
+class RateLimiterTest(TestCase):
+
+    @mock.patch('sonarqube_api.utils.time.sleep')
+    @mock.patch('sonarqube_api.utils._clock')
+    def test_wait(self, clock_mock, sleep_mock):
+        clock_mock.return_value = 100.0
+        limiter = RateLimiter(10, burst=2)
+
+        # Burst allowed at once, then spaced at the rate
+        limiter.wait()
+        limiter.wait()
+        self.assertFalse(sleep_mock.called)
+        limiter.wait()
+        limiter.wait()
+        self.assertEqual([round(c[0][0], 6) for c in sleep_mock.call_args_list], [0.1, 0.2])
+
+        # After idle time, allowed again (up to burst)
+        sleep_mock.reset_mock()
+        clock_mock.return_value = 110.0
+        limiter.wait()
+        limiter.wait()
+        self.assertFalse(sleep_mock.called)
@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from sonarqube_api import SonarAPIHandler
+from sonarqube_api.exceptions import ValidationError
+from sonarqube_api.profiles import diff_activations, get_profile_activations, sync_profiles
+
+
+def activations(profile, *rules):
+    """
+    Return rules with their activation in a profile, as get_activations.
+    """
+    return [{'key': key, 'actives': [
+        {'qProfile': 'other', 'severity': 'INFO', 'params': []},
+        {'qProfile': profile, 'severity': severity, 'inherit': 'NONE',
+         'params': [{'key': k, 'value': v} for k, v in sorted(params.items())]},
+    ]} for key, severity, params in rules]
+
+
+class ProfilesTest(TestCase):
+
+    def setUp(self):
+        self.source = SonarAPIHandler(host='http://staging')
+        self.target = SonarAPIHandler(host='http://production')
+
+    def test_get_profile_activations(self):
+        h = mock.MagicMock()
+        h.get_activations.return_value = iter(activations(
+            'py-1', ('py:S1', 'MAJOR', {}), ('py:S2', 'MINOR', {'format': '^test'})
+        ))
+        self.assertEqual(get_profile_activations(h, 'py-1'), {
+            'py:S1': {'severity': 'MAJOR', 'params': {}},
+            'py:S2': {'severity': 'MINOR', 'params': {'format': '^test'}},
+        })
+        h.get_activations.assert_called_once_with('py-1')
+
+    def test_diff_activations(self):
+        source = {
+            'a': {'severity': 'MAJOR', 'params': {}},
+            'b': {'severity': 'MAJOR', 'params': {'max': '10'}},
+            'c': {'severity': 'MINOR', 'params': {}},
+            'd': {'severity': 'MINOR', 'params': {}},
+        }
+        target = {
+            'b': {'severity': 'MAJOR', 'params': {'max': '20'}},
+            'c': {'severity': 'MINOR', 'params': {}},
+            'd': {'severity': 'BLOCKER', 'params': {}},
+            'e': {'severity': 'MAJOR', 'params': {}},
+        }
+        self.assertEqual(diff_activations(source, target), [
+            {'action': 'activate', 'rule': 'a', 'severity': 'MAJOR', 'params': {}},
+            {'action': 'update', 'rule': 'b', 'severity': 'MAJOR', 'params': {'max': '10'}},
+            {'action': 'update', 'rule': 'd', 'severity': 'MINOR', 'params': {}},
+            {'action': 'deactivate', 'rule': 'e'},
+        ])
+
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.deactivate_rule')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.activate_rule')
+    @mock.patch('sonarqube_api.api.SonarAPIHandler.get_activations', autospec=True)
+    def test_sync_profiles(self, get_mock, activate_mock, deactivate_mock):
+        def get_activations(h, profile):
+            if h is self.source:
+                return iter(activations(profile, ('a', 'MAJOR', {}), ('b', 'MINOR', {'max': '10'})))
+            return iter(activations(profile, ('b', 'MINOR', {'max': '20'}), ('c', 'MAJOR', {})))
+        get_mock.side_effect = get_activations
+
+        # Dry run, nothing applied
+        plan, results = sync_profiles(self.source, 'py-1', self.target, 'py-2', dry_run=True)
+        self.assertEqual([(c['action'], c['rule']) for c in plan],
+                         [('activate', 'a'), ('update', 'b'), ('deactivate', 'c')])
+        self.assertEqual(list(results), [])
+        self.assertFalse(activate_mock.called or deactivate_mock.called)
+
+        # Apply, activation of a fails
+        def activate(key, profile, **kwargs):
+            if key == 'a':
+                raise ValidationError('Rule a not found')
+        activate_mock.side_effect = activate
+
+        plan, results = sync_profiles(self.source, 'py-1', self.target, 'py-2', workers=2)
+        results = dict((c['rule'], e) for c, e in results)
+        self.assertIsInstance(results.pop('a'), ValidationError)
+        self.assertEqual(results, {'b': None, 'c': None})
+        activate_mock.assert_any_call('b', 'py-2', severity='MINOR', max='10')
+        deactivate_mock.assert_called_once_with('c', 'py-2')
@@ -0,0 +1,39 @@
+import datetime
+import math
+from unittest import TestCase, skipUnless
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from sonarqube_api.series import MetricSeries
+
+
+class MetricSeriesTest(TestCase):
+
+    def setUp(self):
+        self.series = MetricSeries('coverage')
+        self.series.append(datetime.datetime(2017, 1, 1, 10), '71.5')
+        self.series.append(datetime.datetime(2017, 1, 2, 10), None)
+        self.series.append(datetime.datetime(2017, 1, 3, 10), 73)
+
+    def test_buffers(self):
+        # Values are kept in typed arrays, missing values as NaN
+        self.assertEqual(len(self.series), 3)
+        self.assertEqual(self.series.timestamps.typecode, 'd')
+        self.assertEqual(list(self.series.timestamps), [1483264800.0, 1483351200.0, 1483437600.0])
+        self.assertEqual(self.series.values[0], 71.5)
+        self.assertTrue(math.isnan(self.series.values[1]))
+
+        # Iterate as dates and values
+        points = list(self.series)
+        self.assertEqual(points[0], (datetime.datetime(2017, 1, 1, 10), 71.5))
+        self.assertEqual(points[2], (datetime.datetime(2017, 1, 3, 10), 73.0))
+
+    @skipUnless(numpy, 'requires numpy')
+    def test_to_numpy(self):
+        timestamps, values = self.series.to_numpy()
+        self.assertEqual(str(timestamps[0]), '2017-01-01T10:00:00')
+        self.assertEqual(values.dtype, numpy.float64)
+        self.assertEqual(numpy.nansum(values), 144.5)
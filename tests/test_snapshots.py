@@ -0,0 +1,61 @@
+from io import StringIO
+from unittest import TestCase
+
+from sonarqube_api.snapshots import diff_snapshots, read_snapshot, rule_hash, write_snapshot
+
+
+def rule(key, severity='MAJOR', **params):
+    """
+    Return a rule data dict, as get_rules.
+    """
+    return {'key': key, 'name': 'Rule {}'.format(key), 'severity': severity,
+            'params': [{'key': k, 'defaultValue': v} for k, v in sorted(params.items())]}
+
+
+def snapshot(*rules):
+    """
+    Write a snapshot of rules and read it back.
+    """
+    f = StringIO()
+    write_snapshot(rules, f)
+    f.seek(0)
+    return read_snapshot(f)
+
+
+class SnapshotsTest(TestCase):
+
+    def test_rule_hash(self):
+        # Independent of the order of fields, dependent on values
+        self.assertEqual(rule_hash({'key': 'a', 'severity': 'MAJOR'}),
+                         rule_hash({'severity': 'MAJOR', 'key': 'a'}))
+        self.assertNotEqual(rule_hash({'key': 'a', 'severity': 'MAJOR'}),
+                            rule_hash({'key': 'a', 'severity': 'MINOR'}))
+
+    def test_write_read(self):
+        # Rules without key are skipped
+        f = StringIO()
+        self.assertEqual(write_snapshot([rule('py:S1'), {'name': 'No key'}, rule('py:S2')], f), 2)
+        f.seek(0)
+        entries = read_snapshot(f)
+        self.assertEqual(sorted(entries), ['py:S1', 'py:S2'])
+        self.assertEqual(entries['py:S1']['rule'], rule('py:S1'))
+        self.assertEqual(entries['py:S1']['hash'], rule_hash(rule('py:S1')))
+
+    def test_diff_snapshots(self):
+        old = snapshot(rule('py:S1'), rule('py:S2', max='10', min='1'), rule('py:S3'),
+                       rule('py:S4', format='^test'))
+        new = snapshot(rule('py:S5'), rule('py:S2', 'MINOR', max='20', min='1'), rule('py:S3'),
+                       rule('py:S4', format='^test'))
+
+        # Params in a different order, same fields
+        new['py:S4']['rule']['params'].reverse()
+        new['py:S4']['hash'] = 'other'
+
+        self.assertEqual(diff_snapshots(old, new), [
+            {'action': 'removed', 'key': 'py:S1', 'rule': rule('py:S1')},
+            {'action': 'changed', 'key': 'py:S2', 'fields': {
+                'severity': ('MAJOR', 'MINOR'), 'params.max': ('10', '20')
+            }},
+            {'action': 'added', 'key': 'py:S5', 'rule': rule('py:S5')},
+        ])
+        self.assertEqual(diff_snapshots(new, new), [])
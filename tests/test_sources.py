@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from sonarqube_api.exceptions import ClientError
+from sonarqube_api.sources import SourceCache, fetch_sources, issue_components
+
+
+class SourceCacheTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = SourceCache(os.path.join(self.tmp_dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_put_get(self):
+        # Not cached
+        self.assertIsNone(self.cache.get('p:a.py', '2024-05-01'))
+
+        # Cached by component and analysis date
+        digest = self.cache.put('p:a.py', '2024-05-01', b'print(1)\n')
+        self.assertEqual(self.cache.get('p:a.py', '2024-05-01'), digest)
+        self.assertEqual(self.cache.read(digest), b'print(1)\n')
+        self.assertIsNone(self.cache.get('p:a.py', '2024-05-08'))
+        self.assertIsNone(self.cache.get('p:b.py', '2024-05-01'))
+
+        # Identical sources are stored once
+        self.assertEqual(self.cache.put('p:b.py', '2024-05-01', b'print(1)\n'), digest)
+        objects = [fns for _, _, fns in os.walk(os.path.join(self.cache.path, 'objects')) if fns]
+        self.assertEqual(objects, [[digest[2:]]])
+
+        # Without date only the content is stored
+        other = self.cache.put('p:c.py', None, b'print(2)\n')
+        self.assertEqual(self.cache.read(other), b'print(2)\n')
+        self.assertIsNone(self.cache.get('p:c.py', None))
+
+
+class FetchSourcesTest(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = SourceCache(self.tmp_dir)
+        self.h = mock.MagicMock(DEFAULT_WORKERS=4)
+        self.dates = {'p': '2024-05-01', 'q': None}
+        self.h.get_analysis_date.side_effect = lambda key: self.dates[key.split(':')[0]]
+
+        def get_source(key):
+            if key == 'p:missing.py':
+                raise ClientError('Not Found')
+            return u'# {}\n'.format(key).encode('utf-8')
+        self.h.get_source.side_effect = get_source
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def fetch(self, components):
+        return sorted((k, r, e and str(e)) for k, d, r, e in
+                      fetch_sources(self.h, components, self.cache, workers=2))
+
+    def test_fetch_sources(self):
+        components = [('p:a.py', 'p'), ('p:b.py', 'p'), 'p:missing.py', 'q:c.py']
+
+        # First run, all downloaded (one analysis date per project)
+        self.assertEqual(self.fetch(components), [
+            ('p:a.py', 'downloaded', None), ('p:b.py', 'downloaded', None),
+            ('p:missing.py', None, 'Not Found'), ('q:c.py', 'downloaded', None),
+        ])
+        self.assertEqual(sorted(c[0][0] for c in self.h.get_analysis_date.call_args_list),
+                         ['p', 'p:missing.py', 'q:c.py'])
+
+        # Re-run, only files never analysed are downloaded again
+        self.h.get_source.reset_mock()
+        self.assertEqual(self.fetch(components)[:2], [
+            ('p:a.py', 'cached', None), ('p:b.py', 'cached', None),
+        ])
+        self.assertEqual(sorted(c[0][0] for c in self.h.get_source.call_args_list),
+                         ['p:missing.py', 'q:c.py'])
+
+        # New analysis, downloaded again
+        self.dates['p'] = '2024-05-08'
+        self.assertEqual(self.fetch(components[:1]), [('p:a.py', 'downloaded', None)])
+
+    def test_issue_components(self):
+        self.h.get_issues.return_value = iter([
+            {'component': 'p:a.py', 'project': 'p'},
+            {'component': 'p', 'project': 'p'},
+            {'component': 'p:a.py', 'project': 'p'},
+            {'component': 'q:b.py', 'project': 'q'},
+        ])
+        self.assertEqual(list(issue_components(self.h, projects='p,q')),
+                         [('p:a.py', 'p'), ('q:b.py', 'q')])
+        self.h.get_issues.assert_called_once_with(projects='p,q')
@@ -0,0 +1,63 @@
+"""
+Startup checks for the commands: importing a command and building its parser
+must not import heavy modules, which are only needed once calls are made.
+
+Run this module to benchmark the startup time of each command:
+
+    python -m tests.test_startup
+"""
+import glob
+import json
+import os
+import subprocess
+import sys
+import timeit
+from unittest import TestCase
+
+
+# Modules that must not be imported on startup
+HEAVY_MODULES = ('requests', 'urllib3', 'httpx', 'multiprocessing', 'numpy', 'sqlite3')
+
+# Root of the package, and command modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMANDS = sorted(
+    'sonarqube_api.cmd.{}'.format(os.path.basename(path)[:-3])
+    for path in glob.glob(os.path.join(ROOT, 'sonarqube_api', 'cmd', '*.py'))
+    if not path.endswith('__init__.py')
+)
+
+# Code to start a command (without running it)
+STARTUP_CODE = 'import {0}; {0}.build_parser()'
+
+
+def run_python(code):
+    """
+    Run code in a new interpreter and return its output.
+    """
+    return subprocess.check_output([sys.executable, '-c', code], cwd=ROOT).decode('utf-8')
+
+
+def measure_startup(command, runs=10):
+    """
+    Return the best startup time of a command, in seconds (including the
+    interpreter startup).
+    """
+    code = STARTUP_CODE.format(command)
+    return min(timeit.repeat(lambda: run_python(code), number=1, repeat=runs))
+
+
+class StartupTest(TestCase):
+
+    def test_no_heavy_imports(self):
+        code = '; '.join(STARTUP_CODE.format(c) for c in COMMANDS) + (
+            '; import sys, json; '
+            'print(json.dumps(sorted(m for m in sys.modules if m.split(".")[0] in {!r})))'
+        ).format(HEAVY_MODULES)
+        self.assertEqual(json.loads(run_python(code)), [])
+
+
+if __name__ == '__main__':
+    baseline = min(timeit.repeat(lambda: run_python('pass'), number=1, repeat=10))
+    sys.stdout.write('{:45} {:8.1f} ms\n'.format('(interpreter)', baseline * 1000))
+    for command in COMMANDS:
+        sys.stdout.write('{:45} {:8.1f} ms\n'.format(command, measure_startup(command) * 1000))
@@ -0,0 +1,180 @@
+import json
+import threading
+from unittest import TestCase
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from sonarqube_api import SonarAPIHandler
+from sonarqube_api.exceptions import ValidationError
+from sonarqube_api.transports import HTTP2Transport, Response, Transport, Urllib3Transport
+
+
+class MemoryTransport(Transport):
+    """
+    In-memory transport, answering with the responses of a dict by url.
+    """
+
+    def __init__(self, responses, **kwargs):
+        super(MemoryTransport, self).__init__(**kwargs)
+        self.responses = responses
+        self.requests = []
+
+    def request(self, method, url, data=None):
+        self.requests.append((method, url, data))
+        status, body = self.responses[url]
+        return Response(status, {'Content-Type': 'application/json'},
+                        json.dumps(body).encode('utf-8'), 'OK' if status < 300 else 'Error')
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """
+    Request handler that answers with the data of the request.
+    """
+
+    def _echo(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.dumps({
+            'method': self.command,
+            'path': self.path,
+            'body': self.rfile.read(length).decode('utf-8'),
+            'auth': self.headers.get('Authorization'),
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _echo
+
+    def log_message(self, format, *args):
+        pass
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """
+    HTTP/1.1 request handler that keeps connections open, counting them in
+    the server, and answers every request with a passed quality gate.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        # Note: requests sends the queryset as body, read it to keep the
+        # connection usable
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        body = json.dumps({'projectStatus': {'status': 'OK'}}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class KeepAliveServer(ThreadingMixIn, HTTPServer):
+    """
+    Threaded server (one thread per connection) counting connections.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('localhost', 0), KeepAliveHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+
+
+def start_keep_alive_server(test):
+    """
+    Start a KeepAliveServer in a thread, stopped when the test is done.
+
+    :param test: TestCase instance
+    :return: server instance
+    """
+    server = KeepAliveServer()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    return server
+
+
+class TransportsTest(TestCase):
+
+    def start_server(self):
+        server = HTTPServer(('localhost', 0), EchoHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return 'http://localhost', server.server_address[1]
+
+    def check_transport(self, transport):
+        host, port = self.start_server()
+        h = SonarAPIHandler(host=host, port=port, token='t0k3n', transport=transport)
+        self.addCleanup(h.close)
+        self.assertIsInstance(h._transport, Transport)
+
+        # Queryset in url for GET, form body for POST, auth header in both
+        res = h._make_call('get', '/api/metrics/search', ps=2).json()
+        self.assertEqual(res['method'], 'GET')
+        self.assertEqual(res['path'], '/api/metrics/search?ps=2')
+        self.assertEqual(res['auth'], 'Basic dDBrM246')
+        res = h._make_call('post', '/api/projects/create', project='wow:wtf').json()
+        self.assertEqual(res['method'], 'POST')
+        self.assertEqual(res['body'], 'project=wow%3Awtf')
+        self.assertEqual(res['auth'], 'Basic dDBrM246')
+
+    def test_memory_transport(self):
+        h = SonarAPIHandler(transport=MemoryTransport({
+            'http://localhost:9000/api/metrics/search': (200, {
+                'p': 1, 'ps': 100, 'total': 1, 'metrics': [{'key': 'coverage'}]
+            }),
+            'http://localhost:9000/api/rules/create': (400, {'errors': [{'msg': 'Rule exists'}]}),
+        }))
+
+        # Responses processed as usual
+        self.assertEqual(list(h.get_metrics()), [{'key': 'coverage'}])
+        with self.assertRaises(ValidationError):
+            h.create_rule('X1', 'X', 'X', 'X', '//x', 'MAJOR', 'READY', 'xpath:XPath')
+        self.assertEqual(h._transport.requests[0],
+                         ('get', 'http://localhost:9000/api/metrics/search', {}))
+
+    def test_urllib3_transport(self):
+        self.check_transport('urllib3')
+
+    def test_http2_transport(self):
+        try:
+            import httpx
+            import h2
+        except ImportError:
+            self.skipTest('httpx with HTTP/2 support not installed')
+        self.check_transport(HTTP2Transport(auth=('t0k3n', '')))
+
+    def test_pool_size(self):
+        transport = Urllib3Transport(pool_size=16)
+        self.assertEqual(transport._pool.connection_pool_kw['maxsize'], 16)
+
+    def test_connections_reused(self):
+        server = start_keep_alive_server(self)
+        h = SonarAPIHandler(host='http://localhost', port=server.server_address[1])
+        self.addCleanup(h.close)
+
+        # Each concurrent call runs in new threads, connections are reused
+        for _ in range(3):
+            results = list(h.get_quality_gates_status(['p1', 'p2', 'p3', 'p4'], workers=4))
+            self.assertEqual([e for _, _, e in results], [None] * 4)
+        self.assertLessEqual(server.connections, 4)
@@ -0,0 +1,65 @@
+from unittest import TestCase
+
+from sonarqube_api.warehouse import MeasuresWarehouse
+
+
+RESOURCES = [
+    {'key': 'wow:wtf', 'name': 'Wizardly Table Fetching', 'scope': 'PRJ', 'qualifier': 'TRK',
+     'msr': [{'key': 'coverage', 'val': 26.0, 'frmt_val': '26.0%'},
+             {'ctic_key': 'TESTABILITY', 'val': 121710.0, 'key': 'sqale_index', 'frmt_val': '253d'},
+             {'ctic_key': 'MAINTAINABILITY', 'val': 56916.0, 'key': 'sqale_index', 'frmt_val': '118d'}]},
+    {'key': 'lol:hahaha', 'name': 'Another project', 'scope': 'PRJ', 'qualifier': 'TRK',
+     'msr': [{'key': 'coverage', 'val': 80.0, 'frmt_val': '80.0%'},
+             {'key': 'alert_status', 'data': 'OK'}]},
+    {'key': 'lol:empty', 'name': 'Empty project', 'scope': 'PRJ', 'qualifier': 'TRK', 'msr': []},
+]
+
+
+class MeasuresWarehouseTest(TestCase):
+
+    def setUp(self):
+        self.warehouse = MeasuresWarehouse(':memory:')
+        self.addCleanup(self.warehouse.close)
+        self.db = self.warehouse.connection
+
+    def test_sync(self):
+        # Sync in batches of two resources
+        self.assertEqual(self.warehouse.sync(iter(RESOURCES), batch_size=2), (3, 5))
+        self.assertEqual(self.db.execute('SELECT count(*) FROM resources').fetchone(), (3,))
+        self.assertEqual(
+            self.db.execute('SELECT key FROM metrics ORDER BY key').fetchall(),
+            [('alert_status',), ('coverage',), ('sqale_index',)]
+        )
+        self.assertEqual(
+            self.db.execute("SELECT characteristic, value FROM measures WHERE metric_key = 'sqale_index' "
+                            "ORDER BY characteristic").fetchall(),
+            [('MAINTAINABILITY', 56916.0), ('TESTABILITY', 121710.0)]
+        )
+        self.assertEqual(
+            self.db.execute("SELECT data FROM measures WHERE metric_key = 'alert_status'").fetchone(), ('OK',)
+        )
+
+        # Sync again with updated values, rows are replaced (and measures not given removed)
+        updated = [dict(RESOURCES[1], name='Renamed', msr=[{'key': 'coverage', 'val': 85.0, 'frmt_val': '85.0%'}])]
+        self.assertEqual(self.warehouse.sync(updated), (1, 1))
+        self.assertEqual(self.db.execute('SELECT count(*) FROM resources').fetchone(), (3,))
+        self.assertEqual(self.db.execute('SELECT count(*) FROM measures').fetchone(), (4,))
+        self.assertEqual(
+            self.db.execute("SELECT r.name, m.value FROM resources r JOIN measures m ON m.resource_key = r.key "
+                            "WHERE r.key = 'lol:hahaha' AND m.metric_key = 'coverage'").fetchone(),
+            ('Renamed', 85.0)
+        )
+
+    def test_sync_removed_measures(self):
+        # Project with coverage and violations, then without violations
+        self.warehouse.sync([{'key': 'p', 'msr': [{'key': 'coverage', 'val': 26.0},
+                                                  {'key': 'violations', 'val': 3.0}]},
+                             {'key': 'q', 'msr': [{'key': 'violations', 'val': 1.0}]}])
+        self.warehouse.sync([{'key': 'p', 'msr': [{'key': 'coverage', 'val': 30.0}]}])
+
+        # Only the measures of the resources synced are replaced
+        self.assertEqual(
+            self.db.execute('SELECT resource_key, metric_key, value FROM measures '
+                            'ORDER BY resource_key, metric_key').fetchall(),
+            [('p', 'coverage', 30.0), ('q', 'violations', 1.0)]
+        )
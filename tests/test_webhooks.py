@@ -0,0 +1,109 @@
+import json
+from unittest import TestCase
+
+import requests
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from sonarqube_api.webhooks import WebhookReceiver, SIGNATURE_HEADER, sign_payload
+
+
+PAYLOAD = {
+    'taskId': 'AVh21JS2JepAEhwQ-b3u',
+    'status': 'SUCCESS',
+    'analysedAt': '2017-11-01T10:00:00+0000',
+    'project': {'key': 'wow:wtf', 'name': 'Wizardly Table Fetching'},
+    'qualityGate': {
+        'name': 'SonarQube way',
+        'status': 'ERROR',
+        'conditions': [
+            {'metric': 'new_coverage', 'operator': 'LESS_THAN', 'value': '55.0',
+             'status': 'ERROR', 'errorThreshold': '80'},
+            {'metric': 'new_bugs', 'operator': 'GREATER_THAN', 'status': 'NO_VALUE',
+             'errorThreshold': '0'},
+        ]
+    },
+    'properties': {}
+}
+
+
+class WebhookReceiverTest(TestCase):
+
+    def start(self, **kwargs):
+        receiver = WebhookReceiver(**kwargs)
+        receiver.start()
+        self.addCleanup(receiver.stop)
+        return receiver
+
+    def post(self, receiver, payload, secret=None, signature=None):
+        body = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if secret:
+            headers[SIGNATURE_HEADER] = signature or sign_payload(body, secret)
+        return requests.post(receiver.url, data=body, headers=headers)
+
+    def test_callbacks(self):
+        events = []
+        receiver = self.start(callbacks=[events.append])
+
+        # Payload parsed with handler structures
+        self.assertEqual(self.post(receiver, PAYLOAD).status_code, 200)
+        self.assertEqual(len(events), 1)
+        event = events[0]
+        self.assertEqual(event['task'], {'id': 'AVh21JS2JepAEhwQ-b3u', 'status': 'SUCCESS',
+                                         'componentKey': 'wow:wtf',
+                                         'executedAt': '2017-11-01T10:00:00+0000'})
+        self.assertEqual(event['project']['key'], 'wow:wtf')
+        self.assertEqual(event['projectStatus'], {'status': 'ERROR', 'conditions': [
+            {'status': 'ERROR', 'metricKey': 'new_coverage', 'comparator': 'LT',
+             'errorThreshold': '80', 'actualValue': '55.0'},
+            {'status': 'NO_VALUE', 'metricKey': 'new_bugs', 'comparator': 'GT',
+             'errorThreshold': '0'},
+        ]})
+        self.assertEqual(event['payload'], PAYLOAD)
+
+        # Invalid payload
+        res = requests.post(receiver.url, data=b'not json')
+        self.assertEqual(res.status_code, 400)
+
+        # Failing callback
+        receiver.add_callback(lambda e: 1 / 0)
+        self.assertEqual(self.post(receiver, PAYLOAD).status_code, 500)
+        self.assertEqual(len(events), 2)
+
+    def test_signature(self):
+        queue = Queue()
+        receiver = self.start(secret='s3cr3t', queue=queue)
+
+        # Missing and wrong signatures rejected
+        self.assertEqual(self.post(receiver, PAYLOAD).status_code, 401)
+        self.assertEqual(self.post(receiver, PAYLOAD, 's3cr3t', 'bad').status_code, 401)
+        self.assertEqual(self.post(receiver, PAYLOAD, 'other').status_code, 401)
+        self.assertTrue(queue.empty())
+
+        # Valid signature
+        self.assertEqual(self.post(receiver, PAYLOAD, 's3cr3t').status_code, 200)
+        self.assertEqual(queue.get(timeout=1)['task']['status'], 'SUCCESS')
+
+    def test_asyncio_queue(self):
+        if asyncio is None:
+            self.skipTest('asyncio not available')
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        queue = asyncio.Queue()
+        receiver = self.start(queue=queue, loop=loop)
+
+        # Post from the loop's executor, and get the event from the queue
+        future = loop.run_in_executor(None, self.post, receiver, PAYLOAD)
+        event = loop.run_until_complete(asyncio.wait_for(queue.get(), 5))
+        self.assertEqual(event['project']['key'], 'wow:wtf')
+        self.assertEqual(loop.run_until_complete(future).status_code, 200)